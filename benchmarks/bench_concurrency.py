@@ -0,0 +1,98 @@
+"""Stress test of one `Fofa` client shared by many threads.
+
+Every thread runs searches and stats calls with its own queries and fields
+against a local fake FOFA server, with the response cache enabled and a
+share of repeated queries, and checks that:
+
+- every result belongs to its own query and has its own fields;
+- `client.fields`, `client.results` and `client.assets` always hold the
+  last call of the current thread;
+- the cache entries and history indexes are unique.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--threads 32] [--calls 50]
+"""
+# 导入标准库
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_fofa import FakeFofa # noqa: E402
+from fofa_py import Fofa # noqa: E402
+
+
+def _worker(client: Fofa, number: int, calls: int, repeat: int) -> list:
+    """Runs `calls` requests and returns the list of failed checks."""
+    failures = []
+    fields = ['ip', 'port', 'title', 'country'][:2 + number % 3]
+    for call in range(calls):
+        # 每repeat次调用重复一次已经查询过的语句, 用来命中缓存
+        query = 'title="t{}-{}"'.format(number, call % repeat)
+        if call % 5 == 4:
+            assets = client.stats(query, fields=['country'])
+            if assets is None or client.assets is not assets:
+                failures.append('stats {}: assets of another call'.format(query))
+            continue
+        assets = client.search(query, fields=fields, size=20)
+        if assets is None:
+            failures.append('search {}: failed'.format(query))
+            continue
+        if assets.fields != fields or client.fields != fields:
+            failures.append('search {}: fields {} != {}'.format(query, assets.fields, fields))
+        if 'title' in fields and not all(
+            title.startswith(query + '#') for title in assets['title']
+        ):
+            failures.append('search {}: rows of another query'.format(query))
+        if client.assets is not assets:
+            failures.append('search {}: client.assets of another call'.format(query))
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--calls', type=int, default=50, help='calls per thread')
+    parser.add_argument('--repeat', type=int, default=10, help='distinct queries per thread')
+    parser.add_argument('--latency', type=float, default=0.002, help='fake server latency in seconds')
+    args = parser.parse_args()
+
+    with FakeFofa(total=1000, latency=args.latency) as server:
+        client = Fofa(key='test', api=server.url, enable_log=False, enable_cache=True,
+                      cache_max_size=args.threads * args.repeat * 2)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(
+                lambda number: _worker(client, number, args.calls, args.repeat),
+                range(args.threads)
+            ))
+        elapsed = time.perf_counter() - start
+
+    failures = [failure for result in results for failure in result]
+    entries = list(client.cache.values())
+    indexes = [entry[0] for entry in entries]
+    if len(set(indexes)) != len(indexes):
+        failures.append('duplicate cache indexes')
+    if len(client.dashboard) < len(entries):
+        failures.append('history is missing cache entries')
+
+    calls = args.threads * args.calls
+    print('{} threads x {} calls on one client: {:.2f} s, {:.0f} calls/s'.format(
+        args.threads, args.calls, elapsed, calls / elapsed
+    ))
+    print('requests sent: {}, cache entries: {}, history rows: {}, threads alive: {}'.format(
+        server.requests, len(entries), len(client.dashboard), threading.active_count()
+    ))
+    for failure in failures[:20]:
+        print('FAIL', failure)
+    print('failures: {}'.format(len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""Micro-benchmarks of the request, parse, container and export hot paths.
+
+Every benchmark runs against a local fake FOFA server or fixture responses
+built from it, with 100, 1k and 10k rows of light fields (`ip`, `port`,
+`title`, `country`) or heavy ones (with `body`, `banner`, `header`,
+`cert`). The suite covers:
+
+- `request/*`: the overhead of `_fofa_get_v2`, with and without a pooled
+  session;
+- `decode/*`: `json.loads` of a search response;
+- `construct/*`: building `FofaAssets` from a decoded response;
+- `access/*`: column access with `__getattr__` and `__getitem__`, and rows;
+- `columns/*`: the `+` and `-` column operations;
+- `cache/*`: `Fofa.search` on a cache hit, a cache miss, and without cache;
+- `export/*`: every exporter, to a string and to a file where supported.
+
+Every run is appended to a JSON lines history file together with the git
+commit, and compared with the last run on the same Python and platform, so
+that regressions stand out. With `--check` the script exits with status 1
+when a benchmark got slower than `--threshold`.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--filter export] [--repeat 5] [--check]
+"""
+# 导入标准库
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_fofa import FakeFofa # noqa: E402
+from fofa_py import Fofa, FofaAssets # noqa: E402
+from fofa_py.basic import _ # noqa: E402
+from fofa_py.util import LazyLogger # noqa: E402
+from fofa_py.util.query import _fofa_get_v2 # noqa: E402
+
+_root = Path(__file__).resolve().parents[1]
+_default_history = Path(__file__).resolve().parent / 'results' / 'history.jsonl'
+_sizes = {'100': 100, '1k': 1000, '10k': 10000}
+_field_sets = {
+    'light': ['ip', 'port', 'title', 'country'],
+    'heavy': ['ip', 'port', 'title', 'body', 'banner', 'header', 'cert'],
+}
+_query = 'port="443"'
+
+
+def _response(server: FakeFofa, fields: list, size: int) -> bytes:
+    """Returns the JSON body the fake server answers for `size` rows of `fields`."""
+    res = server.search(_query, {'fields': ','.join(fields), 'size': str(size)})
+    return json.dumps(res).encode('utf8')
+
+
+def _benchmarks(server: FakeFofa, workdir: str) -> list:
+    """Returns `(name, function)` pairs; every function runs one iteration."""
+    benchmarks = []
+    logger = LazyLogger(None) # 关闭日志, 只测量请求本身
+    url = server.url + '/api/v1/search/all'
+    params = {'key': 'test', 'qbase64': 'cG9ydD0iNDQzIg==', 'fields': 'ip,port', 'size': 1}
+    import requests
+    session = requests.Session()
+    benchmarks.append(('request/pooled', lambda: _fofa_get_v2(
+        logger, _, url, params=params, session=session
+    )))
+    benchmarks.append(('request/new-connection', lambda: _fofa_get_v2(
+        logger, _, url, params=params
+    )))
+
+    bodies = {}
+    for field_set, fields in _field_sets.items():
+        for label, size in _sizes.items():
+            body = bodies[label, field_set] = _response(server, fields, size)
+            res = json.loads(body)
+            benchmarks.append(('decode/{}/{}'.format(label, field_set),
+                               lambda body=body: json.loads(body)))
+            benchmarks.append(('construct/{}/{}'.format(label, field_set),
+                               lambda res=res, fields=fields: FofaAssets(
+                                   query_results=res, mode='search', fields=fields
+                               )))
+
+    fields = _field_sets['light']
+    assets = FofaAssets(
+        query_results=json.loads(bodies['10k', 'light']), mode='search', fields=fields
+    )
+    benchmarks.append(('access/getattr-column/10k', lambda: assets.ip))
+    benchmarks.append(('access/getitem-column/10k', lambda: assets['ip']))
+    benchmarks.append(('access/getitem-row/10k', lambda: assets[5000]))
+    benchmarks.append(('access/getitem-slice-100/10k', lambda: assets[:100]))
+
+    def _add_sub():
+        assets + 'extra'
+        assets - 'extra'
+    benchmarks.append(('columns/add-sub/10k', _add_sub))
+
+    def _client(enable_cache: bool) -> Fofa:
+        return Fofa(key='test', api=server.url, enable_log=False,
+                    enable_cache=enable_cache, cache_max_size=1 << 20)
+    cached, uncached = _client(True), _client(False)
+    cached.search(_query, fields=fields, size=100) # 预先放入缓存
+    queries = count()
+    benchmarks.append(('cache/hit', lambda: cached.search(_query, fields=fields, size=100)))
+    benchmarks.append(('cache/miss', lambda: cached.search(
+        'port="{}"'.format(next(queries)), fields=fields, size=100
+    )))
+    benchmarks.append(('cache/disabled', lambda: uncached.search(_query, fields=fields, size=100)))
+
+    exported = FofaAssets(
+        query_results=json.loads(bodies['1k', 'light']), mode='search', fields=fields
+    )
+    text_path = os.path.join(workdir, 'export.txt')
+    parquet_path = os.path.join(workdir, 'export.parquet')
+
+    def _to_file(method):
+        def _export():
+            with open(text_path, 'w', encoding='utf-8', newline='') as file:
+                method(file)
+        return _export
+    benchmarks.extend([
+        ('export/text/1k', exported.to_text),
+        ('export/csv/1k', exported.to_csv),
+        ('export/csv-file/1k', _to_file(exported.to_csv)),
+        ('export/json/1k', exported.to_json),
+        ('export/json-file/1k', _to_file(exported.to_json)),
+        ('export/ndjson/1k', exported.to_ndjson),
+        ('export/ndjson-file/1k', _to_file(exported.to_ndjson)),
+        ('export/ndjson-buffer/1k', lambda: exported.to_ndjson(io.StringIO())),
+        ('export/yaml/1k', exported.to_yaml),
+        ('export/parquet/1k', lambda: exported.to_parquet(parquet_path)),
+    ])
+    return benchmarks
+
+
+def _measure(function, repeat: int, min_time: float) -> dict:
+    """Returns the per-call seconds of `function`: the best and the median of `repeat` rounds."""
+    timer = timeit.Timer(function)
+    number = 1
+    while True: # 与timeit.autorange相同, 但最短时间可配置
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2 if number < 4 else 5
+    rounds = [seconds / number for seconds in timer.repeat(repeat, number)]
+    return {'best': min(rounds), 'median': statistics.median(rounds), 'number': number}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=str(_root), check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _machine() -> str:
+    """Identifies the interpreter and platform; only runs on the same machine are compared."""
+    return '{} {} {}'.format(
+        platform.python_implementation(), platform.python_version(), platform.platform()
+    )
+
+
+def _previous(history: Path, machine: str) -> dict:
+    """Returns the latest recorded result of every benchmark run on `machine`.
+
+    Runs limited with `--filter` only record some benchmarks, so every
+    benchmark is compared with the last run that measured it.
+    """
+    previous = {}
+    if history.exists():
+        with history.open(encoding='utf-8') as file:
+            for line in file:
+                record = json.loads(line)
+                if record.get('machine') == machine:
+                    previous.update(record.get('results', {}))
+    return previous
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{:.2f} {}'.format(seconds / scale, unit)
+    return '{:.0f} ns'.format(seconds / 1e-9)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='timed rounds per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.1, help='minimum seconds of one round')
+    parser.add_argument('--history', default=str(_default_history), help='JSON lines history file')
+    parser.add_argument('--no-save', action='store_true', help='do not append this run to the history')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on regressions')
+    args = parser.parse_args()
+
+    history = Path(args.history)
+    machine = _machine()
+    previous = _previous(history, machine)
+    results, skipped, regressions = {}, {}, []
+    with FakeFofa(total=10000) as server, tempfile.TemporaryDirectory() as workdir:
+        for name, function in _benchmarks(server, workdir):
+            if args.filter not in name:
+                continue
+            try:
+                function() # 预热, 同时检查可选依赖是否可用
+            except Exception as e:
+                skipped[name] = str(e)
+                print('{:<34} skipped: {}'.format(name, e))
+                continue
+            result = results[name] = _measure(function, args.repeat, args.min_time)
+            line = '{:<34} {:>10}  median {:>10}'.format(
+                name, _format_seconds(result['best']), _format_seconds(result['median'])
+            )
+            if name in previous:
+                change = result['best'] / previous[name]['best'] - 1
+                line += '  {:+6.1%}'.format(change)
+                if change > args.threshold:
+                    regressions.append(name)
+                    line += '  REGRESSION'
+            print(line)
+
+    if not args.no_save and results:
+        history.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(), 'machine': machine,
+            'results': results, 'skipped': skipped,
+        }
+        with history.open('a', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+        print('appended to {}'.format(history))
+    if regressions:
+        print('{} regressions over {:.0%}: {}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)
+        ))
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
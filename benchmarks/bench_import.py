@@ -0,0 +1,99 @@
+"""Measures the cost of `import fofa_py` in fresh interpreters.
+
+Short-lived CLI and serverless invocations pay the import time on every
+run, so it is measured in a new process each time. The script also checks
+that importing the package has no side effects: the heavy dependencies are
+not loaded and the process locale is left untouched.
+
+Usage:
+    python benchmarks/bench_import.py [--runs 20] [--top 10]
+"""
+# 导入标准库
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_src = str(Path(__file__).resolve().parents[1] / 'src')
+# 导入后不应该出现在sys.modules中的重量级依赖
+_heavy_modules = ('tablib', 'loguru', 'cachetools', 'requests', 'pyarrow', 'multiprocessing')
+_check_script = '''
+import locale, sys
+before = locale.setlocale(locale.LC_ALL)
+import fofa_py
+loaded = [name for name in {heavy!r} if name in sys.modules]
+changed = locale.setlocale(locale.LC_ALL) != before
+print(','.join(loaded) + '|' + str(changed))
+'''
+
+
+def _environment() -> dict:
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        path for path in (_src, environment.get('PYTHONPATH')) if path
+    )
+    return environment
+
+
+def _time_import(environment: dict) -> float:
+    """Returns the wall time of one interpreter importing fofa_py."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import fofa_py'], env=environment, check=True)
+    return time.perf_counter() - start
+
+
+def _time_baseline(environment: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], env=environment, check=True)
+    return time.perf_counter() - start
+
+
+def _slowest_modules(environment: dict, top: int) -> list:
+    """Parses `-X importtime` and returns the modules with the largest cumulative time."""
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import fofa_py'],
+        env=environment, check=True, stderr=subprocess.PIPE, universal_newlines=True
+    ).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        __, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20, help='number of fresh interpreters')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules to list')
+    args = parser.parse_args()
+    environment = _environment()
+
+    _time_import(environment) # 预热, 生成字节码缓存
+    imports = [_time_import(environment) for __ in range(args.runs)]
+    baselines = [_time_baseline(environment) for __ in range(args.runs)]
+    overhead = [(value - base) * 1000 for value, base in zip(sorted(imports), sorted(baselines))]
+    print('import fofa_py ({} runs, interpreter startup subtracted):'.format(args.runs))
+    print('  min {:.1f} ms  median {:.1f} ms  max {:.1f} ms'.format(
+        min(overhead), statistics.median(overhead), max(overhead)
+    ))
+
+    print('slowest modules (cumulative):')
+    for cumulative, name in _slowest_modules(environment, args.top):
+        print('  {:>8.1f} ms  {}'.format(cumulative / 1000, name))
+
+    loaded, changed = subprocess.run(
+        [sys.executable, '-c', _check_script.format(heavy=_heavy_modules)],
+        env=environment, check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.strip().split('|')
+    print('heavy modules loaded on import: {}'.format(loaded or 'none'))
+    print('process locale changed on import: {}'.format(changed))
+    return 1 if loaded or changed == 'True' else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
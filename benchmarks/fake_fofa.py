@@ -0,0 +1,161 @@
+"""A local fake FOFA server for benchmarks and stress tests.
+
+It answers the search, stats and host endpoints with deterministic rows,
+so that benchmarks measure the client rather than the network. Every row
+of a query echoes the query in its `title` (`<query>#<row>`), which lets a
+caller check that it received the response of its own request.
+
+Example:
+    >>> with FakeFofa(total=50000, latency=0.005) as server:
+    ...     client = Fofa(key='test', api=server.url)
+"""
+# 导入标准库
+import json
+import threading
+import time
+from base64 import b64decode
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+_ports = ('80', '443', '8080', '22', '3306', '6379')
+_countries = ('CN', 'US', 'JP', 'DE', 'SG')
+_protocols = ('http', 'https', 'ssh', 'mysql', 'redis')
+
+
+def fake_value(field: str, row: int, query: str) -> str:
+    """Returns the deterministic value of `field` for row number `row`."""
+    if field == 'ip':
+        return '10.{}.{}.{}'.format(row >> 16 & 255, row >> 8 & 255, row & 255)
+    if field == 'port':
+        return _ports[row % len(_ports)]
+    if field == 'country':
+        return _countries[row % len(_countries)]
+    if field == 'protocol':
+        return _protocols[row % len(_protocols)]
+    if field == 'title':
+        return '{}#{}'.format(query, row)
+    if field == 'host':
+        return 'host{}.example.com'.format(row)
+    if field == 'link':
+        return 'http://host{}.example.com'.format(row)
+    if field == 'lastupdatetime':
+        return '2024-{:02d}-{:02d} 12:00:00'.format(row % 12 + 1, row % 28 + 1)
+    if field in ('body', 'banner', 'header', 'cert'):
+        return '{}-{} '.format(field, row) * 64 # 模拟较大的字段
+    return '{}-{}'.format(field, row)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # 保持连接, 让客户端可以复用连接池
+    # 响应头和响应体分两次写出, 不关闭Nagle算法时复用的连接每次都要等待延迟确认(约40毫秒)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        fake = self.server.fake
+        url = urlparse(self.path)
+        params = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        with fake.lock:
+            fake.requests += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+        query = b64decode(params.get('qbase64', '')).decode('utf8')
+        if url.path.endswith('/search/all'):
+            body = fake.search(query, params)
+        elif url.path.endswith('/search/stats'):
+            body = fake.stats(query, params)
+        elif '/host/' in url.path:
+            body = fake.host(url.path.rsplit('/', 1)[-1], params)
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeFofa:
+    """Serves fake FOFA responses on a local port from a background thread.
+
+    Args:
+        total: The number of assets every query matches.
+        latency: Seconds to sleep before answering, to simulate the network.
+    """
+    def __init__(self, total: int = 10000, latency: float = 0.0) -> None:
+        self.total = total
+        self.latency = latency
+        self.requests = 0 # 收到的请求数
+        self.lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return 'http://{}:{}'.format(host, port)
+
+    def search(self, query: str, params: dict) -> dict:
+        fields = params.get('fields', 'host,ip,port').split(',')
+        size = int(params.get('size', 100))
+        page = int(params.get('page', 1))
+        rows = range((page - 1) * size, min(page * size, self.total))
+        results = [[fake_value(field, row, query) for field in fields] for row in rows]
+        if len(fields) == 1:
+            results = [row[0] for row in results] # 与官方接口一致, 单个字段时每行是字符串
+        return {
+            'error': False, 'consumed_fpoint': 0, 'required_fpoints': 0,
+            'size': self.total, 'page': page, 'mode': 'extended',
+            'query': query, 'results': results,
+        }
+
+    def stats(self, query: str, params: dict) -> dict:
+        fields = params.get('fields', 'title').split(',')
+        aggs = {}
+        for field in fields:
+            counts = {}
+            for row in range(min(self.total, 1000)):
+                value = fake_value(field, row, query)
+                counts[value] = counts.get(value, 0) + 1
+            aggs[field] = [
+                {'name': name, 'count': number}
+                for name, number in sorted(counts.items(), key=lambda item: -item[1])[:5]
+            ]
+        return {
+            'error': False, 'consumed_fpoint': 0, 'required_fpoints': 0,
+            'size': self.total, 'distinct': {field: len(aggs[field]) for field in fields},
+            'aggs': aggs, 'lastupdatetime': '2024-01-01 12:00:00',
+        }
+
+    def host(self, host: str, params: dict) -> dict:
+        return {
+            'error': False, 'host': host, 'ip': host, 'asn': 1, 'org': 'Example',
+            'country_name': 'China', 'country_code': 'CN',
+            'protocol': list(_protocols), 'port': [int(port) for port in _ports],
+            'category': [], 'product': [], 'update_time': '2024-01-01 12:00:00',
+        }
+
+    def start(self) -> 'FakeFofa':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeFofa':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
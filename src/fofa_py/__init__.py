@@ -1 +1,2 @@
-from .factory import Fofa, FofaAssets
\ No newline at end of file
+from .factory import Fofa, FofaAssets
+from .basic import Field, Term, And, Or, Not, after, before # 查询构造器
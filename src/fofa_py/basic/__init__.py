@@ -1,5 +1,12 @@
 from .etc import _ # 国际化接口（当前只是预留）
+from .etc import _import_tablib
 from .etc import sha256, now
 from .etc import _check_query_fields_dict, _format_result_dict, _format_query_fields_dict
+from .etc import _typed_fields, _categorical_fields, _timestamp_format
+from .etc import _host_table_fields, _iter_host_rows, _search_allowed_fields
+from .etc import _max_page_size, _query_allowed_fields
 from .etc import ParamsMisconfiguredError
-from .exceptions import *
\ No newline at end of file
+from .builder import Node, Term, Raw, And, Or, Not, Field, after, before
+from .builder import _exact_match_fields
+from .parser import _parse_query, _query_node
+from .exceptions import *
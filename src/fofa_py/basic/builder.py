@@ -0,0 +1,370 @@
+# 导入标准库
+import re
+from datetime import date
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+
+# 导入自定义模块
+from .etc import _, ParamsMisconfiguredError
+
+
+# FOFA查询语法中的比较运算符
+_operators = ('=', '==', '!=', '=~')
+# 取反时运算符的对应关系, FOFA没有一元的NOT运算符
+_negated_operators = {'=': '!=', '==': '!=', '!=': '='}
+# 时间范围字段, 比较的是lastupdatetime
+_range_fields = {'after': 'lastupdatetime', 'before': 'lastupdatetime'}
+# 在本地求值时, `=`按完全相等而不是模糊包含来比较的字段
+_exact_match_fields = set(
+    ['ip', 'port', 'protocol', 'base_protocol', 'country', 'region', 'city',
+    'asn', 'os', 'icp', 'cert.is_valid', 'cert.is_match', 'is_honeypot',
+    'is_fraud', 'header_hash', 'banner_hash', 'icon_hash', 'fid', 'tls.version',
+    'tls.ja3s', 'jarm', 'type', 'status_code'])
+
+
+def _quote(value: str) -> str:
+    """Quotes a value as a FOFA string literal."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _literal(value):
+    """Converts a python operand into `(text, quoted)`."""
+    if isinstance(value, bool):
+        return str(value).lower(), False # 布尔值不加引号, 与_format_query_fields_dict一致
+    if isinstance(value, date): # datetime也是date的子类
+        return value.strftime('%Y-%m-%d'), True
+    if isinstance(value, type(re.compile(''))):
+        return value.pattern, True
+    return str(value), True
+
+
+class Node:
+    """The base class of all nodes of a FOFA query AST.
+
+    Nodes are immutable. Every node is compiled into canonical FOFA syntax
+    once, when it is created, and compares and hashes by that canonical
+    text, so equivalent queries built in a different order are equal and
+    can be deduplicated with a set or used as cache keys.
+
+    Nodes are combined with `&` (And), `|` (Or) and `~` (Not).
+    """
+    __slots__ = ('_compiled', )
+
+    def compile(self) -> str:
+        """Returns the canonical FOFA query string of this node."""
+        return self._compiled
+
+    def terms(self):
+        """Yields the leaf terms (and raw strings) of this node."""
+        raise NotImplementedError
+
+    def fields(self) -> set:
+        """Returns the result fields needed to evaluate this node locally."""
+        return set(term.column for term in self.terms())
+
+    def negate(self) -> 'Node':
+        """Returns the negation of this node, pushed down to the terms."""
+        raise NotImplementedError
+
+    def evaluate(self, row) -> bool:
+        """Evaluates this node locally against one row.
+
+        Args:
+            row: A mapping of field -> value as returned by FOFA, holding at
+                least the fields returned by `fields()`.
+
+        Note:
+            The server matches `=` fuzzily on most text fields. Locally it is
+            a case-insensitive substring test, except for the fields in
+            `_exact_match_fields`, which are compared for equality (and
+            `ip` against CIDR ranges).
+        """
+        raise NotImplementedError
+
+    def __and__(self, other: 'Node') -> 'Node':
+        return And(self, other)
+
+    def __or__(self, other: 'Node') -> 'Node':
+        return Or(self, other)
+
+    def __invert__(self) -> 'Node':
+        return self.negate()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Node) and self._compiled == other._compiled
+
+    def __ne__(self, other) -> bool:
+        return not self == other
+
+    def __hash__(self) -> int:
+        return hash(self._compiled)
+
+    def __str__(self) -> str:
+        return self._compiled
+
+    def __repr__(self) -> str:
+        return '<{} {}>'.format(type(self).__name__, self._compiled)
+
+
+class Term(Node):
+    """A single comparison, e.g. `title="admin"` or `after="2024-01-01"`.
+
+    Args:
+        field: The FOFA query field, e.g. 'title', 'port' or 'after'.
+        value: The operand. Booleans are written unquoted and lowercase,
+            dates as `YYYY-MM-DD`, compiled patterns by their source.
+        op: One of '=' (fuzzy match, the FOFA default), '==' (exact match),
+            '!=' (not match) and '=~' (regular expression).
+
+    Raises:
+        ValueError: If `op` is not a FOFA operator, or a range field is not
+            used with '='.
+    """
+    __slots__ = ('field', 'op', 'value', 'quoted')
+
+    def __init__(self, field: str, value, op: str = '=') -> None:
+        if op not in _operators:
+            raise ValueError(_('Invalid query operator: ') + str(op))
+        if field in _range_fields and op != '=':
+            raise ValueError(_('Range fields only support the "=" operator: ') + field)
+        self.field = field
+        self.op = op
+        self.value, self.quoted = _literal(value)
+        text = _quote(self.value) if self.quoted else self.value
+        self._compiled = field + op + text
+
+    @property
+    def column(self) -> str:
+        """The result field this term is evaluated on."""
+        return _range_fields.get(self.field, self.field)
+
+    def __reduce__(self):
+        # 按构造参数序列化, 以便发送给子进程
+        return type(self), (self.field, self.value if self.quoted else self.value == 'true', self.op)
+
+    def terms(self):
+        yield self
+
+    def negate(self) -> Node:
+        if self.field == 'after':
+            return Term('before', self.value) # after包含边界当天, before不包含, 两者互为补集
+        if self.field == 'before':
+            return Term('after', self.value)
+        if self.op not in _negated_operators:
+            raise ValueError(_('Regular expression terms cannot be negated: ') + self._compiled)
+        value = self.value if self.quoted else self.value == 'true'
+        return Term(self.field, value, _negated_operators[self.op])
+
+    def evaluate(self, row) -> bool:
+        actual = row[self.column]
+        if actual is None:
+            actual = ''
+        actual = str(actual)
+        if self.field == 'after':
+            return actual[:len(self.value)] >= self.value
+        if self.field == 'before':
+            return actual[:len(self.value)] < self.value
+        if self.op == '=~':
+            return _regex(self.value).search(actual) is not None
+        if self.op == '==':
+            return actual == self.value
+        matched = self._match(actual)
+        return matched if self.op == '=' else not matched
+
+    def _match(self, actual: str) -> bool:
+        if self.field == 'ip' and '/' in self.value:
+            try: # ip="1.2.3.0/24"
+                return ip_address(actual) in ip_network(self.value, strict=False)
+            except ValueError:
+                return False
+        if self.field in _exact_match_fields or not self.quoted:
+            return actual.lower() == self.value.lower()
+        return self.value.lower() in actual.lower()
+
+
+class Raw(Node):
+    """A query string kept verbatim, e.g. one written by hand.
+
+    It is wrapped in parentheses when combined with other nodes, so that
+    its own `||` and `&&` keep their meaning. A raw query cannot be
+    negated or evaluated locally, and its `column` is `None`.
+    """
+    __slots__ = ('text', )
+    column = None
+
+    def __init__(self, text: str) -> None:
+        self.text = text.strip()
+        self._compiled = self.text
+
+    def __reduce__(self):
+        return type(self), (self.text, )
+
+    def terms(self):
+        yield self
+
+    def negate(self) -> Node:
+        raise ValueError(_('Raw query strings cannot be negated: ') + self.text)
+
+    def evaluate(self, row) -> bool:
+        raise ValueError(_('Raw query strings cannot be evaluated locally: ') + self.text)
+
+
+@lru_cache(maxsize=256)
+def _regex(pattern: str):
+    return re.compile(pattern)
+
+
+class _Group(Node):
+    """A flattened, deduplicated and sorted group of child nodes."""
+    __slots__ = ('children', )
+    _joiner = ''
+
+    def __new__(cls, *children):
+        flat = []
+        for child in children:
+            if not isinstance(child, Node):
+                raise TypeError(_('Query nodes can only be combined with other nodes'))
+            # 同类的嵌套分组直接展开, 例如And(And(a, b), c) -> And(a, b, c)
+            flat.extend(child.children if type(child) is cls else (child, ))
+        unique = sorted(set(flat), key=str)
+        if not unique:
+            raise ValueError(_('A query group needs at least one child'))
+        if len(unique) == 1:
+            return unique[0]
+        node = super().__new__(cls)
+        node.children = tuple(unique)
+        node._compiled = cls._joiner.join(
+            '(' + str(child) + ')' if isinstance(child, (_Group, Raw)) else str(child)
+            for child in unique
+        )
+        return node
+
+    def __reduce__(self):
+        return type(self), self.children
+
+    def terms(self):
+        for child in self.children:
+            yield from child.terms()
+
+
+class And(_Group):
+    """All children must match, compiled as `a&&b`."""
+    __slots__ = ()
+    _joiner = '&&'
+
+    def negate(self) -> Node:
+        return Or(*(child.negate() for child in self.children))
+
+    def evaluate(self, row) -> bool:
+        return all(child.evaluate(row) for child in self.children)
+
+
+class Or(_Group):
+    """Any child must match, compiled as `a||b`."""
+    __slots__ = ()
+    _joiner = '||'
+
+    def negate(self) -> Node:
+        return And(*(child.negate() for child in self.children))
+
+    def evaluate(self, row) -> bool:
+        return any(child.evaluate(row) for child in self.children)
+
+
+class Not:
+    """Negates a node.
+
+    FOFA has no unary NOT operator, so the negation is pushed down to the
+    terms with De Morgan's laws: `=` and `==` become `!=`, `!=` becomes
+    `=`, and `after`/`before` are swapped. `Not(node)` is equivalent to
+    `~node` and returns a regular `Term`, `And` or `Or`.
+
+    Raises:
+        ValueError: If the node contains a regular expression term.
+    """
+    def __new__(cls, node: Node) -> Node:
+        return node.negate()
+
+
+class Field:
+    """A query field, for building terms with python operators.
+
+    Example:
+        >>> title, port = Field('title'), Field('port')
+        >>> str((title == 'admin') & port.isin([80, 443]))
+        '(port="443"||port="80")&&title="admin"'
+    """
+    __hash__ = None
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __eq__(self, value) -> Term:
+        return Term(self.name, value, '=')
+
+    def __ne__(self, value) -> Term:
+        return Term(self.name, value, '!=')
+
+    def exact(self, value) -> Term:
+        return Term(self.name, value, '==')
+
+    def regex(self, pattern) -> Term:
+        return Term(self.name, pattern, '=~')
+
+    def isin(self, values) -> Node:
+        return Or(*(Term(self.name, value) for value in values))
+
+
+def after(moment) -> Term:
+    """Assets updated on or after `moment` (a date or a 'YYYY-MM-DD' string)."""
+    return Term('after', moment)
+
+
+def before(moment) -> Term:
+    """Assets updated before `moment` (a date or a 'YYYY-MM-DD' string), exclusive."""
+    return Term('before', moment)
+
+
+class _FrozenList(tuple):
+    """A list value of a query dictionary, frozen to serve as a cache key.
+
+    It never equals a plain tuple, so a real tuple value keeps its own
+    handling (a single quoted term) and its own cache entry.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _FrozenList) and tuple.__eq__(self, other)
+
+    def __ne__(self, other) -> bool:
+        return not self == other
+
+    def __hash__(self) -> int:
+        return hash((_FrozenList, tuple(self)))
+
+
+def _from_query_dict(query_dict: dict) -> Node:
+    """Builds a query AST from the dictionary form of `_format_query_fields_dict`.
+
+    Raises:
+        ParamsMisconfiguredError: If a list value is empty.
+    """
+    for field, value in query_dict.items():
+        if isinstance(value, list) and not value:
+            raise ParamsMisconfiguredError(
+                _('The query field {field} needs at least one value').format(field=field)
+            )
+    return And(*(
+        Or(*(Term(field, item) for item in value)) if isinstance(value, list)
+        else Term(field, value)
+        for field, value in query_dict.items()
+    ))
+
+
+@lru_cache(maxsize=1024)
+def _compile_query_items(items: tuple) -> str:
+    """Compiles the frozen items of a query dictionary, memoized."""
+    return _from_query_dict(dict(
+        (field, list(value) if isinstance(value, _FrozenList) else value)
+        for field, value in items
+    )).compile()
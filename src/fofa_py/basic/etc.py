@@ -1,32 +1,36 @@
 # 导入标准库
-# import gettext
-import json
-
-# 导入第三方依赖
-import tablib # 这里会蜜汁报错导入不了包(VSC经典静态检查老毛病)
-
-try:
-    import gettext
-    # 尝试导入gettext模块, 如果成功则使用它来处理国际化
-    import locale
-    from pathlib import Path
-    # 设置locale为当前系统的语言环境
-    locale.setlocale(locale.LC_ALL, '')
-    
-    # 获取项目根目录
-    project_root = Path(__file__).resolve().parents[3]
-    locale_dir = project_root / 'locales'
-    # 设置gettext的locale目录
-    gettext.bindtextdomain('fofa_py_src', locale_dir)
-    gettext.textdomain('fofa_py_src')
-    # 绑定翻译
-    lang = gettext.translation(
-        'messages', localedir=locale_dir, languages=[locale.getdefaultlocale()[0]]
-    )
-    lang.install()
-    _ = lang.gettext  # 使用翻译函数替换默认的gettext
-except ImportError:
-    _ = lambda s: s # 接收参数但什么也不干
+import gettext
+from pathlib import Path
+
+# 翻译在第一次调用_时才加载, 导入本包不会读取文件, 也不会调用setlocale修改进程的全局状态
+_translation = None
+
+
+def _load_translation():
+    """Loads the message catalog for the language of the environment."""
+    # 获取项目根目录下的locales目录
+    locale_dir = Path(__file__).resolve().parents[3] / 'locales'
+    # languages为None时, gettext按LANGUAGE, LC_ALL, LC_MESSAGES, LANG环境变量查找语言
+    # 找不到对应的翻译时退回原文, 不会抛出FileNotFoundError
+    return gettext.translation('messages', localedir=str(locale_dir), fallback=True)
+
+
+def _(message: str) -> str:
+    """Translates `message`, loading the translations on first use."""
+    global _translation
+    if _translation is None:
+        _translation = _load_translation()
+    return _translation.gettext(message)
+
+
+def _import_tablib():
+    """Imports tablib lazily, since it is only needed to build datasets and export."""
+    try:
+        import tablib
+    except ImportError:
+        raise ImportError(_('Please install tablib to obtain \
+            support for datasets and exports'))
+    return tablib
 
 
 def _format_query_fields_dict(
@@ -44,6 +48,11 @@ def _format_query_fields_dict(
     - String values are enclosed in double quotes.
     - Boolean values are included directly without quotes.
 
+    The dictionary is converted into a query AST (see `builder.py`) and
+    compiled into canonical syntax, so dictionaries with the same criteria
+    in a different order produce the same string. Compiled strings are
+    memoized.
+
     Args:
         query_dict: A dictionary where keys represent FOFA search fields (e.g.,
             'title', 'domain', 'port') and values are the search criteria.
@@ -52,35 +61,29 @@ def _format_query_fields_dict(
     Returns:
         The formatted query string ready for use in a FOFA search.
 
+    Raises:
+        ParamsMisconfiguredError: If a list value is empty.
+
     Example:
         >>> query = {
         ...     'title': "Example Site",
         ...     'domain': 'example.com',
-        ...     'port': ['80', 443]
+        ...     'port': ['80', 443],
+        ...     'is_honeypot': False
         ... }
-        >>> _format_query_dict(query)
-        '(title="Example Site")&&(domain="example.com")&&(port="80"||port="443")&&(is_honeypot=False)'
+        >>> _format_query_fields_dict(query)
+        'domain="example.com"&&is_honeypot=false&&(port="443"||port="80")&&title="Example Site"'
     Note: 
-        This function is not flexible. If you have more specific requirements, please write your own query string
+        For queries that cannot be expressed as a flat AND of OR-lists, build
+        them with `Field`, `And`, `Or`, `Not`, `after` and `before` instead.
     """
-    # Outer conditions are joined by &&
-    # List items are joined by ||
-    query_string_parts = []
-    for field, value in query_dict.items():
-        if isinstance(value, bool):
-            # Format booleans directly, e.g., (is_honeypot=false)
-            query_string_parts.append(f'({field}={str(value).lower()})')
-        elif isinstance(value, list):
-            # Format list items as OR conditions, e.g., (port="80"||port="443")
-            temp = '||'.join([f'{field}="{item}"' for item in value])
-            query_string_parts.append(f'({temp})')
-        else:
-            # Format other values as exact matches, e.g., (domain="example.com")
-            query_string_parts.append(f'({field}="{value}")')
-
-    query_string = '&&'.join(query_string_parts)
-    # Example output: (title="百度")&&(domain="example.com")&&(port="80"||port="443")
-    return query_string
+    # builder依赖本模块的翻译接口, 延迟导入
+    from .builder import _compile_query_items, _FrozenList
+    # 列表冻结为_FrozenList, 以便作为缓存的键, 同时与真正的元组区分开
+    return _compile_query_items(tuple(
+        (field, _FrozenList(value) if isinstance(value, list) else value)
+        for field, value in query_dict.items()
+    ))
 
 def _format_result_dict_alpha(
     query_results: dict,
@@ -102,7 +105,7 @@ def _format_result_dict_alpha(
     mode: str = 'search',
     api_source: str = 'fofa', # API来源, 用于区分是不是官方API
     detail: bool = False,
-) -> tablib.Dataset:
+) -> 'tablib.Dataset':
     """Formats a raw FOFA API response dictionary into a tablib.Dataset.
 
     This function processes the dictionary returned from a FOFA API query and
@@ -139,7 +142,9 @@ def _format_result_dict_alpha(
         are not currently implemented.
     """
 
-    def _format_search_result_dict() -> tablib.Dataset:
+    tablib = _import_tablib()
+
+    def _format_search_result_dict() -> 'tablib.Dataset':
         """Formats the 'results' list from a search query."""
         data = tablib.Dataset()
         # Set the headers for the dataset using the provided mapping
@@ -200,7 +205,7 @@ def _format_result_dict(
     mode: str = 'search',
     api_source: str = 'fofa', # API来源, 用于区分是不是官方API
     detail: bool = False,
-) -> tablib.Dataset:
+) -> 'tablib.Dataset':
     """Formats a raw FOFA API response dictionary into a tablib.Dataset.
 
     This function processes the dictionary returned from a FOFA API query and
@@ -209,10 +214,9 @@ def _format_result_dict(
     parameter, which corresponds to the type of FOFA API endpoint queried.
 
     Note:
-        Currently, only the 'search' mode is fully implemented and functional.
-        The 'stats' and 'host' modes are not supported due to the complex,
-        nested structure of their respective API responses, and they will
-        raise an error , that is `NotImplementedError`.
+        All modes are implemented. 'stats' results are flattened into
+        `(field, name, count)` rows, and 'host' results into one row per
+        `(ip, port, protocol, product)`, see `_iter_host_rows`.
 
     Args:
         query_results: The raw dictionary object parsed from the FOFA API's
@@ -224,20 +228,19 @@ def _format_result_dict(
             which internal formatting logic to use. Defaults to 'search'.
             Must be one of 'search', 'stats', or 'host'.
         detail (bool, optional): A special flag for the 'host' mode to handle
-            detailed responses. This is currently not used as the 'host'
-            formatter is not implemented. Defaults to False.
+            detailed responses. This is currently not used, as detailed
+            responses are recognized by their 'ports' key. Defaults to False.
         api_source (str, optional): The source of the API.
             Defaults to 'fofa'. Could be one of 'fofa', 'fofoapi' or etc.
 
 
     Returns:
-        A `tablib.Dataset` instance containing the formatted data if the mode
-        is 'search' and results are present.
-        Returns `None` if the specified `mode` is 'stats' or 'host', as these
-        are not currently implemented.
+        A `tablib.Dataset` instance containing the formatted data.
     """
 
-    def _format_search_result_dict() -> tablib.Dataset:
+    tablib = _import_tablib()
+
+    def _format_search_result_dict() -> 'tablib.Dataset':
         """Formats the 'results' list from a search query."""
         data = tablib.Dataset()
         # Set the headers for the dataset using the provided mapping
@@ -247,19 +250,22 @@ def _format_result_dict(
             data.append(row)
         return data
 
-    def _format_stats_result_dict() -> None:
-        """
-        Placeholder for formatting statistical aggregation results.
-        Currently unimplemented due to complex, nested data structures.
-        """
-        raise NotImplementedError
+    def _format_stats_result_dict() -> 'tablib.Dataset':
+        """Flattens the 'aggs' buckets into `(field, name, count)` rows."""
+        data = tablib.Dataset()
+        data.headers = ['field', 'name', 'count']
+        for field, buckets in (query_results.get('aggs') or {}).items():
+            for bucket in buckets or []:
+                data.append((field, bucket.get('name', ''), bucket.get('count', 0)))
+        return data
 
-    def _format_host_result_dict() -> None:
-        """
-        Placeholder for formatting host aggregation results.
-        Currently unimplemented due to complex, nested data structures.
-        """
-        raise NotImplementedError
+    def _format_host_result_dict() -> 'tablib.Dataset':
+        """Normalizes a host response into one row per (ip, port, protocol, product)."""
+        data = tablib.Dataset()
+        data.headers = list(_host_table_fields)
+        for row in _iter_host_rows(query_results):
+            data.append(row)
+        return data
 
     # A dispatch table to call the correct formatting function based on mode.
     methods = {
@@ -285,6 +291,98 @@ _search_allowed_fields = set(
     'banner_fid', 'cname', 'lastupdatetime', 'product', 'product_category', 'product.version', 
     'icon_hash', 'cert.is_valid', 'cname_domain', 'body', 'cert.is_match', 'cert.is_qeual',
     'icon', 'fid', 'structinfo'])
+# A set of all fields that can appear in the conditions of a FOFA query.
+# Besides the result fields, queries accept filters that are never returned.
+_query_allowed_fields = _search_allowed_fields | set(
+    ['app', 'category', 'type', 'status_code', 'js_name', 'js_md5', 'sdk_hash',
+    'is_domain', 'is_ipv6', 'is_fraud', 'is_honeypot', 'is_cloud', 'cloud_name',
+    'after', 'before', 'port_size', 'port_size_gt', 'port_size_lt', 'ip_ports',
+    'ip_country', 'ip_region', 'ip_city', 'ip_after', 'ip_before', 'cert.subject',
+    'cert.issuer', 'cert.is_equal', 'cert.is_expired', 'parent_fid', 'country_code'])
+# Search fields whose values can be stored with a stronger type than `str`.
+# Every field missing from this mapping is treated as a plain string.
+_typed_fields = {
+    'ip': 'ip',
+    'port': 'int',
+    'asn': 'int',
+    'latitude': 'float',
+    'longitude': 'float',
+    'lastupdatetime': 'timestamp',
+    'cert.not_before': 'timestamp',
+    'cert.not_after': 'timestamp',
+}
+# Search fields with few distinct values, worth dictionary encoding.
+_categorical_fields = set(
+    ['country', 'country_name', 'region', 'city', 'protocol', 'base_protocol',
+    'server', 'os', 'org', 'product', 'product_category', 'asn', 'icp',
+    'tls.version', 'cert.issuer.org', 'cert.issuer.cn', 'cert.is_valid'])
+# 官方响应中时间字段的格式, e.g., "2022-05-23 15:00:00"
+_timestamp_format = '%Y-%m-%d %H:%M:%S'
+# Columns of the normalized host table, one row per (ip, port, protocol, product).
+_host_table_fields = (
+    'ip', 'port', 'protocol', 'product', 'category', 'host',
+    'asn', 'org', 'country_name', 'country_code', 'update_time',
+)
+
+def _iter_host_rows(host_response: dict):
+    """Yields the rows of the normalized host table for one host response.
+
+    A detailed response (with a 'ports' key) yields one row per product of
+    every port, or one row for a port without products. A plain response
+    does not pair its 'port', 'protocol' and 'product' lists, so it yields
+    one row per port with an empty protocol and product. A host without
+    any port still yields a single row holding its host-level fields.
+
+    Every cell is a string, in the order of `_host_table_fields`.
+    """
+    def _cell(value) -> str:
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return str(value).lower()
+        return str(value)
+    
+    # 主机级别的字段, 每一行都相同
+    ip = _cell(host_response.get('ip'))
+    shared = tuple(
+        _cell(host_response.get(field))
+        for field in ('host', 'asn', 'org', 'country_name', 'country_code')
+    )
+    update_time = _cell(host_response.get('update_time'))
+    
+    if 'ports' in host_response: # detail=True
+        ports = host_response.get('ports') or []
+        for entry in ports:
+            port = _cell(entry.get('port'))
+            protocol = _cell(entry.get('protocol'))
+            updated = _cell(entry.get('update_time')) or update_time
+            for product in entry.get('products') or [{}]:
+                yield (
+                    ip, port, protocol,
+                    _cell(product.get('product')), _cell(product.get('category')),
+                ) + shared + (updated, )
+    else:
+        ports = host_response.get('port') or []
+        for port in ports:
+            yield (ip, _cell(port), '', '', '') + shared + (update_time, )
+    if not ports:
+        yield (ip, '', '', '', '') + shared + (update_time, )
+# The maximum number of rows of one page for every search request, and the
+# smaller maximum for requests returning a resource-intensive field.
+_max_page_rows = 10000
+_field_page_limits = {
+    'body': 500,
+    'cert': 2000,
+    'banner': 2000,
+}
+
+def _max_page_size(fields) -> int:
+    """Returns the largest page size allowed for the requested `fields`."""
+    return min(
+        [_field_page_limits[field] for field in fields if field in _field_page_limits],
+        default=_max_page_rows
+    )
+
 # A set of all fields allowed in a FOFA statistical aggregation query.
 _stats_allowed_fields = set(
     ['protocol', 'domain', 'port', 'title', 'os', 'server', 'country', 'asn', 
@@ -344,10 +442,8 @@ def _check_query_fields_dict(mode: str, query_dict, translator = _):
         # Default value, indicating no special size limit.
         # Certain fields are resource-intensive and have smaller max result limits.
         # 计算是否存在交集, 只要交集不为空即可 # isdisjoint专门用来判断两个集合是否存在交集
-        if set(['cert', 'banner']) <= dict_keys:
-            fixed_size = 2000
-        elif set(['body']) <= dict_keys:
-            fixed_size = 500
+        if not _field_page_limits.keys().isdisjoint(dict_keys):
+            fixed_size = _max_page_size(dict_keys)
         # 如果fixed_size仍为-1，则无需在意; 
         # 如果查询参数的字典的键包含额外的字段，则抛出ParamsMisconfiguredrror,
         # 此时函数调用方需要检查参数是否合法, 毕竟多一个参数确实会导致请求异常
@@ -373,6 +469,7 @@ def _check_query_fields_dict(mode: str, query_dict, translator = _):
     return check_method[mode]()
 
 if __name__ == '__main__':
+    import tablib
     stats_response = {
   "error": False, # 是否出现错误
   "consumed_fpoint": 0, # 实际F点
@@ -49,6 +49,9 @@ class FofaConnectionError(FofaQueryException):
 class FofaRequestFailed(FofaQueryException):
     def __init__(self, message: str = "Request failed", *args, **kwargs):
         super().__init__(message, *args, **kwargs)
+class FofaRateLimited(FofaRequestFailed): # 请求过于频繁, 稍后可以重试
+    def __init__(self, message: str = "Too many requests, the rate limit of the API was exceeded", *args, **kwargs):
+        super().__init__(message, *args, **kwargs)
 class FofaQuerySyntaxError(FofaQueryException):
     def __init__(self, message: str = "Syntax error in query string", *args, **kwargs):
         super().__init__(message, *args, **kwargs)
@@ -0,0 +1,174 @@
+# 导入标准库
+import re
+from functools import lru_cache
+
+# 导入自定义模块
+from .etc import _, _query_allowed_fields
+from .builder import Node, Term, Raw, And, Or
+from .exceptions import FofaQuerySyntaxError
+
+# 词法单元: (类型, 正则表达式)
+# 运算符按长度从长到短排列, 保证==和!=不会被拆成=
+_token_patterns = [
+    ('space', r'\s+'),
+    ('and', r'&&'),
+    ('or', r'\|\|'),
+    ('lparen', r'\('),
+    ('rparen', r'\)'),
+    ('op', r'==|!=|=~|='),
+    ('string', r'"(?:[^"\\]|\\.)*"'),
+    ('name', r'[\w.\-]+'),
+]
+_token_pattern = re.compile(
+    '|'.join('(?P<{}>{})'.format(kind, pattern) for kind, pattern in _token_patterns)
+)
+_escape_pattern = re.compile(r'\\(.)')
+
+
+def _error(message: str, text: str, position: int) -> FofaQuerySyntaxError:
+    """Builds a syntax error with a translated `message` pointing at `position`."""
+    return FofaQuerySyntaxError(
+        message + ' ' + _('at position {position}: {excerpt}').format(
+            position=position, excerpt=text[position:position + 20] or _('end of query')
+        )
+    )
+
+
+def _tokenize(text: str) -> list:
+    """Splits a query into `(kind, value, position)` tokens."""
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _token_pattern.match(text, position)
+        if match is None:
+            if text[position] == '"':
+                raise _error(_('Unterminated string'), text, position)
+            raise _error(_('Unexpected character'), text, position)
+        kind = match.lastgroup
+        if kind != 'space':
+            tokens.append((kind, match.group(), position))
+        position = match.end()
+    tokens.append(('end', '', len(text)))
+    return tokens
+
+
+class _Parser:
+    """A recursive descent parser for the FOFA query syntax.
+
+    Grammar:
+        query  := and ('||' and)*
+        and    := unary ('&&' unary)*
+        unary  := '(' query ')' | term
+        term   := name op (string | name) | string
+    """
+    def __init__(self, text: str, check_fields: bool) -> None:
+        self.text = text
+        self.check_fields = check_fields
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    def peek(self) -> tuple:
+        return self.tokens[self.index]
+
+    def take(self, kind: str, message: str) -> tuple:
+        """Consumes a token of `kind`, or raises with the translated `message`."""
+        token = self.tokens[self.index]
+        if token[0] != kind:
+            raise _error(message, self.text, token[2])
+        self.index += 1
+        return token
+
+    def parse(self) -> Node:
+        if self.peek()[0] == 'end':
+            raise _error(_('Empty query'), self.text, 0)
+        node = self.query()
+        token = self.peek()
+        if token[0] == 'rparen':
+            raise _error(_('Unbalanced closing parenthesis'), self.text, token[2])
+        self.take('end', _('Expected "&&" or "||"'))
+        return node
+
+    def query(self) -> Node:
+        children = [self.conjunction()]
+        while self.peek()[0] == 'or':
+            self.index += 1
+            children.append(self.conjunction())
+        return Or(*children)
+
+    def conjunction(self) -> Node:
+        children = [self.unary()]
+        while self.peek()[0] == 'and':
+            self.index += 1
+            children.append(self.unary())
+        return And(*children)
+
+    def unary(self) -> Node:
+        kind, value, position = self.peek()
+        if kind == 'lparen':
+            self.index += 1
+            if self.peek()[0] == 'rparen':
+                raise _error(_('Empty parentheses'), self.text, position)
+            node = self.query()
+            self.take('rparen', _('Missing closing parenthesis'))
+            return node
+        if kind == 'string': # 不指定字段的全文检索, 例如"百度"
+            self.index += 1
+            return Raw(value)
+        if kind == 'name':
+            return self.term()
+        raise _error(_('Expected a condition'), self.text, position)
+
+    def term(self) -> Node:
+        __, field, position = self.take('name', _('Expected a field name'))
+        if self.check_fields and field not in _query_allowed_fields:
+            raise _error(_('Unknown query field: ') + field, self.text, position)
+        __, op, op_position = self.take('op', _('Expected an operator (=, ==, !=, =~)'))
+        kind, value, value_position = self.peek()
+        if kind == 'string':
+            value = _escape_pattern.sub(r'\1', value[1:-1])
+        elif kind == 'name' and value in ('true', 'false'):
+            value = value == 'true' # 不加引号的布尔值
+        else:
+            raise _error(_('Expected a quoted value'), self.text, value_position)
+        self.index += 1
+        try:
+            return Term(field, value, op)
+        except ValueError as e:
+            raise _error(str(e), self.text, op_position)
+
+
+@lru_cache(maxsize=1024)
+def _parse_query(text: str, check_fields: bool = True) -> Node:
+    """Parses and validates a FOFA query string offline.
+
+    Quotes and parentheses must be balanced, every condition must have the
+    form `field op "value"` (or be a bare quoted keyword), operators must be
+    one of `=`, `==`, `!=` and `=~`, and, with `check_fields`, every field
+    must be listed in `_query_allowed_fields`. Parsed queries are memoized.
+
+    Args:
+        text: The raw query string.
+        check_fields: Whether unknown field names are rejected.
+
+    Returns:
+        The query AST, whose `compile()` gives the canonical form.
+
+    Raises:
+        FofaQuerySyntaxError: If the query is malformed, with the position
+            of the first error.
+    """
+    return _Parser(text, check_fields).parse()
+
+
+def _query_node(query) -> Node:
+    """Returns the AST of a query node or string, for use as a canonical key.
+
+    Strings that cannot be parsed are kept verbatim as `Raw` nodes, so that
+    any query the server accepts still gets a stable key.
+    """
+    if isinstance(query, Node):
+        return query
+    try:
+        return _parse_query(query, check_fields=False)
+    except FofaQuerySyntaxError:
+        return Raw(query)
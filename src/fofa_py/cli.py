@@ -0,0 +1,281 @@
+"""The `fofa-py` command line interface.
+
+Usage:
+    fofa-py batch queries.txt --key KEY --concurrency 8 --rate 5 --output out/
+
+The `batch` mode reads one query per line, or JSON lines such as
+`{"query": "port=443", "fields": ["ip", "port"], "size": 500}`, runs them
+concurrently and streams the rows of every query as NDJSON or CSV, either
+to one file per query or to standard output. Queries larger than one page
+are fetched page by page, each page counting as one rate-limited request.
+A summary of the rows, the request latency percentiles and the cache hits
+is printed to standard error.
+"""
+# 导入标准库
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 导入自定义模块
+from .basic import _, _max_page_size, FofaConnectionError, FofaRateLimited
+from .factory import Fofa, FofaAssets, _official_api, _max_workers, _max_rows_per_query
+from .util import DiskCache
+
+_default_fields = ('host', 'ip', 'port', 'title')
+_retryable = (FofaConnectionError, FofaRateLimited) # 可以重试的网络错误和频率限制, 其余错误重试也不会成功
+_percentiles = (50, 90, 99)
+
+
+class _RateLimiter:
+    """Spaces the requests of all threads at least `1 / rate` seconds apart."""
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(self._next, time.monotonic())
+            self._next = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _read_queries(lines, fields: list, size: int) -> list:
+    """Parses query lines into `(query, fields, size)` tuples, skipping blanks and comments."""
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            item = json.loads(line)
+            queries.append((
+                item['query'], list(item.get('fields') or fields), int(item.get('size', size))
+            ))
+        else:
+            queries.append((line, list(fields), size))
+    return queries
+
+
+def _percentile(values: list, percent: float) -> float:
+    """Returns the nearest-rank percentile of the sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(int(round(percent / 100.0 * len(values))), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def _write_rows(file, format_: str, fields: list, rows, query: str = None, columns: list = None) -> None:
+    """Writes rows as NDJSON or CSV, tagged with their query when several queries share `file`.
+
+    With `columns`, the CSV header shared by all queries has already been
+    written, and every row is laid out under it, leaving the columns
+    missing from `fields` empty.
+    """
+    if query is not None:
+        fields = ['query'] + fields
+        rows = ((query, ) + tuple(row) for row in rows)
+    if format_ == 'csv':
+        writer = csv.writer(file)
+        if columns is None:
+            writer.writerow(fields)
+            writer.writerows(rows)
+            return
+        positions = [fields.index(column) if column in fields else None for column in columns]
+        writer.writerows(
+            ['' if position is None else row[position] for position in positions] for row in rows
+        )
+    else:
+        file.writelines(
+            json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n' for row in rows
+        )
+
+
+class _Batch:
+    """Runs the queries of one `batch` invocation and collects its statistics."""
+    def __init__(self, client: Fofa, args: argparse.Namespace) -> None:
+        self.client = client
+        self.args = args
+        self.limiter = _RateLimiter(args.rate)
+        self.cache = DiskCache(args.cache_dir, args.cache_ttl) if args.cache_dir else None
+        self.latencies = [] # 实际发出的请求的耗时
+        self.rows = 0
+        self.retries = 0
+        self.failed = 0
+        self.columns = None # 多个查询共用标准输出时, CSV表头的列
+        self._lock = threading.Lock() # 统计数据和标准输出由各线程共享
+
+    def _request(self, query: str, fields: list, size: int, page: int) -> dict:
+        """Sends one page request, retrying network errors and rate limits with exponential backoff."""
+        for attempt in range(self.args.retries + 1):
+            self.limiter.wait()
+            start = time.perf_counter()
+            try:
+                assets = self.client.fetch_search(
+                    query, fields, size=size, page=page, full=self.args.full
+                )
+            except _retryable:
+                if attempt == self.args.retries:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.args.backoff * 2 ** attempt)
+                continue
+            finally:
+                with self._lock:
+                    self.latencies.append(time.perf_counter() - start)
+            return assets.results
+
+    def _fetch(self, query: str, fields: list, size: int) -> dict:
+        """Fetches `size` rows one page at a time, so that every HTTP request is rate limited and timed."""
+        limit = min(_max_page_size(fields), _max_rows_per_query)
+        res = self._request(query, fields, min(size, limit), 1)
+        if size <= limit:
+            return res
+        res = dict(res)
+        results = list(res.get('results') or [])
+        page = 1
+        while len(results) < size and page * limit < res.get('size', 0):
+            page += 1
+            part = self._request(query, fields, limit, page)
+            results.extend(part.get('results') or [])
+            # 每一页单独计费, 合并后的响应报告所有页的F点之和
+            for key in ('consumed_fpoint', 'required_fpoints'):
+                if part.get(key) is not None:
+                    res[key] = res.get(key, 0) + part[key]
+        res['results'] = results[:size]
+        return res
+
+    def run_one(self, number: int, task: tuple) -> None:
+        query, fields, size = task
+        key = ('search', query, tuple(fields), size, self.args.full)
+        try:
+            try:
+                res = self.cache.get(key) if self.cache is not None else None
+            except KeyError:
+                res = None
+            if res is None:
+                res = self._fetch(query, fields, size)
+                if self.cache is not None:
+                    self.cache.put(key, res)
+            assets = FofaAssets(
+                query_results=res, mode='search', fields=fields, query_string=query
+            )
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                print(_('Query {number} failed: {query}: {error}').format(
+                    number=number, query=query, error=e
+                ), file=sys.stderr)
+            return
+        self._write(number, query, assets)
+
+    def _write(self, number: int, query: str, assets: FofaAssets) -> None:
+        format_ = self.args.format
+        if self.args.output:
+            path = os.path.join(self.args.output, '{:05d}.{}'.format(number, format_))
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                _write_rows(file, format_, assets.fields, assets._iter_rows())
+            with self._lock:
+                self.rows += len(assets)
+            return
+        with self._lock: # 每个查询的结果整块写出, 不与其他查询交错
+            _write_rows(sys.stdout, format_, assets.fields, assets._iter_rows(),
+                        query=query, columns=self.columns)
+            sys.stdout.flush()
+            self.rows += len(assets)
+
+    def summary(self, queries: int, elapsed: float) -> str:
+        latencies = sorted(self.latencies)
+        lines = [
+            _('queries: {queries}, failed: {failed}, rows: {rows}, elapsed: {elapsed:.2f} s').format(
+                queries=queries, failed=self.failed, rows=self.rows, elapsed=elapsed
+            ),
+            _('requests: {requests}, retries: {retries}, latency {percentiles}, max: {max:.3f} s').format(
+                requests=len(latencies), retries=self.retries, max=latencies[-1] if latencies else 0.0,
+                percentiles=', '.join(
+                    'p{}: {:.3f} s'.format(percent, _percentile(latencies, percent))
+                    for percent in _percentiles
+                ),
+            ),
+        ]
+        if self.cache is not None:
+            lines.append(_('cache hits: {hits}, misses: {misses}').format(
+                hits=self.cache.hits, misses=self.cache.misses
+            ))
+        return '\n'.join(lines)
+
+
+def _batch(args: argparse.Namespace) -> int:
+    key = args.key or os.environ.get('FOFA_KEY')
+    if not key:
+        print(_('The API key is empty. Please check the configuration'), file=sys.stderr)
+        return 2
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+    if args.input == '-':
+        queries = _read_queries(sys.stdin, fields, args.size)
+    else:
+        with open(args.input, encoding='utf-8') as file:
+            queries = _read_queries(file, fields, args.size)
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    client = Fofa(key=key, api=args.api, enable_log=args.verbose,
+                  log_level='DEBUG' if args.verbose else 'INFO')
+    batch = _Batch(client, args)
+    if args.format == 'csv' and not args.output:
+        # 所有查询写入同一个CSV, 只写一次表头, 列为各查询字段的并集
+        batch.columns = ['query'] + list(dict.fromkeys(
+            field for task in queries for field in task[1]
+        ))
+        csv.writer(sys.stdout).writerow(batch.columns)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(batch.run_one, range(1, len(queries) + 1), queries))
+    print(batch.summary(len(queries), time.perf_counter() - start), file=sys.stderr)
+    return 1 if batch.failed else 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='fofa-py', description='FOFA asset search from the command line')
+    commands = parser.add_subparsers(dest='command')
+    batch = commands.add_parser('batch', help='run a file of queries concurrently')
+    batch.add_argument('input', help='query file, one query or JSON object per line, "-" for stdin')
+    batch.add_argument('--key', help='API key, defaults to the FOFA_KEY environment variable')
+    batch.add_argument('--api', default=_official_api, help='API address')
+    batch.add_argument('--fields', default=','.join(_default_fields),
+                       help='default comma separated result fields')
+    batch.add_argument('--size', type=int, default=100, help='default number of rows per query')
+    batch.add_argument('--full', action='store_true', help='search all data instead of the last year')
+    batch.add_argument('--concurrency', type=int, default=_max_workers, help='concurrent queries')
+    batch.add_argument('--rate', type=float, default=0.0, help='maximum requests per second, 0 for no limit')
+    batch.add_argument('--retries', type=int, default=2, help='retries of a request failing on the network or rate limited')
+    batch.add_argument('--backoff', type=float, default=1.0, help='seconds before the first retry, doubled after each')
+    batch.add_argument('--cache-dir', help='directory caching responses across runs')
+    batch.add_argument('--cache-ttl', type=float, help='lifetime of cached responses in seconds')
+    batch.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson', help='output format')
+    batch.add_argument('--output', help='directory receiving one file per query, instead of stdout')
+    batch.add_argument('--verbose', action='store_true', help='log requests to stderr')
+    return parser
+
+
+def main(argv: list = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.command == 'batch':
+        return _batch(args)
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
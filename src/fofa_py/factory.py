@@ -1,26 +1,51 @@
 # 导入标准库
 # import gettext
+import csv
+import io
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from copy import copy
+from datetime import datetime, timedelta
+from itertools import compress, count
 
-# 导入第三方依赖
-try:
-    from loguru import logger
-    from cachetools import TTLCache
-    # from typing_extensions import Literal, Optional, Any
-except ImportError:
-    pass
-from dataclasses import field
-import tablib
-
+# 第三方依赖(loguru, cachetools, tablib)在第一次用到时才导入, 以加快导入速度
 # 导入自定义模块
 from .basic import _format_query_fields_dict, _format_result_dict, _check_query_fields_dict
-from .basic import _, sha256, now
+from .basic import _, sha256, now, _timestamp_format, _import_tablib
+from .basic import _typed_fields, _categorical_fields
+from .basic import _host_table_fields, _iter_host_rows
+from .basic import Node, Term, Raw, And, Or, after
+from .basic import _parse_query, _query_node, _exact_match_fields, _search_allowed_fields
+from .basic import _max_page_size
 from .basic import * # 导入异常类
 from .util import search_v2, stats_v2, host_v2
+from .util import _write_parquet, _read_parquet
+from .util import _take, _iter_values, _column_mask, _normalize_operand, TypedColumn, DictColumn
+from .util import SpillWriter, _estimate_bytes
+from .util import _plan_shards, _shard_facets
+from .util import HarvestJob, LazyLogger, Pipeline, BudgetScheduler, RecurringJob
+from .util import _default_chunk_rows, _picklable, _chunks, _pack, _map
+from .util import _mask_chunk, _decode_chunk, _export_chunk
 
 # 定义全局常量
 _official_api = "https://fofa.info" # 如果修改了api, 那么官方接口可能无法正常使用
 _cache_max_size = 32
 _cache_ttl = 60 * 10
+_max_rows_per_query = 10000 # 单个查询最多能取回的行数
+_max_workers = 4 # 并发请求的默认线程数
+_batch_size = 50 # 合并为一个请求的查询条数上限
+_max_query_length = 4096 # 合并后qbase64参数的长度上限, 避免URL过长
+# 合并结果时记录每行数据来自哪些查询的列名
+_provenance_field = 'query_what'
+# 按列存储、支持表格操作的结果模式
+_tabular_modes = ('search', 'stats', 'host')
+# stats接口结果展平后的列名
+_stats_table_fields = ('field', 'name', 'count')
+# 合并结果默认不溢出到磁盘, 需要时通过merge的参数开启
+_spill_rows = None
+_spill_bytes = None
 
 # 定义无用的空模块
 class FakeLogger:
@@ -65,6 +90,17 @@ _fake_cache = FakeCache() # 空的缓存器
 class Fofa:
     """Initializes the Fofa API client.
 
+    Concurrency:
+        One client can be shared by many threads. Every call returns its
+        result instead of relying on the instance: the `fields`, `results`
+        and `assets` attributes only hold the last call made by the current
+        thread. The response cache and the query history are guarded by a
+        lock, and the HTTP connection pool is shared. Two threads missing
+        the cache with the same query at the same time may both send the
+        request. A cache hit returns a new view of the cached result, so
+        adding or removing columns does not affect other callers, but the
+        column storage is shared and must not be modified in place.
+
         Args:
             key: The FOFA API key for authentication.
             api: The base URL for the FOFA API. It should not have a
@@ -73,8 +109,20 @@ class Fofa:
             headers: Default custom HTTP headers to be sent with every request.
             enable_log: If `True`, enables logging of errors and warnings.
             log_engine: The logging engine to use if logging is enabled.
-                Defaults to the pre-configured logger.
+                Defaults to the loguru logger, imported on demand.
+            log_level: The lowest level logged, 'DEBUG' (default, every
+                message the engine accepts), 'INFO', 'WARNING' or 'ERROR'.
+                Messages below it are never translated or formatted (see
+                `LazyLogger`).
+            log_sample: Log only one in every `log_sample` debug lines.
             enable_cache: (Not yet implemented) Flag to enable response caching.
+            enable_decode: If `True`, search results are decoded into compact
+                typed columns (see `FofaAssets.decode`).
+            enable_encode: If `True`, low-cardinality columns of search results
+                are dictionary encoded (see `FofaAssets.encode`).
+            enable_validate: If `True`, query strings are parsed and validated
+                offline before they are sent, and malformed queries raise
+                `FofaQuerySyntaxError` without spending a request.
         """
     def __init__(self,
                  # API配置
@@ -87,12 +135,17 @@ class Fofa:
                  # proxy: dict = None, # 代理 # 暂时不支持
                  # 模块注册
                  enable_log: bool = True, # 是否启用日志
-                 log_engine = logger, # 日志引擎
+                 log_engine = None, # 日志引擎, 默认为loguru的logger
+                 log_level: str = 'DEBUG', # 最低的日志级别, 低于它的日志不会被格式化
+                 log_sample: int = 1, # 每n条debug日志只输出1条
                  enable_cache: bool = False, # 是否启用缓存
                  cache_max_size: int = _cache_max_size, # 缓存大小 32个对象
                  cache_ttl: int = _cache_ttl, # 10 分钟
                  enable_format: bool = False, # 是否启用自动数据整理
                  # 若不启用则无法使用后续的魔术方法重载效果
+                 enable_decode: bool = False, # 是否将search结果解码为强类型的列
+                 enable_encode: bool = False, # 是否对search结果中的低基数列进行字典编码
+                 enable_validate: bool = False, # 是否在发送请求前离线检查查询语法
                  ) -> None:
         """Executes a standard asset search and returns a results container.
 
@@ -138,10 +191,15 @@ class Fofa:
         if not enable_log:
             self._log_engine = _fake_logger
         else:
-            self._log_engine = log_engine
+            if log_engine is None:
+                from loguru import logger as log_engine
+            # 日志消息可以是返回字符串的函数, 只有在需要输出时才翻译和格式化
+            self._log_engine = LazyLogger(log_engine, level=log_level, sample=log_sample)
         self._enable_cache = enable_cache
         if enable_cache:
+            from cachetools import TTLCache
             self.cache = TTLCache(maxsize=cache_max_size, ttl=cache_ttl)
+            self._cache_index = count(1) # 缓存条目的编号, 多线程下也不会重复
             '''
             - 使用查询字符串、返回值字段、size和page计算得到的sha256作为key
                 - mode: str = 'search' 或 'stats' 或 'host'
@@ -149,20 +207,73 @@ class Fofa:
                 - query_string, 查询字符串
                 - assets, FofaAssets对象的__repr__
             '''
-            self.dashboard = tablib.Dataset()
+            self.dashboard = _import_tablib().Dataset()
             # 也是开了缓存才能这样做
             self.dashboard.headers = ['index', 'mode', 'queried_at', 'query_what', 'assets_repr']
         self._enable_format = enable_format
+        self._enable_decode = enable_decode
+        self._enable_encode = enable_encode
+        self._enable_validate = enable_validate
         
         # 注册函数
         self._format_query_dict = _format_query_fields_dict
         self._format_result_dict = _format_result_dict
         self._check_query_dict = _check_query_fields_dict
         
-        # 注册一些公共字段
-        self.fields = [] # 查询结果的列名
-        self.results = {} # 原始查询结果, json_loads之后的对象
-        self.assets = None # tablib数据表
+        # TTLCache和查询历史不是线程安全的, 读写都要加锁
+        self._cache_lock = threading.RLock()
+        self._session = None # 按需创建的requests.Session, 各线程共用一个连接池
+        # 每个线程最近一次调用的fields, results和assets
+        self._local = threading.local()
+    
+    # 公共字段只保存当前线程最近一次调用的结果, 多个线程共用实例时互不干扰
+    @property
+    def fields(self) -> list:
+        """The result fields of the last call made by the current thread."""
+        return getattr(self._local, 'fields', [])
+    
+    @fields.setter
+    def fields(self, value):
+        self._local.fields = value
+    
+    @property
+    def results(self) -> dict:
+        """The raw response of the last call made by the current thread."""
+        return getattr(self._local, 'results', {})
+    
+    @results.setter
+    def results(self, value):
+        self._local.results = value
+    
+    @property
+    def assets(self):
+        """The `FofaAssets` of the last call made by the current thread."""
+        return getattr(self._local, 'assets', None)
+    
+    @assets.setter
+    def assets(self, value):
+        self._local.assets = value
+    
+    def _http_session(self):
+        """Returns the shared `requests.Session`, creating it on first use."""
+        if self._session is None:
+            with self._cache_lock:
+                if self._session is None:
+                    import requests
+                    self._session = requests.Session()
+        return self._session
+    
+    def _cache_get(self, hash: str) -> tuple:
+        """Returns the cache entry of `hash`, raising `KeyError` on a miss."""
+        with self._cache_lock:
+            return self.cache[hash]
+    
+    def _cache_put(self, hash: str, mode: str, query: str, assets: 'FofaAssets') -> None:
+        """Caches `assets` and records it in the query history."""
+        with self._cache_lock:
+            entry = next(self._cache_index), mode, now(), query, assets
+            self.cache[hash] = entry
+            self.dashboard.append(entry)
 
     
     # 参数和__init__一致
@@ -202,12 +313,13 @@ class Fofa:
         a flexible and clean way to customize the query.
 
         Upon completion, this method updates the instance's `self.results`
-        (raw data) and `self.assets` (`FofaAssets` object) attributes with the
-        newest data.
+        (raw data) and `self.assets` (`FofaAssets` object) attributes of the
+        calling thread with the newest data.
 
         Args:
             query_string: The raw, unencoded FOFA search query string (e.g.,
-                'domain="example.com"'). This takes precedence over `query_dict`.
+                'domain="example.com"'), or a query built with `Field`, `And`,
+                `Or` and `Not`. This takes precedence over `query_dict`.
             query_dict: A dictionary of search criteria, used only if
                 `query_string` is empty. The method will validate and format
                 this dictionary into a valid query string.
@@ -217,7 +329,14 @@ class Fofa:
                 - fields (List[str]): Result fields to retrieve. Defaults to
                   `['link', 'ip', 'port']`.
                 - size (int): Number of results to return. Defaults to 100.
-                - page (int): The page number for pagination. Defaults to 1.
+                  If it exceeds the page size allowed for the requested
+                  fields (500 with `body`, 2000 with `cert` or `banner`,
+                  otherwise 10000), the pages are fetched concurrently and
+                  stitched together.
+                - page (int): The page number for pagination, in units of
+                  `size`. Defaults to 1.
+                - max_workers (int): The number of concurrent page requests.
+                  Defaults to 4.
                 - full (bool): Set to `True` to search all data within the
                   last year. Defaults to `False`.
                 - timeout (int): Request timeout in seconds.
@@ -231,9 +350,16 @@ class Fofa:
         Raises:
             ParamsMisconfiguredError: If both `query_string` and `query_dict`
                 are empty, as no query can be performed.
+            FofaQuerySyntaxError: If `enable_validate` is set and
+                `query_string` is malformed.
         """
+        if isinstance(query_string, Node): # 查询构造器生成的语法树
+            query_string = query_string.compile()
+        elif self._enable_validate and query_string != '':
+            _parse_query(query_string) # 语法错误直接抛出, 不发送请求
         # 首先检查查询字符串是否为空, 如果不为空那么直接传入
-        size = kwargs.get('size', 100)
+        max_workers = kwargs.pop('max_workers', _max_workers) # 并发请求分页的线程数
+        page_limit = _max_rows_per_query # 单页最多的行数
         if query_string == '':
             # 如果为空, 那么尝试根据query_dict生成查询字符串
             if query_dict == {}: # 如果query_dict也为空, 那么直接报错
@@ -246,10 +372,11 @@ class Fofa:
                 mode='search',
                 query_dict=query_dict
                 ) # 这里也会抛出异常
-            if fixed_size != -1 and size >= fixed_size:
+            if fixed_size != -1:
                 # 根据fofa文档官方要求, 如果出现了特殊字段
-                # 那么最大查询条数也是要相应做出修改的
-                kwargs['size'] = fixed_size # 修正size最大值
+                # 那么单页的最大查询条数也是要相应做出修改的
+                # 超出的部分由_search_pages分页请求, 不再直接截断size
+                page_limit = fixed_size
             
             # 生成格式化查询字符串
             query_string = self._format_query_dict(query_dict)
@@ -269,39 +396,45 @@ class Fofa:
              kwargs.get('size', 1), kwargs.get('page', 1))
         )
         assets = None
-        try:
-            idx, mode, at, query, assets = self.cache[hash]
-            # 这个__表示查询字符串, 这里是为了防止干扰上面的query_string
-            # 使用format模板字符串, 确保gettext正确识别文本
-            self._log_engine.info(_(
-                "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
+        if self._enable_cache: # 未启用缓存时不查询, 也不构造未命中的日志
+            try:
+                idx, mode, at, query, assets = self._cache_get(hash)
+                assets = assets._view(assets._rows) # 返回新的视图, 调用方增删列互不影响
+                self.results = assets.results # 命中时同样更新本线程的原始结果
+                # 这个__表示查询字符串, 这里是为了防止干扰上面的query_string
+                # 使用format模板字符串, 确保gettext正确识别文本
+                self._log_engine.info(lambda: _(
+                    "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
                     asset query step will be skipped",
-            ).format(assets=assets, mode=mode, at=at, query=query))
-        except Exception as e:
-            self._log_engine.debug(_(
-                "cache miss: {error}, hash: {hash}. asset query steps will be performed",
-            ).format(error=e, hash=hash))
+                ).format(assets=assets, mode=mode, at=at, query=query))
+            except KeyError as e:
+                error = e # except结束时e会被解除绑定, 延迟执行的日志需要另存
+                self._log_engine.debug(lambda: _(
+                    "cache miss: {error}, hash: {hash}. asset query steps will be performed",
+                ).format(error=error, hash=hash))
 
         if assets is None or not self._enable_cache:
             res = None
             kwargs['url'] = self._search_url
             kwargs['logger'] = self._log_engine
             kwargs['translator'] = _ # 国际化接口
+            kwargs['session'] = self._http_session()
             kwargs['fields'] = fields
             try:
-                self._log_engine.debug(_(
+                self._log_engine.debug(lambda: _(
                     "Executing search with query string: {query_string}, \
                         fields: {fields}"
                 ).format(
                     query_string=query_string,
                     fields=fields,
                 ))
-                res = search_v2(
-                    apikey=self._apikey,
-                    query_string=query_string,
+                res = self._search_pages(
+                    query_string,
+                    page_limit=page_limit,
+                    max_workers=max_workers,
                     **kwargs
                 )
-                self._log_engine.info(_(
+                self._log_engine.info(lambda: _(
                     "Search completed with {size} results"
                 ).format(size=res.get('size', 0)))
             except Exception as e:
@@ -312,20 +445,24 @@ class Fofa:
                 assets = FofaAssets(
                     query_results=res,
                     mode='search',
-                    fields=self.fields,
+                    fields=fields,
                     query_string=query_string
                 )
-                self._log_engine.info(_(
+                if self._enable_decode:
+                    assets.decode()
+                if self._enable_encode:
+                    assets.encode()
+                self._log_engine.info(lambda: _(
                     "FofaAssets object created with {size} assets"
                 ).format(size=len(assets)))
-                new_cache = len(self.cache) + 1, 'search', now(), query_string, assets
-                self.cache[hash] = new_cache
-                self.dashboard.append(new_cache)
+                if self._enable_cache:
+                    self._cache_put(hash, 'search', query_string, assets)
+                    assets = assets._view(assets._rows) # 缓存保留原对象, 调用方拿到独立的视图
             except Exception as e:
                 self._log_engine.error(e)
         else:
             pass
-   
+        self.assets = assets
         return assets
     
     def stats(self, 
@@ -347,12 +484,14 @@ class Fofa:
         All optional parameters for the API call (e.g., `fields`, `timeout`)
         are passed via `**kwargs`, offering a flexible way to configure the request.
 
-        The method updates `self.results` and `self.assets` and returns a
+        The method updates `self.results` and `self.assets` of the calling
+        thread and returns a
         `FofaAssets` object configured in 'stats' mode.
 
         Args:
             query_string: The raw FOFA search query to define the asset scope
-                for aggregation. Takes precedence over `query_dict`.
+                for aggregation, or a query built with `Field`, `And`, `Or`
+                and `Not`. Takes precedence over `query_dict`.
             query_dict: A dictionary of search criteria to build a query from,
                 used only if `query_string` is empty.
             **kwargs: Arbitrary keyword arguments passed to the underlying
@@ -364,17 +503,25 @@ class Fofa:
                 - proxies (dict): A dictionary of proxies for the request.
 
         Returns:
-            A `FofaAssets` object in 'stats' mode, which provides dict-like
-            access to the raw aggregation data. Returns `None` if the API call fails.
+            A `FofaAssets` object in 'stats' mode, holding the aggregation
+            buckets as a `(field, name, count)` table. Returns `None` if the
+            API call fails.
 
         Raises:
             ParamsMisconfiguredError: If both `query_string` and `query_dict`
                 are empty.
+            FofaQuerySyntaxError: If `enable_validate` is set and
+                `query_string` is malformed.
         """
         res = None
         kwargs['url'] = self._stats_url
         kwargs['logger'] = self._log_engine
         kwargs['translator'] = _ # 国际化接口
+        kwargs['session'] = self._http_session()
+        if isinstance(query_string, Node): # 查询构造器生成的语法树
+            query_string = query_string.compile()
+        elif self._enable_validate and query_string != '':
+            _parse_query(query_string) # 语法错误直接抛出, 不发送请求
         
         # 检查查询字符串是否为空, 若不为空, 那么不会修改查询字符串的内容
         # 若为空, 则尝试根据查询dict的内容生成格式化查询字符串
@@ -388,73 +535,76 @@ class Fofa:
                         which prevents the query from being executed")
                 )
             # 如果不为空, 那么接下来判断query_dict是否有意料之外的字段
-            fixed_size = self._check_query_dict(
+            # stats接口没有分页, 不需要修正单页的最大条数
+            self._check_query_dict(
                 mode='stats',
                 query_dict=query_dict
                 ) # 这里也会抛出异常
-            if fixed_size != -1 and size >= fixed_size:
-                # 根据fofa文档官方要求, 如果出现了特殊字段
-                # 那么最大查询条数也是要相应做出修改的
-                size = fixed_size # 修正size最大值
             
             # 生成格式化查询字符串
             query_string = self._format_query_dict(query_dict)
             
-        self.fields = kwargs.pop('fields', ['title'])
-        if self.fields == []:
-            self.fields = ['title']
+        fields = kwargs.pop('fields', ['title'])
+        if fields == []:
+            fields = ['title']
+        self.fields = fields
             
         hash = sha256(
-            ('stats', query_string, self.fields)
+            ('stats', query_string, fields)
         )
         assets = None
-        try:
-            idx, mode, at, __, assets = self.cache[hash]
-            self._log_engine.info(_(
-                "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
+        if self._enable_cache: # 未启用缓存时不查询, 也不构造未命中的日志
+            try:
+                idx, mode, at, __, assets = self._cache_get(hash)
+                assets = assets._view(assets._rows) # 返回新的视图, 调用方增删列互不影响
+                self.results = assets.results # 命中时同样更新本线程的原始结果
+                self._log_engine.info(lambda: _(
+                    "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
                     asset query step will be skipped",
-            ).format(assets=assets, mode=mode, at=at, query=query_string))
-        except Exception as e:
-            self._log_engine.debug(_(
-                "cache miss: {error}, hash: {hash}. asset query steps will be performed",
-            ).format(error=e, hash=hash))
+                ).format(assets=assets, mode=mode, at=at, query=query_string))
+            except KeyError as e:
+                error = e # except结束时e会被解除绑定, 延迟执行的日志需要另存
+                self._log_engine.debug(lambda: _(
+                    "cache miss: {error}, hash: {hash}. asset query steps will be performed",
+                ).format(error=error, hash=hash))
         
         if assets is None or not self._enable_cache:    
             try:
-                self._log_engine.debug(_(
+                self._log_engine.debug(lambda: _(
                     "Executing stats with query_string: {query_string}, \
                         fields: {fields}"
                 ).format(
                     query_string=query_string,
-                    fields=self.fields,
+                    fields=fields,
                 ))
-                self.results = stats_v2(
+                res = stats_v2(
                     apikey=self._apikey,
                     query_string=query_string,
-                    fields=self.fields,
+                    fields=fields,
                     **kwargs
                     )
-                self._log_engine.info(_(
+                self._log_engine.info(lambda: _(
                     "Stats query completed"
                 ))
             except Exception as e:
                 self._log_engine.error(e)
+            self.results = res
 
             try:
                 assets = FofaAssets(
-                    query_results=self.results,
+                    query_results=res,
                     mode='stats',
                     query_string=query_string
                 )
-                self._log_engine.info(_(
+                self._log_engine.info(lambda: _(
                     "FofaAssets object at 'stats' mode created successfully"
                 ))
-                new_cache = len(self.cache) + 1, 'stats', now(), query_string, assets
-                self.cache[hash] = new_cache
-                self.dashboard.append(new_cache)
+                if self._enable_cache:
+                    self._cache_put(hash, 'stats', query_string, assets)
+                    assets = assets._view(assets._rows) # 缓存保留原对象, 调用方拿到独立的视图
             except Exception as e:
                 self._log_engine.error(e)
-        
+        self.assets = assets
         return assets
     
     def host(self,
@@ -474,7 +624,8 @@ class Fofa:
         Optional request parameters like `timeout` and `headers` can be passed
         flexibly via `**kwargs`.
 
-        The method updates `self.results` and `self.assets` and returns a
+        The method updates `self.results` and `self.assets` of the calling
+        thread and returns a
         `FofaAssets` object configured in 'host' mode.
 
         Args:
@@ -489,32 +640,37 @@ class Fofa:
                 - proxies (dict): A dictionary of proxies for the request.
 
         Returns:
-            A `FofaAssets` object in 'host' mode, which provides dict-like
-            access to the detailed host data. Returns `None` if the API call fails.
+            A `FofaAssets` object in 'host' mode, holding one row per
+            `(ip, port, protocol, product)`. Returns `None` if the API call fails.
         """
         res = None
-        kwargs['url'] = self._host_url.format(host)
+        kwargs['url'] = self._host_url.format(host=host)
         kwargs['logger'] = self._log_engine
         kwargs['translator'] = _
+        kwargs['session'] = self._http_session()
         
         hash = sha256(
             ('host', host, detail)
         )
         assets = None
-        try:
-            idx, mode, at, __, assets = self.cache[hash]
-            self._log_engine.info(_(
-                "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
+        if self._enable_cache: # 未启用缓存时不查询, 也不构造未命中的日志
+            try:
+                idx, mode, at, __, assets = self._cache_get(hash)
+                assets = assets._view(assets._rows) # 返回新的视图, 调用方增删列互不影响
+                self.results = assets.results # 命中时同样更新本线程的原始结果
+                self._log_engine.info(lambda: _(
+                    "cache hit: {assets}, mode: {mode}, at: {at}, query: {query}. \
                     asset query step will be skipped",
-            ).format(assets=assets, mode=mode, at=at, query=host))
-        except Exception as e:
-            self._log_engine.debug(_(
-                "cache miss: {error}, hash: {hash}. asset query steps will be performed",
-            ).format(error=e, hash=hash))
+                ).format(assets=assets, mode=mode, at=at, query=host))
+            except KeyError as e:
+                error = e # except结束时e会被解除绑定, 延迟执行的日志需要另存
+                self._log_engine.debug(lambda: _(
+                    "cache miss: {error}, hash: {hash}. asset query steps will be performed",
+                ).format(error=error, hash=hash))
 
         if assets is None or not self._enable_cache:
             try:
-                self._log_engine.debug(_(
+                self._log_engine.debug(lambda: _(
                     "Executing host with host: {host}, detail: {detail}"
                 ).format(
                     host=host,
@@ -525,7 +681,7 @@ class Fofa:
                     detail=detail,
                     **kwargs
                 )
-                self._log_engine.info(_(
+                self._log_engine.info(lambda: _(
                     "Host query completed"
                 ))
             except Exception as e:
@@ -537,26 +693,738 @@ class Fofa:
                     mode='host',
                     query_string=f'host="{host}"'
                 )
-                self._log_engine.info(_(
+                self._log_engine.info(lambda: _(
                     "FofaAssets object in 'host' mode created successfully"
                 ))
-                new_cache = len(self.cache) + 1, 'host', now(), host, assets
-                self.cache[hash] = new_cache
-                self.dashboard.append(new_cache)
+                if self._enable_cache:
+                    self._cache_put(hash, 'host', host, assets)
+                    assets = assets._view(assets._rows) # 缓存保留原对象, 调用方拿到独立的视图
             except Exception as e:
                 self._log_engine.error(e)
 
         self.fields = kwargs.get('fields', [])
+        self.assets = assets
+        return assets
+    
+    def fetch_search(self,
+                     query_string: str, # 查询字符串或语法树节点
+                     fields: list,
+                     **kwargs, # 传给search_v2的参数, 如size, page, full, timeout
+                     ) -> 'FofaAssets':
+        """Runs one search, without caching or logging.
+
+        Unlike `search`, errors are raised instead of logged, so that the
+        callers running many requests can tell failed requests apart and
+        retry them. The per-thread `results` and `assets` are not updated.
+
+        Args:
+            query_string: The raw FOFA query string, or a query node built
+                with `Field`, `And`, `Or` and so on.
+            fields: The result fields.
+            **kwargs: The search options of `search`, such as `size`,
+                `page`, `full` and `timeout`.
+
+        Returns:
+            A `FofaAssets` object in 'search' mode.
+
+        Raises:
+            FofaConnectionError: If the request could not be sent.
+            FofaRateLimited: If the API rejected the request for its rate.
+            FofaRequestFailed: If the API returned any other error.
+        """
+        if isinstance(query_string, Node): # 查询构造器生成的语法树
+            query_string = query_string.compile()
+        kwargs['url'] = self._search_url
+        kwargs['logger'] = self._log_engine
+        kwargs['translator'] = _
+        kwargs['session'] = self._http_session()
+        res = self._search_pages(query_string, fields=fields, **kwargs)
+        return FofaAssets(
+            query_results=res,
+            mode='search',
+            fields=fields,
+            query_string=query_string
+        )
+    
+    def _search_pages(self,
+                      query_string: str,
+                      size: int = 100, # 需要的总行数
+                      page: int = 1, # 以size为单位的页码
+                      page_limit: int = _max_rows_per_query, # 额外的单页行数上限
+                      max_workers: int = _max_workers,
+                      **kwargs, # 传给search_v2的其余参数, 必须包括fields
+                      ) -> dict:
+        """Fetches `size` rows of a query, split into pages the API accepts.
+
+        The page size is the largest one allowed for the requested `fields`
+        (500 rows with `body`, 2000 with `cert` or `banner`, otherwise 10000)
+        and `page_limit`. The first page is fetched alone to learn the total
+        number of assets, then only the pages that can hold rows are fetched
+        concurrently, and their rows are stitched together in order. When
+        `page` is not 1, the full pages covering rows `(page - 1) * size` to
+        `page * size` are fetched and the requested rows are cut out locally.
+
+        Returns:
+            The response of the first page, with the requested `results` and
+            the `consumed_fpoint` and `required_fpoints` summed over all pages.
+        """
+        limit = min(_max_page_size(kwargs.get('fields', [])), page_limit)
+        if size <= limit:
+            return search_v2(
+                apikey=self._apikey, query_string=query_string,
+                size=size, page=page, **kwargs
+            )
+        # 第page页是第(page-1)*size行起的size行, 取回覆盖这些行的整页后在本地截取
+        offset = (page - 1) * size
+        first = offset // limit + 1
+        pages = range(first, (offset + size - 1) // limit + 2)
         
+        def _fetch(number: int) -> dict:
+            return search_v2(
+                apikey=self._apikey, query_string=query_string,
+                size=limit, page=number, **kwargs
+            )
+        head = _fetch(pages[0])
+        total = head.get('size', 0)
+        rest = [number for number in pages[1:] if (number - 1) * limit < total]
+        self._log_engine.debug(lambda: _(
+            "Fetching {count} pages of {step} rows concurrently"
+        ).format(count=len(rest) + 1, step=limit))
+        parts = [head]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            parts.extend(executor.map(_fetch, rest))
+        results = [row for part in parts for row in part.get('results') or []]
+        head = dict(head)
+        start = offset - (first - 1) * limit
+        head['results'] = results[start:start + size]
+        # 每一页单独计费, 合并后的响应报告所有页的F点之和
+        for key in ('consumed_fpoint', 'required_fpoints'):
+            costs = [part[key] for part in parts if part.get(key) is not None]
+            if costs:
+                head[key] = sum(costs)
+        return head
+    
+    def _count(self, query_string: str, facet: str = None, **kwargs) -> tuple:
+        """Returns the total size of a query and the buckets of `facet`."""
+        kwargs['url'] = self._stats_url
+        kwargs['logger'] = self._log_engine
+        kwargs['translator'] = _
+        kwargs['session'] = self._http_session()
+        res = stats_v2(
+            apikey=self._apikey,
+            query_string=query_string,
+            fields=[facet or _shard_facets[0]], # 只需要总数时随便统计一个字段
+            **kwargs
+        )
+        buckets = []
+        if facet is not None:
+            buckets = [
+                (bucket.get('name'), bucket.get('count', 0))
+                for bucket in (res.get('aggs') or {}).get(facet) or []
+            ]
+        return res.get('size', 0), buckets
+    
+    def plan_shards(self,
+                    query_string,
+                    cap: int = _max_rows_per_query, # 每个子查询最多取回的行数
+                    facets: list = _shard_facets, # 依次用来拆分的字段
+                    since = None, # 按时间窗口拆分的起始日期
+                    max_workers: int = _max_workers, # 并发统计的线程数
+                    **kwargs, # 传给stats_v2的参数, 如timeout, proxies
+                    ) -> list:
+        """Splits a query into disjoint sub-queries that each fit under `cap`.
+
+        Only cheap stats calls are made: every call returns the total size of
+        a sub-query together with its top buckets on the next facet, and
+        the stats calls of one planning level run concurrently. See
+        `_plan_shards` for the splitting strategy.
+
+        Args:
+            query_string: The query to split, a string or a query node.
+            cap: The maximum number of rows one sub-query may return.
+                Defaults to 10000.
+            facets: The exact valued stats fields to split on, in order.
+                Defaults to `('country', 'port', 'protocol', 'asn')`.
+            since: A `datetime.date`. When all facets are used up, a
+                sub-query still above `cap` is bisected into day windows
+                between `since` and today. `None` (default) disables this.
+            max_workers: The number of concurrent stats calls.
+            **kwargs: Request options passed to `stats_v2`.
+
+        Returns:
+            A list of `Shard` objects. A shard with `complete=False` could not
+            be split below `cap`.
+        """
+        if not isinstance(query_string, Node):
+            query_string = Raw(query_string)
+        
+        def _stats(node, facet) -> tuple:
+            return self._count(node.compile(), facet, **kwargs)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return _plan_shards(
+                _stats, query_string, cap,
+                facets=facets, since=since, map_=executor.map
+            )
+    
+    def search_sharded(self,
+                       query_string,
+                       fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                       cap: int = _max_rows_per_query,
+                       facets: list = _shard_facets,
+                       since = None,
+                       key = ('ip', 'port'), # 合并去重时使用的键
+                       max_workers: int = _max_workers,
+                       **kwargs, # 传给stats_v2和search_v2的请求参数
+                       ) -> 'FofaAssets':
+        """Harvests a query beyond the per-query row cap by sharding it.
+
+        The query is split with `plan_shards`, every shard is fetched with one
+        search request of exactly its size, concurrently, and the rows are
+        merged and deduplicated on `key`.
+
+        Args:
+            query_string: The query to harvest, a string or a query node.
+            fields: The result fields. The fields of `key` are added if
+                missing, since they are needed to deduplicate.
+            cap: The maximum number of rows one request may return.
+            facets: The fields to split on, see `plan_shards`.
+            since: The first day of the time windows, see `plan_shards`.
+            key: The field or fields identifying a row when merging.
+            max_workers: The number of concurrent requests.
+            **kwargs: Request options such as `timeout`, `proxies`,
+                `headers`. `full` is only passed to the search requests.
+
+        Returns:
+            A `FofaAssets` object holding the merged rows of all shards, or
+            an empty one if the query matches nothing. Shards that could not
+            be split below `cap` are logged as warnings and truncated.
+        """
+        full = kwargs.pop('full', False)
+        keys = (key, ) if isinstance(key, str) else tuple(key)
+        fields = list(fields) + [field for field in keys if field not in fields]
+        shards = self.plan_shards(
+            query_string, cap=cap, facets=facets, since=since,
+            max_workers=max_workers, **kwargs
+        )
+        for shard in shards:
+            if not shard.complete:
+                self._log_engine.warning(lambda: _(
+                    "Shard {query} has {size} assets and could not be split, \
+                        only {cap} of them will be fetched"
+                ).format(query=shard.query, size=shard.size, cap=cap))
+        self._log_engine.info(lambda: _(
+            "Query planned into {count} shards"
+        ).format(count=len(shards)))
+        
+        def _fetch(shard):
+            return self.fetch_search(
+                shard.query.compile(), fields,
+                size=min(shard.size, cap), full=full, **kwargs
+            )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            parts = list(executor.map(_fetch, shards))
+        if not parts:
+            return FofaAssets._from_columns(
+                fields, [[] for __ in fields], query_string=str(query_string)
+            )
+        assets = parts[0].merge(*parts[1:], key=key)
+        assets.query_what = str(query_string) # 各分片的查询记录在query_what列中
+        if self._enable_decode:
+            assets.decode()
+        if self._enable_encode:
+            assets.encode()
         return assets
     
+    def search_batch(self,
+                     queries: list, # 查询字符串或语法树节点
+                     fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                     size: int = 100, # 每个查询最多返回的行数
+                     batch_size: int = _batch_size,
+                     max_query_length: int = _max_query_length,
+                     max_workers: int = _max_workers,
+                     **kwargs, # 传给search_v2的请求参数
+                     ) -> dict:
+        """Runs many small queries with few requests by OR-batching them.
+
+        Compatible queries are packed into `q1||q2||...` requests, up to
+        `batch_size` queries and `max_query_length` characters of `qbase64`
+        per request. The fields needed to evaluate every query are requested
+        as well, and the rows of a batch are attributed back to each query
+        locally: with a hash lookup for exact terms, otherwise with
+        `Node.evaluate`. If a batch is truncated, the queries that received
+        fewer than `size` rows are requested again, and a batch failing with
+        a syntax error is split in half and retried, so one bad or large
+        query cannot spoil the others.
+
+        A query is compatible if it is a query node, or a string that
+        `_parse_query` understands, and all of its fields can be returned by
+        the search API. Other queries, e.g. full text keywords, are sent on
+        their own. With `enable_validate`, malformed queries are not sent at
+        all and map to `None`.
+
+        Args:
+            queries: The queries, as strings or query nodes. Duplicates are
+                only requested once.
+            fields: The result fields of every query.
+            size: The maximum number of rows per query.
+            batch_size: The maximum number of queries per request.
+            max_query_length: The maximum length of the Base64 encoded query
+                of one request.
+            max_workers: The number of concurrent requests.
+            **kwargs: Request options passed to `search_v2`, e.g. `timeout`.
+
+        Returns:
+            A dictionary mapping every query, as given, to a `FofaAssets`
+            object holding its rows, or to `None` if its request failed.
+        """
+        fields = list(fields)
+        nodes = {} # 原始查询 -> 语法树节点, 无法合并的查询为None
+        rejected = set() # 没有通过语法检查的查询
+        for query in queries:
+            if isinstance(query, Node):
+                node = query
+            else:
+                try:
+                    node = _parse_query(query, check_fields=self._enable_validate)
+                except FofaQuerySyntaxError as e:
+                    if self._enable_validate:
+                        self._log_engine.error(e)
+                        rejected.add(query)
+                    node = None
+            if node is not None and not node.fields() <= _search_allowed_fields:
+                node = None # 有无法返回的字段, 不能在本地归属结果
+            nodes[query] = node
+        
+        # 按顺序装箱, 相同的查询只请求一次
+        batches = []
+        current, length = [], 0
+        for node in dict.fromkeys(node for node in nodes.values() if node is not None):
+            extra = len(node.compile().encode('utf8')) + 4 # ||和括号
+            if current and (
+                len(current) >= batch_size
+                or 4 * ((length + extra + 2) // 3) > max_query_length
+            ):
+                batches.append(current)
+                current, length = [], 0
+            current.append(node)
+            length += extra
+        if current:
+            batches.append(current)
+        
+        def _run_batch(batch: list) -> list:
+            query = Or(*batch).compile()
+            needed = fields + sorted(
+                set().union(*(node.fields() for node in batch)) - set(fields)
+            )
+            try:
+                assets = self.fetch_search(
+                    query, needed,
+                    size=min(_max_rows_per_query, size * len(batch)), **kwargs
+                )
+            except FofaQuerySyntaxError:
+                if len(batch) == 1:
+                    raise
+                # 拆开重试, 找出有语法错误的查询
+                middle = len(batch) // 2
+                return _run_batch(batch[:middle]) + _run_batch(batch[middle:])
+            parts = [
+                (node, self._demultiplex(node, assets, needed[len(fields):], size))
+                for node in batch
+            ]
+            if len(batch) == 1 or assets.results.get('size', 0) <= len(assets):
+                return parts
+            # 结果被截断, 不足size行的查询可能丢了数据, 需要重新请求
+            missing = [node for node, view in parts if len(view) < size]
+            if not missing:
+                return parts
+            if len(missing) == len(batch):
+                middle = len(batch) // 2
+                return _run_batch(batch[:middle]) + _run_batch(batch[middle:])
+            return [part for part in parts if part[0] not in missing] + _run_batch(missing)
+        
+        def _safe_run_batch(batch: list) -> list:
+            try:
+                return _run_batch(batch)
+            except Exception as e:
+                self._log_engine.error(e)
+                return [(node, None) for node in batch]
+        
+        def _run_single(query) -> 'FofaAssets':
+            try:
+                return self.fetch_search(query, fields, size=size, **kwargs)
+            except Exception as e:
+                self._log_engine.error(e)
+                return None
+        
+        singles = [
+            query for query, node in nodes.items() if node is None and query not in rejected
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batched = executor.map(_safe_run_batch, batches)
+            alone = dict.fromkeys(rejected)
+            alone.update(zip(singles, executor.map(_run_single, singles)))
+            split = {}
+            for parts in batched:
+                split.update(parts)
+        self._log_engine.info(lambda: _(
+            "{count} queries sent with {requests} batched and {singles} single requests"
+        ).format(count=len(nodes), requests=len(batches), singles=len(singles)))
+        return {
+            query: alone[query] if node is None else split[node]
+            for query, node in nodes.items()
+        }
+    
+    @staticmethod
+    def _demultiplex(node, assets: 'FofaAssets', extra: list, size: int) -> 'FofaAssets':
+        """Returns the rows of a batched response that belong to `node`."""
+        if isinstance(node, Term) and node.op in ('=', '==') and node.quoted \
+                and node.field in _exact_match_fields and '/' not in node.value:
+            view = assets.lookup(node.field, node.value) # 共用一个哈希索引
+        else:
+            view = assets.where(node)
+        if len(view) > size:
+            view = view._view(view._rows[:size])
+        for field in extra: # 去掉只为归属结果而请求的字段
+            view - field
+        view.query_what = node.compile()
+        return view
+    
+    def _harvest(self, query_string: str, fields: list, **kwargs) -> 'FofaAssets':
+        """Fetches every row of a query, sharding it only if one request is not enough."""
+        assets = self.fetch_search(query_string, fields, size=_max_rows_per_query, **kwargs)
+        if assets.results.get('size', 0) <= len(assets):
+            return assets
+        self._log_engine.info(lambda: _(
+            "{query} has more than {cap} assets, harvesting it by shards"
+        ).format(query=query_string, cap=_max_rows_per_query))
+        return self.search_sharded(query_string, fields=fields, **kwargs)
+    
+    def search_incremental(self,
+                           query_string,
+                           state_store, # 保存各查询快照的映射, 如dict或shelve
+                           fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                           key = ('ip', 'port'), # 合并快照时使用的键
+                           **kwargs, # 传给search_v2的请求参数
+                           ) -> 'FofaAssets':
+        """Re-runs a monitoring query, fetching only the assets that changed.
+
+        The snapshot of every query is kept in `state_store` under the
+        canonical form of the query, together with its high-water mark, the
+        latest `lastupdatetime` seen. The first run harvests the whole query.
+        Later runs add an `after=` window starting the day before the mark,
+        so only new or updated assets are fetched (and paid for), and merge
+        them into the snapshot on `key`, the fetched rows taking precedence.
+        A delta larger than one request can return is harvested by shards.
+
+        Args:
+            query_string: The query, a string or a query node.
+            state_store: A mutable mapping holding the state of every query,
+                e.g. a `dict`, or `shelve.open(path)` to persist it across
+                runs. Values are plain dictionaries of lists and strings.
+            fields: The result fields. The fields of `key` and
+                `lastupdatetime` are added if missing. Changing the fields of
+                a query discards its snapshot and harvests it again.
+            key: The field or fields identifying an asset.
+            **kwargs: Request options such as `full`, `timeout`, `proxies`.
+
+        Returns:
+            A `FofaAssets` object holding the updated snapshot.
+        """
+        keys = (key, ) if isinstance(key, str) else tuple(key)
+        fields = list(fields) + [
+            field for field in keys + ('lastupdatetime', ) if field not in fields
+        ]
+        node = _query_node(query_string)
+        store_key = node.compile() # 规范化后的查询, 条件顺序不同的查询共用一个快照
+        state = state_store.get(store_key)
+        if state is not None and state.get('fields') != fields:
+            self._log_engine.info(lambda: _(
+                "The fields of {query} changed, harvesting it again"
+            ).format(query=store_key))
+            state = None
+        
+        if state is None or not state.get('high_water'):
+            query = node
+        else:
+            # after只精确到天, 从高水位的前一天开始取, 重复的行合并时去重
+            mark = datetime.strptime(state['high_water'], _timestamp_format)
+            query = And(node, after(mark.date() - timedelta(days=1)))
+        delta = self._harvest(query.compile(), fields, **kwargs)
+        if state is None:
+            snapshot = delta.dedup(key=keys)
+        else:
+            previous = FofaAssets._from_columns(
+                fields, [state['columns'][field] for field in fields],
+                query_string=store_key
+            )
+            snapshot = delta.merge(previous, key=keys) # 新取回的行排在前面, 优先保留
+        snapshot - _provenance_field
+        snapshot.query_what = store_key
+        
+        high_water = max(
+            [value for value in snapshot._values('lastupdatetime') if value]
+            + ([state['high_water']] if state is not None and state.get('high_water') else []),
+            default=''
+        )
+        state_store[store_key] = {
+            'fields': fields,
+            'high_water': high_water,
+            'columns': dict((field, snapshot._values(field)) for field in fields),
+            'updated_at': now(),
+        }
+        self._log_engine.info(lambda: _(
+            "{delta} new or updated assets fetched, {size} assets in the snapshot of {query}"
+        ).format(delta=len(delta), size=len(snapshot), query=store_key))
+        if self._enable_decode:
+            snapshot.decode()
+        if self._enable_encode:
+            snapshot.encode()
+        return snapshot
+    
+    def harvest(self,
+                query_string,
+                directory: str, # 断点续传的检查点目录
+                fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                size: int = _max_rows_per_query, # 需要的总行数
+                page_size: int = None, # 每页的行数, 默认为字段允许的最大值
+                max_workers: int = _max_workers,
+                **kwargs, # 传给search_v2的请求参数
+                ) -> 'FofaAssets':
+        """Runs a resumable multi-page search checkpointed in `directory`.
+
+        Every page is persisted as soon as it arrives, and a manifest records
+        the query, the fields, the page size and the completed pages (see
+        `HarvestJob`). If the harvest is interrupted, calling `harvest` again
+        with the same arguments and directory only requests the missing
+        pages, so finished pages are never fetched or paid for twice.
+
+        Args:
+            query_string: The query, a string or a query node.
+            directory: The checkpoint directory of this job.
+            fields: The result fields.
+            size: The total number of rows to harvest.
+            page_size: The number of rows per request. Defaults to the
+                largest page the requested fields allow.
+            max_workers: The number of concurrent page requests.
+            **kwargs: Request options such as `full`, `timeout`, `proxies`.
+
+        Returns:
+            A `FofaAssets` object holding the rows of all pages.
+
+        Raises:
+            ParamsMisconfiguredError: If `directory` holds another job.
+            FofaQuerySyntaxError: If `enable_validate` is set and the query
+                is malformed.
+            FofaException: The error of a failed page, after all other pages
+                have been saved. Calling `harvest` again resumes the job.
+        """
+        if isinstance(query_string, Node):
+            query_string = query_string.compile()
+        elif self._enable_validate:
+            _parse_query(query_string)
+        fields = list(fields)
+        page_size = page_size or min(_max_page_size(fields), size)
+        job = HarvestJob(directory, query_string, fields, size, page_size)
+        if job.done:
+            self._log_engine.info(lambda: _(
+                "Resuming harvest with {done} of {count} pages done"
+            ).format(done=len(job.done), count=len(job.planned())))
+        kwargs['url'] = self._search_url
+        kwargs['logger'] = self._log_engine
+        kwargs['translator'] = _
+        kwargs['session'] = self._http_session()
+        
+        def _fetch(number: int):
+            try:
+                res = search_v2(
+                    apikey=self._apikey, query_string=query_string,
+                    fields=fields, size=page_size, page=number, **kwargs
+                )
+            except Exception as e:
+                self._log_engine.error(e)
+                return e
+            job.save_page(number, res.get('results') or [], res.get('size', 0))
+            return None
+        
+        if job.total is None: # 第一页决定总共需要多少页
+            error = _fetch(1)
+            if error is not None:
+                raise error
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            errors = [error for error in executor.map(_fetch, job.pending()) if error is not None]
+        if errors:
+            self._log_engine.warning(lambda: _(
+                "{failed} pages failed, run the harvest again to resume it"
+            ).format(failed=len(errors)))
+            raise errors[0]
+        return FofaAssets(
+            query_results={'results': job.rows(), 'size': job.total},
+            mode='search',
+            fields=fields,
+            query_string=query_string
+        )
+    
+    def pipeline(self,
+                 query_string,
+                 fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                 size: int = _max_rows_per_query, # 需要的总行数
+                 page_size: int = None, # 每页的行数, 默认为字段允许的最大值
+                 sharded: bool = False, # 是否先用plan_shards拆分查询
+                 fetch_workers: int = _max_workers, # 并发请求的线程数
+                 parse_workers: int = 1, # 并发构造结果的线程数
+                 maxsize: int = 8, # 相邻阶段之间队列的容量
+                 **kwargs, # 传给search_v2和plan_shards的请求参数
+                 ) -> Pipeline:
+        """Builds a backpressured streaming harvest of a query.
+    
+        The returned `Pipeline` has three stages: the source plans the
+        requests (pages of the query, or of every shard if `sharded`), `fetch`
+        runs them and `parse` turns every response into a `FofaAssets` batch.
+        Chain transforms with `then` and a consumer with `sink`, then `run`
+        it. Stages are connected by queues of `maxsize` items, so a slow sink
+        throttles fetching instead of letting responses pile up in memory.
+        Batches may arrive out of order when a stage has several workers.
+    
+        Example:
+            >>> with open('admin.ndjson', 'w') as file:
+            ...     pipe = client.pipeline('title="后台"', size=200000, fetch_workers=8)
+            ...     pipe.then(lambda batch: batch.where(port='443'))
+            ...     stats = pipe.sink(lambda batch: batch.to_ndjson(file)).run()
+    
+        Args:
+            query_string: The query, a string or a query node.
+            fields: The result fields.
+            size: The total number of rows to fetch (per shard if `sharded`).
+            page_size: The number of rows per request. Defaults to the
+                largest page the requested fields allow.
+            sharded: Split the query with `plan_shards` first, to go beyond
+                the per-query row cap.
+            fetch_workers: The number of concurrent requests.
+            parse_workers: The number of threads building the batches.
+            maxsize: The capacity of the queue after every stage.
+            **kwargs: Request options such as `full`, `timeout`, `proxies`.
+    
+        Returns:
+            A `Pipeline` whose `run` returns the `StageStats` of every stage.
+        """
+        if not isinstance(query_string, Node) and self._enable_validate:
+            _parse_query(query_string)
+        fields = list(fields)
+        page_size = page_size or min(_max_page_size(fields), size)
+        full = kwargs.pop('full', False)
+    
+        def _plan():
+            if sharded:
+                shards = self.plan_shards(query_string, cap=size, **kwargs)
+                targets = [(shard.query.compile(), min(shard.size, size)) for shard in shards]
+            else:
+                query = query_string.compile() if isinstance(query_string, Node) else query_string
+                total, __ = self._count(query, **kwargs) # 一次统计请求得到需要的页数
+                targets = [(query, min(total, size))]
+            for query, rows in targets:
+                for number in range(1, -(-rows // page_size) + 1):
+                    # 最后一页只保留需要的行
+                    yield query, number, min(page_size, rows - (number - 1) * page_size)
+    
+        options = dict(kwargs, full=full, url=self._search_url, logger=self._log_engine,
+                       translator=_, session=self._http_session())
+    
+        def fetch(task: tuple) -> tuple:
+            query, number, rows = task
+            res = search_v2(
+                apikey=self._apikey, query_string=query,
+                fields=fields, size=page_size, page=number, **options
+            )
+            return query, rows, res
+    
+        def parse(item: tuple) -> 'FofaAssets':
+            query, rows, res = item
+            res = dict(res, results=(res.get('results') or [])[:rows])
+            assets = FofaAssets(
+                query_results=res, mode='search',
+                fields=fields, query_string=query
+            )
+            if self._enable_decode:
+                assets.decode()
+            if self._enable_encode:
+                assets.encode()
+            return assets
+    
+        return Pipeline(_plan(), maxsize=maxsize, name='plan').then(
+            fetch, workers=fetch_workers
+        ).then(parse, workers=parse_workers)
+
+    def schedule(self,
+                 scheduler: BudgetScheduler,
+                 query_string,
+                 interval: float, # 两次执行之间的秒数
+                 priority: float = 1.0, # 优先级, 越大越先执行
+                 fields: list = ['host', 'ip', 'port', 'title'], # 返回值字段
+                 size: int = 100, # 每次取回的行数
+                 callback = None, # 每次成功执行后接收FofaAssets结果
+                 cost: float = None, # 初始的F点估计
+                 name: str = None, # 任务名, 默认为查询字符串
+                 **kwargs, # 传给search_v2的请求参数
+                 ) -> RecurringJob:
+        """Registers a recurring search on a `BudgetScheduler`.
+
+        Every run fetches `size` rows and passes the `FofaAssets` result to
+        `callback`. The F-points reported by the responses are tracked by
+        the scheduler to pace the job within its budget. Failed runs are
+        logged and retried at the next interval.
+
+        Args:
+            scheduler: The scheduler running the job.
+            query_string: The query, a string or a query node.
+            interval: The seconds between two runs.
+            priority: The weight of the job, higher runs first.
+            fields: The result fields.
+            size: The number of rows fetched by every run.
+            callback: A callable receiving the `FofaAssets` of every run.
+                Its exceptions are logged and fail the run.
+            cost: The initial F-point estimate of one run, see
+                `BudgetScheduler.add`.
+            name: The job name. Defaults to the compiled query.
+            **kwargs: Request options such as `full`, `timeout`, `proxies`.
+
+        Returns:
+            The `RecurringJob` added to the scheduler.
+        """
+        if isinstance(query_string, Node):
+            query_string = query_string.compile()
+        elif self._enable_validate:
+            _parse_query(query_string)
+        fields = list(fields)
+        # 一次执行按分页发出的请求数
+        requests = -(-size // min(_max_page_size(fields), _max_rows_per_query))
+
+        def _run():
+            try:
+                return self.fetch_search(query_string, fields, size=size, **kwargs)
+            except Exception as e:
+                self._log_engine.error(e)
+                raise
+
+        def _callback(assets: 'FofaAssets') -> None:
+            try:
+                callback(assets)
+            except Exception as e:
+                self._log_engine.error(e)
+                raise
+        return scheduler.add(
+            name or query_string, _run, interval, priority=priority,
+            cost=cost, requests=requests, callback=None if callback is None else _callback
+        )
+
     def history(self):
         if self._enable_cache:
-            print(self.dashboard)
+            with self._cache_lock:
+                print(self.dashboard)
 
     def pick(self, index: int):
         if self._enable_cache:
-            return self.dashboard['assets'][index - 1]
+            with self._cache_lock:
+                return self.dashboard['assets'][index - 1]
     
 class FofaAssets:
     """A dynamic data container for results from the FOFA API.
@@ -565,31 +1433,34 @@ class FofaAssets:
     FOFA API query. Its behavior and available features change dynamically based on
     the `mode` ('search', 'stats', or 'host') it is initialized with.
 
-    For 'search' mode, this class provides a full-featured interface by formatting
-    the data into a `tablib.Dataset`. This enables powerful, spreadsheet-like
-    operations such as accessing columns/rows, adding/removing columns, and
-    exporting to various formats (CSV, JSON, etc.).
+    For 'search' mode, this class provides a full-featured interface. The rows
+    are stored column by column, and a `tablib.Dataset` view is generated on
+    demand. This enables powerful, spreadsheet-like operations such as
+    accessing columns/rows, adding/removing columns, column-wise filtering
+    with `where`, and exporting to various formats (CSV, JSON, etc.).
 
-    For 'stats' and 'host' modes, the functionality is currently limited. The
-    class provides basic dictionary-like access to the raw, nested data but
-    does not support table manipulation (add/subtract columns) or direct export
-    to formats like CSV.
+    For 'stats' mode, the nested aggregation buckets are flattened into a
+    table with the columns `field`, `name` and `count`, one row per bucket,
+    which supports the same table operations and exporters as 'search'.
+    The nested form is still available as `assets['aggs']`, and the
+    distinct counts as `assets['distinct']`. Stats of several sharded calls
+    can be combined with `merge_stats`.
 
-    Note:
-        To help improve the functionality for `stats` and `host` modes, we
-        encourage users to open a GitHub issue and provide sample API responses.
-        This will help us understand the data structures and build better
-        formatting and manipulation tools.
+    For 'host' mode, the nested port details are normalized into a table with
+    one row per `(ip, port, protocol, product)`, built in a single pass over
+    the response. The tables of many `host()` calls can be stacked with
+    `concat`. The raw response remains available as `results`.
 
     Attributes:
         assets (Optional[tablib.Dataset | dict]): The processed data container.
-            The type of this attribute depends on the `mode`: `tablib.Dataset`
-            for 'search', and `dict` for 'stats' and 'host'.
+            It is a `tablib.Dataset` generated from the column storage.
         fields (list): A list of available field names (headers or keys) for the
             processed data.
-        assets_size (int): The number of assets found. For 'search' mode, this
-            is the number of rows. For 'stats' mode, it is set to -1 to indicate
-            that a simple count is not applicable.
+        assets_size (int): The number of rows. For 'search' mode, this is
+            the number of assets; for 'stats' mode, the number of buckets;
+            for 'host' mode, the number of port/product rows.
+        distinct (dict): The distinct counts of a 'stats' result, mapping a
+            field to its number of distinct values. Empty for other modes.
         detail (bool): A flag that is `True` if the data originated from a
             detailed `host` query (i.e., the response contains a 'ports' key).
     """
@@ -617,8 +1488,9 @@ class FofaAssets:
             fields: A list of headers for the data columns. This is required
                 and primarily used for 'search' mode to structure the dataset.
         """
+        self._format_mode = mode
         self.assets = None
-        self.fields = fields # 返回值字段
+        self.fields = list(fields) # 返回值字段 # 复制一份, 避免增删列时修改调用方的列表
         self.query_what = query_string
         
         self.assets_size = None # 资产数目
@@ -626,44 +1498,69 @@ class FofaAssets:
         # 对于host接口, 这是一个特殊字段
         # 检查是否应该返回端口详情
         
+        # search接口的结果按列存储, 列名 -> 列数据
+        self._columns = {}
+        self._size = 0 # 存储层的总行数
+        self._rows = None # 行选择掩码, None表示选中全部行
+        self._dataset = None # 按需生成的tablib.Dataset缓存
+        self._indexes = {} # 二级索引, 列名 -> (建索引时的列对象, 值 -> 行号列表)
+        self.distinct = {} # stats接口返回的去重计数, 字段 -> 数目
+        self._parallel = None # 多进程变换的配置, (进程数, 每块行数), None表示在本进程中执行
+        
         self._raw_results = query_results
-        self._format_mode = mode
         self._format_dict()
         
     # 注册函数
     def _format_dict(self):
         # 对于search接口, 正常格式化即可
         def _format_search_dict():
-            self.assets = tablib.Dataset()
-            self.assets.headers = self.fields
-            for item in self._raw_results['results']:
-                if not isinstance(item, (tuple, list)):
-                    self.assets.append([item, ])
-                    continue
-                self.assets.append(item)
-            self.assets_size = len(self.assets)
+            rows = [
+                item if isinstance(item, (tuple, list)) else [item, ]
+                for item in self._raw_results['results']
+            ]
+            width = len(self.fields)
+            if any(len(row) != width for row in rows):
+                raise ValueError(_('The width of the results does not match the fields'))
+            # 一次性转置为列存储
+            columns = zip(*rows) if rows else [() for __ in self.fields]
+            self._columns = {
+                field: list(column) for field, column in zip(self.fields, columns)
+            }
+            self._size = len(rows)
+            self.assets_size = self._size
             
         def _format_stats_dict():
-            self.assets = {
-                'distinct': self._raw_results['distinct'],
-                'aggs': self._raw_results['aggs'],
+            # 把嵌套的aggs展平为(field, name, count)三列, 每个聚合桶一行
+            fields, names, counts = [], [], []
+            for field, buckets in (self._raw_results.get('aggs') or {}).items():
+                for bucket in buckets or []:
+                    fields.append(field)
+                    names.append(str(bucket.get('name', '')))
+                    counts.append(str(bucket.get('count', 0)))
+            self.fields = list(_stats_table_fields)
+            self._columns = {
+                'field': DictColumn(fields), # 聚合字段只有少数几种, 字典编码
+                'name': names,
+                'count': TypedColumn('int', counts),
             }
-            self.fields = list(
-                self._raw_results['aggs'].keys()
-                )
-            self.assets_size = -1 # 标记为不可用
+            self._size = len(names)
+            self.assets_size = self._size
+            self.distinct = dict(self._raw_results.get('distinct') or {})
             
         def _format_host_dict():
-            # 移除不必要的字段
-            self._raw_results.pop('error')
             # detail=True时, 返回值字段存在ports键
             # 用于存储多个端口的详情
             self.detail = 'ports' in self._raw_results.keys()
-            if not self.detail:
-                self._raw_results.pop('consumed_fpoint')
-                self._raw_results.pop('required_fpoints')
-            self.assets = self._raw_results
-            self.fields = list(self.assets.keys())
+            # 一次遍历嵌套的端口详情, 直接写入各列
+            self.fields = list(_host_table_fields)
+            columns = [[] for __ in self.fields]
+            appends = [column.append for column in columns]
+            for row in _iter_host_rows(self._raw_results):
+                for append, value in zip(appends, row):
+                    append(value)
+            self._columns = dict(zip(self.fields, columns))
+            self._size = len(columns[0])
+            self.assets_size = self._size
 
         format_methods = {
             'search': _format_search_dict,
@@ -679,17 +1576,108 @@ class FofaAssets:
     def results(self): # 有需要的话可以把原始查询结果拿出来
         return self._raw_results
     
+    @property
+    def assets(self):
+        """The processed data container.
+
+        For tabular modes this is a `tablib.Dataset` generated from the
+        column storage on first access and cached until the columns change.
+        """
+        if self._format_mode in _tabular_modes:
+            if self._dataset is None:
+                self._dataset = _import_tablib().Dataset(
+                    *self._iter_rows(), headers=list(self.fields)
+                )
+            return self._dataset
+        return self._assets
+    
+    @assets.setter
+    def assets(self, value):
+        self._assets = value
+    
+    def _values(self, name) -> list:
+        """Returns the visible values of column `name` as a new list."""
+        return _take(self._columns[name], self._rows)
+    
+    def _iter_rows(self):
+        """Yields the visible rows as tuples, in storage order."""
+        columns = [self._columns[field] for field in self.fields]
+        if self._rows is None:
+            return zip(*columns)
+        return (
+            tuple(column[index] for column in columns) for index in self._rows
+        )
+    
+    def _row(self, index: int) -> tuple:
+        """Returns the visible row at `index` (negative indexes allowed)."""
+        index = range(len(self))[index] # 顺便处理负数索引和越界
+        if self._rows is not None:
+            index = self._rows[index]
+        return tuple(self._columns[field][index] for field in self.fields)
+    
+    def _view(self, rows: list) -> 'FofaAssets':
+        """Returns a new FofaAssets selecting `rows` of the same storage.
+
+        The column objects are shared, only the column mapping, the field
+        list and the row selection belong to the view.
+        """
+        view = copy(self)
+        view._columns = dict(self._columns)
+        view.fields = list(self.fields)
+        view._rows = rows
+        view._dataset = None
+        # 行号不同时索引不能共用, 选中的行相同时复制一份映射即可
+        view._indexes = dict(self._indexes) if rows is self._rows else {}
+        view.assets_size = len(rows) if rows is not None else self._size
+        return view
+    
+    @classmethod
+    def _from_columns(cls,
+                      fields: list,
+                      columns: list, # 与fields一一对应的列数据
+                      query_string: str = '***',
+                      mode: str = 'search', # 任意一种表格模式
+                      ) -> 'FofaAssets':
+        """Builds a tabular FofaAssets (default 'search') directly from column lists."""
+        assets = cls(
+            query_results={'results': []},
+            mode='search',
+            query_string=query_string,
+            fields=fields
+        )
+        assets._format_mode = mode
+        assets._columns = dict(zip(assets.fields, columns))
+        assets._size = len(columns[0]) if columns else 0
+        assets.assets_size = assets._size
+        assets._raw_results = {} # 合成的结果没有原始响应
+        return assets
+    
+    def _stats_aggs(self) -> dict:
+        """Rebuilds the nested `aggs` mapping of a stats result from its rows."""
+        aggs = {}
+        for field, name, n in zip(
+            self._values('field'), self._values('name'), self._values('count')
+        ):
+            aggs.setdefault(field, []).append({'name': name, 'count': int(n)})
+        return aggs
+    
     def __getattr__(self, name):
+        if name.startswith('_'):
+            # 私有属性和魔术方法不转发给assets
+            # 否则在实例未初始化完成(如copy和pickle)时会无限递归
+            raise AttributeError(name)
         # 分成三个方法来写 
         # 以便后面补充Pythonic的写法
         def __search_res_getattr__():
-            return self.assets[name]
+            return self._values(name)
 
         def __stats_res_getattr__():
-            return self.assets[name]
+            if name == 'aggs': # 兼容以前按嵌套字典访问的写法
+                return self._stats_aggs()
+            return self._values(name)
         
         def __host_res_getattr__():
-            return self.assets[name]
+            return self._values(name)
             
         _getattr_methods = {
             'search': __search_res_getattr__,
@@ -700,12 +1688,23 @@ class FofaAssets:
     
     def __getitem__(self, key_or_index):
         def __search_res_getitem__(key_or_index):
-            return self.assets[key_or_index]
+            if isinstance(key_or_index, str):
+                return self._values(key_or_index)
+            if isinstance(key_or_index, slice):
+                return [
+                    self._row(index)
+                    for index in range(len(self))[key_or_index]
+                ]
+            return self._row(key_or_index)
         def __stats_res_getitem__(key_or_index):
-            # 其实就是转接了一下对assets的操作
-            return self.assets[key_or_index]
+            # 兼容以前按嵌套字典访问的写法
+            if key_or_index == 'aggs':
+                return self._stats_aggs()
+            if key_or_index == 'distinct':
+                return self.distinct
+            return __search_res_getitem__(key_or_index)
         def __host_res_getitem__(key_or_index):
-            return self.assets[key_or_index]
+            return __search_res_getitem__(key_or_index)
         
         _getitem_methods = {
             'search': __search_res_getitem__,
@@ -714,12 +1713,18 @@ class FofaAssets:
         }
         return _getitem_methods[self._format_mode](key_or_index)
     
+    def __iter__(self):
+        if self._format_mode in _tabular_modes:
+            return iter(self._iter_rows())
+        return iter(self.assets)
+    
     def __add__(self, append_column_header: str):
-        if self._format_mode == 'search':
-            self.assets.append_col(
-                [''] * len(self.assets), header=append_column_header
-            )
+        if self._format_mode in _tabular_modes:
+            if append_column_header in self._columns:
+                return # 列已存在, 不覆盖已有数据
+            self._columns[append_column_header] = [''] * self._size
             self.fields.append(append_column_header)
+            self._dataset = None
         else: # stats和host接口不方便实现这个操作
             # 上面都没抛出异常, 这里也不用管了
             '''raise NotImplementedError(_("Currently, adding operations to the \
@@ -729,11 +1734,12 @@ class FofaAssets:
 
     
     def __sub__(self, existed_column_header: str):
-        if self._format_mode == 'search':
-            try:
-                del self.assets[existed_column_header]
-            except IndexError:
-                pass
+        if self._format_mode in _tabular_modes:
+            if existed_column_header in self._columns:
+                del self._columns[existed_column_header]
+                self.fields.remove(existed_column_header)
+                self._indexes.pop(existed_column_header, None)
+                self._dataset = None
         else: # stats和host接口不方便实现这个操作
             '''raise NotImplementedError(_("Currently, adding operations to the \
                 columns of return values for stats and host interfaces \
@@ -749,30 +1755,921 @@ class FofaAssets:
     def __str__(self):
         return self.__repr__()
     
+    def where(self, *conditions: dict, **kwargs) -> 'FofaAssets':
+        """Filters the rows column-wise and returns a view of the results.
+
+        Every condition maps a field to a predicate, and a row is kept only if
+        all predicates match. Each predicate is evaluated over a whole column
+        at once, and every following column is only evaluated for the rows
+        that are still selected.
+
+        The returned object shares the column storage with this one through a
+        row-selection mask, so no rows are copied. It can be filtered again,
+        indexed and exported like any other `FofaAssets`.
+
+        Args:
+            *conditions: Dictionaries of `{field: predicate}`. Use them for
+                field names that are not valid keywords, e.g.
+                `{'cert.subject.org': 'Example Inc.'}`. A condition can also
+                be a query node built with `Field`, `And`, `Or` and `Not`,
+                which is evaluated locally row by row (see `Node.evaluate`).
+            **kwargs: Conditions given as keyword arguments. A predicate is
+                interpreted by its type:
+                - set, frozenset, list, tuple or range: the value is one of
+                  the members, e.g. `port={80, 443}`;
+                - compiled regular expression: the pattern is found in the
+                  value, e.g. `title=re.compile('admin', re.I)`;
+                - callable: the callable returns a truthy value for the
+                  value, e.g. `port=lambda p: int(p) < 1024`;
+                - anything else: the value equals `str(predicate)`, e.g.
+                  `country='CN'`.
+
+        Returns:
+            A new `FofaAssets` object selecting the matching rows.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+            KeyError: If a condition refers to an unknown field.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be filtered'))
+        merged = {}
+        nodes = []
+        for condition in conditions:
+            if isinstance(condition, Node):
+                nodes.append(condition)
+            else:
+                merged.update(condition)
+        merged.update(kwargs)
+        if self._parallel is not None and len(self) > self._parallel[1] \
+                and _picklable((merged, nodes)):
+            return self._view(self._parallel_where(merged, nodes))
+        
+        positions = self._rows # None表示当前选中了全部行
+        for field, spec in merged.items():
+            mask = _column_mask(self._columns[field], positions, spec)
+            if positions is None:
+                positions = range(self._size)
+            positions = list(compress(positions, mask))
+        for node in nodes:
+            # 语法树只能逐行求值, 放在按列过滤之后, 尽量减少行数
+            if positions is None:
+                positions = range(self._size)
+            names = sorted(node.fields())
+            columns = [self._columns[name] for name in names]
+            positions = [
+                row for row in positions
+                if node.evaluate(dict(zip(names, (column[row] for column in columns))))
+            ]
+        if positions is None:
+            positions = list(range(self._size))
+        return self._view(positions)
+    
+    def _parallel_where(self, specs: dict, nodes: list) -> list:
+        """Evaluates the conditions of `where` chunk by chunk in worker processes."""
+        processes, chunk_rows = self._parallel
+        fields = set(specs).union(*(node.fields() for node in nodes))
+        chunks = _chunks(self._rows, self._size, chunk_rows)
+        masks = _map(_mask_chunk, [
+            (dict((field, _pack(self._columns[field], chunk)) for field in fields), specs, nodes)
+            for chunk in chunks
+        ], processes)
+        return [row for chunk, mask in zip(chunks, masks) for row in compress(chunk, mask)]
+    
+    def parallel(self,
+                 processes: int = None, # 子进程数, 默认为CPU核数
+                 chunk_rows: int = _default_chunk_rows, # 每个子进程任务处理的行数
+                 ) -> 'FofaAssets':
+        """Runs the CPU-heavy transforms of this result in worker processes.
+
+        Once enabled, `where`, `decode`, `to_csv` and `to_ndjson` split the
+        rows into chunks of `chunk_rows`, send every chunk to a shared
+        process pool in a compact form (plain string lists, or codes plus
+        distinct values for dictionary-encoded columns), transform the
+        chunks in parallel and reassemble the results in order. Results with
+        fewer rows than one chunk, and `where` conditions that cannot be
+        pickled (e.g. lambdas), still run in this process. Views returned by
+        `where`, `sort` and the like keep the setting.
+
+        Args:
+            processes: The number of worker processes. Defaults to the
+                number of CPUs. `1` turns the process pool off again.
+            chunk_rows: The number of rows per task.
+
+        Returns:
+            This object, to allow chaining.
+        """
+        self._parallel = None if processes == 1 else (processes, max(int(chunk_rows), 1))
+        return self
+    
+    def decode(self, fields: list = None) -> 'FofaAssets':
+        """Decodes typed fields into compact typed arrays, in place.
+
+        The fields listed in `_typed_fields` are decoded: IPs into packed
+        16-byte integers, ports and other integers into the smallest fitting
+        array, timestamps into epoch seconds and coordinates into doubles.
+        Memory use and comparison cost drop sharply on large results.
+
+        Decoding is transparent: column access, filtering and every exporter
+        still see the original strings. Use `typed` to read decoded values.
+        A column is left untouched if most of its values cannot be decoded.
+
+        Args:
+            fields: The fields to decode. Defaults to every typed field.
+
+        Returns:
+            This object, to allow chaining.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be decoded'))
+        for field in (fields if fields is not None else self.fields):
+            kind = _typed_fields.get(field)
+            column = self._columns.get(field)
+            if kind is None or column is None or isinstance(column, TypedColumn):
+                continue
+            if self._parallel is not None and self._size > self._parallel[1]:
+                processes, chunk_rows = self._parallel
+                typed = TypedColumn.concat(_map(_decode_chunk, [
+                    (kind, _pack(column, chunk)) for chunk in _chunks(None, self._size, chunk_rows)
+                ], processes))
+            else:
+                typed = TypedColumn(kind, column)
+            if len(typed.raw) * 2 > len(typed):
+                continue # 大部分值无法解码时, 保留字符串反而更省内存
+            self._columns[field] = typed
+        return self
+    
+    def encode(self, fields: list = None, max_ratio: float = 0.5) -> 'FofaAssets':
+        """Dictionary-encodes low-cardinality string columns, in place.
+
+        Every distinct value of an encoded column is stored once, and every
+        row only keeps a small integer code. `where`, `group_by` and indexes
+        work on the codes, and strings are only looked up on row access and
+        export. This cuts memory for large harvests several-fold.
+
+        Args:
+            fields: The fields to encode. Defaults to the low-cardinality
+                fields in `_categorical_fields` (country, city, protocol,
+                server, os, org, product and so on).
+            max_ratio: A column is left untouched if its number of distinct
+                values exceeds this fraction of its rows. Defaults to 0.5.
+
+        Returns:
+            This object, to allow chaining.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be encoded'))
+        if fields is None:
+            fields = [field for field in self.fields if field in _categorical_fields]
+        for field in fields:
+            column = self._columns.get(field)
+            if column is None or isinstance(column, (DictColumn, TypedColumn)):
+                continue
+            encoded = DictColumn(column)
+            if len(encoded.values) > max_ratio * max(len(encoded), 1):
+                continue # 取值过于分散, 编码反而更占内存
+            self._columns[field] = encoded
+        return self
+    
+    def typed(self, field: str) -> list:
+        """Returns the visible values of `field` as typed python values.
+
+        IPs are returned as integers (IPv4 mapped into `::ffff:0:0/96`),
+        timestamps as epoch seconds, and values that cannot be decoded as
+        `None`. Fields that were not decoded yet are decoded on the fly.
+
+        Raises:
+            KeyError: If `field` is unknown or has no typed representation.
+        """
+        column = self._columns[field]
+        if not isinstance(column, TypedColumn):
+            if field not in _typed_fields:
+                raise KeyError(_('Field has no typed representation: ') + field)
+            column = TypedColumn(_typed_fields[field], column)
+        rows = self._rows if self._rows is not None else range(self._size)
+        return [column.typed(row) for row in rows]
+    
+    def sort(self, field: str, reverse: bool = False) -> 'FofaAssets':
+        """Returns a view of the results ordered by `field`.
+
+        Decoded columns are compared on their typed values, so ports sort
+        numerically and IPs by address. Values that cannot be decoded are
+        placed after all decoded values.
+        """
+        rows = self._rows if self._rows is not None else range(self._size)
+        column = self._columns[field]
+        if isinstance(column, TypedColumn):
+            typed = column.typed
+            keys = [
+                (True, 0, column[row]) if row in column.raw else (False, typed(row), '')
+                for row in rows
+            ]
+        else:
+            keys = [column[row] for row in rows]
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        return self._view([rows[position] for position in order])
+    
+    def _index(self, field: str) -> dict:
+        """Returns the cached index of `field`, building it if necessary.
+
+        An index is rebuilt whenever the column object behind `field` has
+        changed, e.g. after the column was removed and added again.
+        """
+        column = self._columns[field]
+        cached = self._indexes.get(field)
+        if cached is not None and cached[0] is column:
+            return cached[1]
+        index = {}
+        rows = self._rows if self._rows is not None else range(self._size)
+        if isinstance(column, DictColumn):
+            # 按编码分组, 最后再换成字符串
+            keys = column.take_codes(self._rows)
+        else:
+            keys = _take(column, self._rows)
+        for row, value in zip(rows, keys):
+            if value in index:
+                index[value].append(row)
+            else:
+                index[value] = [row]
+        if isinstance(column, DictColumn):
+            index = {column.values[code]: found for code, found in index.items()}
+        self._indexes[field] = (column, index)
+        return index
+    
+    def build_index(self, *fields: str) -> 'FofaAssets':
+        """Builds and caches hash indexes on `fields`.
+
+        Indexes make `lookup` an O(1) operation and let `group_by` reuse the
+        grouping instead of scanning the column again. They are cached on
+        this object and dropped or rebuilt when their column is removed or
+        replaced via `-`/`+`.
+
+        Args:
+            *fields: The fields to index, e.g. 'ip', 'domain', 'host',
+                'port', 'fid' or 'icon_hash'.
+
+        Returns:
+            This object, to allow chaining.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+            KeyError: If a field is missing from the results.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be indexed'))
+        for field in fields:
+            self._index(field)
+        return self
+    
+    def lookup(self, field: str, value) -> 'FofaAssets':
+        """Returns a view of the rows whose `field` equals `value`.
+
+        The index of `field` is built on first use and reused afterwards,
+        so every following lookup is a single hash probe.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be indexed'))
+        rows = self._index(field).get(_normalize_operand(value), [])
+        return self._view(list(rows))
+    
+    def group_by(self, field: str, counts: bool = True) -> dict:
+        """Groups the rows by the values of `field`.
+
+        Args:
+            field: The field to group by, e.g. 'server' or 'country'.
+            counts: If `True` (default), map every value to its number of
+                rows. If `False`, map every value to a `FofaAssets` view of
+                its rows; the index of `field` is built and cached for this.
+
+        Returns:
+            A dictionary ordered by first appearance of every value.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+            KeyError: If `field` is missing from the results.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be grouped'))
+        cached = self._indexes.get(field)
+        column = self._columns[field]
+        if counts and (cached is None or cached[0] is not column):
+            # 只需要计数时, Counter比建索引更快
+            if isinstance(column, DictColumn):
+                return column.count(self._rows)
+            return dict(Counter(self._values(field)))
+        index = self._index(field)
+        if counts:
+            return {value: len(rows) for value, rows in index.items()}
+        return {value: self._view(list(rows)) for value, rows in index.items()}
+    
+    def aggregate(self,
+                  fields: list = ['title'], # 聚合的字段, 与stats接口的fields相同
+                  top: int = 5, # 每个字段保留的桶数, None表示全部保留
+                  distinct: list = ['ip'], # 统计不同值数目的字段
+                  ) -> 'FofaAssets':
+        """Answers a stats-style query locally from the rows already held.
+
+        Every requested field is counted with one hash aggregation over its
+        column (over the codes only for dictionary-encoded columns), so a
+        dashboard can be served from harvested data without spending another
+        stats call. Empty values are not counted, like in the stats API.
+
+        Args:
+            fields: The fields to aggregate on. Defaults to `['title']`.
+            top: The number of buckets kept per field, ordered by descending
+                count. Defaults to 5; `None` keeps all buckets.
+            distinct: The fields whose number of distinct non-empty values
+                is reported under `distinct`. Defaults to `['ip']`.
+
+        Returns:
+            A new `FofaAssets` object in 'stats' mode, shaped like the result
+            of `Fofa.stats` (`assets['aggs']`, `assets['distinct']`).
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+            KeyError: If a field is missing from the results.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be aggregated'))
+        counted = {} # 每个字段只统计一次
+        for field in list(fields) + list(distinct):
+            if field not in counted:
+                counts = Counter(self.group_by(field))
+                counts.pop('', None) # 空值不参与统计
+                counted[field] = counts
+        
+        aggs = {
+            field: [
+                {'name': name, 'count': n}
+                for name, n in counted[field].most_common(top)
+            ]
+            for field in fields
+        }
+        return FofaAssets(
+            query_results={
+                'error': False, 'size': len(self),
+                'distinct': {field: len(counted[field]) for field in distinct},
+                'aggs': aggs,
+            },
+            mode='stats',
+            query_string=self.query_what
+        )
+    
+    def _key_values(self, key) -> list:
+        """Returns the visible key tuples for the fields in `key`."""
+        if isinstance(key, str):
+            key = (key, )
+        missing = [field for field in key if field not in self._columns]
+        if missing:
+            raise KeyError(_('Key fields not found in the results: ') + ', '.join(missing))
+        return list(zip(*[self._values(field) for field in key]))
+    
+    def dedup(self, key=('ip', 'port')) -> 'FofaAssets':
+        """Removes duplicate rows and returns a view of the results.
+
+        The first row of every key is kept. Duplicates are found with a hash
+        set in a single pass, and the result shares the column storage
+        with this object, like the views returned by `where`.
+
+        Args:
+            key: A field name or a tuple of field names identifying a row.
+                Defaults to `('ip', 'port')`.
+
+        Returns:
+            A new `FofaAssets` object without duplicate keys.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+            KeyError: If a key field is missing from the results.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be deduplicated'))
+        seen = set()
+        positions = []
+        physical = self._rows if self._rows is not None else range(self._size)
+        for position, value in zip(physical, self._key_values(key)):
+            if value not in seen:
+                seen.add(value)
+                positions.append(position)
+        return self._view(positions)
+    
+    def merge(self,
+              *others: 'FofaAssets',
+              key=('ip', 'port'),
+              spill_rows: int = _spill_rows, # 超过该行数后溢出到磁盘
+              spill_bytes: int = _spill_bytes, # 超过该字节数后溢出到磁盘
+              spill_dir: str = None, # 溢出文件所在目录, 默认为系统临时目录
+              ) -> 'FofaAssets':
+        """Unions this result with other results, removing duplicate rows.
+
+        Rows are matched on `key` through a hash index, so the merge runs in
+        a single pass over all rows. The fields of the merged result are the
+        union of all `fields` lists, in order of first appearance. A missing
+        field is filled with an empty string, and an empty cell is filled
+        from later duplicates that have a value for it.
+
+        Every merged row records the queries that produced it in an extra
+        `query_what` column, as a tuple of query strings. Merging results
+        that were already merged keeps their recorded queries.
+
+        Once the merged rows exceed `spill_rows` rows or roughly
+        `spill_bytes` bytes of text, they are moved to a memory-mapped
+        columnar file and only the hash index stays in memory. The result
+        then works as usual, reading its values from the mapped file.
+
+        Args:
+            *others: The `FofaAssets` objects to merge into this one, e.g.
+                other pages, shards or queries.
+            key: A field name or a tuple of field names identifying a row.
+                Defaults to `('ip', 'port')`.
+            spill_rows: The row threshold for spilling to disk. `None`
+                (default) disables it.
+            spill_bytes: The text size threshold for spilling to disk.
+                `None` (default) disables it.
+            spill_dir: The directory of the spill file. Defaults to the
+                system temporary directory.
+
+        Returns:
+            A new `FofaAssets` object holding the merged rows.
+
+        Raises:
+            NotImplementedError: If any result does not come from 'search' mode.
+            KeyError: If a key field is missing from any result.
+        """
+        sources = (self, ) + others
+        if any(source._format_mode != 'search' for source in sources):
+            raise NotImplementedError(_('Only the results of search interface \
+                can be merged'))
+        merger = _AssetsMerger(
+            key=key, spill_rows=spill_rows,
+            spill_bytes=spill_bytes, spill_dir=spill_dir
+        )
+        for source in sources:
+            merger.add(source)
+        return merger.result()
+    
+    def merge_stats(self, *others: 'FofaAssets') -> 'FofaAssets':
+        """Combines this stats result with other stats results into one aggregate.
+
+        The buckets of all results are summed with a hash aggregation keyed on
+        `(field, name)`, in a single pass over all rows. This is meant for
+        stats calls sharded over disjoint asset sets, e.g. one call per
+        country or per time window.
+
+        Within every field the merged buckets are ordered by descending count,
+        and fields keep their order of first appearance. The `distinct`
+        counts and the total `size` are summed as well, which is only exact
+        if the shards do not overlap.
+
+        Note that FOFA returns only the top buckets of every shard, so a value
+        that misses the top list of some shards is undercounted.
+
+        Args:
+            *others: The stats `FofaAssets` objects to merge into this one.
+
+        Returns:
+            A new `FofaAssets` object in 'stats' mode.
+
+        Raises:
+            NotImplementedError: If any result does not come from 'stats' mode.
+        """
+        sources = (self, ) + others
+        if any(source._format_mode != 'stats' for source in sources):
+            raise NotImplementedError(_('Only the results of stats interface \
+                can be merged with merge_stats'))
+        totals = {} # (field, name) -> count, 字典保持首次出现的顺序
+        distinct = {}
+        size = 0
+        query_strings = []
+        for source in sources:
+            for field, name, n in zip(
+                source._values('field'), source._values('name'), source._values('count')
+            ):
+                key = field, name
+                totals[key] = totals.get(key, 0) + int(n)
+            for field, n in source.distinct.items():
+                distinct[field] = distinct.get(field, 0) + n
+            size += (source.results or {}).get('size') or 0
+            if source.query_what not in query_strings:
+                query_strings.append(source.query_what)
+        
+        aggs = {}
+        for (field, name), n in totals.items():
+            aggs.setdefault(field, []).append({'name': name, 'count': n})
+        for buckets in aggs.values():
+            buckets.sort(key=lambda bucket: bucket['count'], reverse=True)
+        
+        return FofaAssets(
+            query_results={
+                'error': False, 'size': size,
+                'distinct': distinct, 'aggs': aggs,
+            },
+            mode='stats',
+            query_string=_join_queries(query_strings)
+        )
+    
+    def concat(self, *others: 'FofaAssets') -> 'FofaAssets':
+        """Stacks the rows of results of the same mode into one table.
+
+        Unlike `merge`, rows are neither matched nor deduplicated, which makes
+        this the way to combine the tables of many `host()` calls. The fields
+        of the result are the union of all `fields` lists, in order of first
+        appearance, and a missing field is filled with an empty string.
+
+        Args:
+            *others: The `FofaAssets` objects to append to this one.
+
+        Returns:
+            A new `FofaAssets` object in the same mode.
+
+        Raises:
+            NotImplementedError: If the results are not tabular or do not all
+                come from the same mode.
+        """
+        sources = (self, ) + others
+        if self._format_mode not in _tabular_modes or any(
+            source._format_mode != self._format_mode for source in sources
+        ):
+            raise NotImplementedError(_('Only tabular results of the same mode \
+                can be concatenated'))
+        fields = []
+        query_strings = []
+        for source in sources:
+            fields.extend(field for field in source.fields if field not in fields)
+            if source.query_what not in query_strings:
+                query_strings.append(source.query_what)
+        columns = {field: [] for field in fields}
+        for source in sources:
+            for field, column in columns.items():
+                if field in source._columns:
+                    column.extend(_iter_values(source._columns[field], source._rows))
+                else:
+                    column.extend([''] * len(source))
+        assets = FofaAssets._from_columns(
+            fields, [columns[field] for field in fields],
+            query_string=_join_queries(query_strings),
+            mode=self._format_mode
+        )
+        assets.detail = all(source.detail for source in sources)
+        return assets
+    
+    def spill(self, directory: str = None, chunk_rows: int = 10000) -> 'FofaAssets':
+        """Moves the visible rows into a memory-mapped columnar file, in place.
+
+        Afterwards `len`, indexing, column access, filtering and exporting
+        read the values from the mapped file, so only the pages actually
+        touched are held in memory. The file is removed automatically when
+        the object is garbage collected.
+
+        Args:
+            directory: The directory of the spill file. Defaults to the
+                system temporary directory.
+            chunk_rows: The number of rows written per batch.
+
+        Returns:
+            This object, to allow chaining.
+
+        Raises:
+            NotImplementedError: If the results are not tabular.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be spilled to disk'))
+        writer = SpillWriter(directory)
+        for field in self.fields:
+            writer.add_field(field, 'json' if field == _provenance_field else 'str')
+        rows = self._rows if self._rows is not None else range(self._size)
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            writer.append(
+                {field: _take(column, chunk) for field, column in self._columns.items()},
+                len(chunk)
+            )
+        self._columns = writer.finish()
+        self._size = writer.size
+        self._rows = None
+        self._dataset = None
+        self._indexes = {}
+        self.assets_size = self._size
+        return self
+    
     def to_text(self):
         return str(self.assets)
     
     def to_formatted_text(self):
         return str(self.assets)
     
-    def to_csv(self):
+    def to_csv(self, file = None):
+        """Exports the results as CSV.
+
+        Args:
+            file: An optional writable text file object (opened with
+                `newline=''`). If given, the rows are streamed into it one
+                by one instead of building the whole document in memory,
+                which also works for results spilled to disk.
+
+        Returns:
+            The CSV document, or `None` when writing to `file`.
+        """
+        if self._parallel is not None and self._format_mode in _tabular_modes \
+                and len(self) > self._parallel[1]:
+            header = io.StringIO()
+            csv.writer(header).writerow(self.fields)
+            pieces = [header.getvalue()] + self._parallel_export('csv')
+            if file is None:
+                return ''.join(pieces)
+            file.writelines(pieces)
+            return None
+        if file is not None and self._format_mode in _tabular_modes:
+            writer = csv.writer(file)
+            writer.writerow(self.fields)
+            writer.writerows(self._iter_rows())
+            return None
         try:
             return self.assets.export('csv')
         except AttributeError:
             raise AttributeError(_('Please install tablib[all] to \
                 obtain support for additional extension formats'))
     
-    def to_json(self):
+    def to_json(self, file = None):
+        """Exports the results as a JSON array of objects.
+
+        Args:
+            file: An optional writable text file object. If given, the rows
+                are streamed into it one by one.
+
+        Returns:
+            The JSON document, or `None` when writing to `file`.
+        """
+        if file is not None and self._format_mode in _tabular_modes:
+            file.write('[')
+            for number, row in enumerate(self._iter_rows()):
+                if number:
+                    file.write(', ')
+                file.write(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False))
+            file.write(']')
+            return None
         try:
             return self.assets.export('json')
         except AttributeError:
             raise AttributeError(_('Please install tablib[all] to \
                 obtain support for additional extension formats'))
+    
+    def to_ndjson(self, file = None):
+        """Exports the results as newline-delimited JSON, one object per row.
+
+        Args:
+            file: An optional writable text file object. If given, the rows
+                are streamed into it one by one.
+
+        Returns:
+            The NDJSON document, or `None` when writing to `file`.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be exported to ndjson'))
+        if self._parallel is not None and len(self) > self._parallel[1]:
+            lines = self._parallel_export('ndjson') # 每一块是多行文本
+        else:
+            lines = (
+                json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) + '\n'
+                for row in self._iter_rows()
+            )
+        if file is None:
+            return ''.join(lines)
+        file.writelines(lines)
+        return None
             
+    def _parallel_export(self, format_: str) -> list:
+        """Formats the visible rows chunk by chunk in worker processes, in order."""
+        processes, chunk_rows = self._parallel
+        return _map(_export_chunk, [
+            (format_, self.fields, [_pack(self._columns[field], chunk) for field in self.fields])
+            for chunk in _chunks(self._rows, self._size, chunk_rows)
+        ], processes)
+    
     def to_yaml(self):
         try:
             return self.assets.export('yaml')
         except AttributeError:
             raise AttributeError(_('Please install tablib[all] to \
                 obtain support for additional extension formats'))
-            
+
+    def to_parquet(self,
+                   path, # 文件路径或可写的二进制文件对象
+                   row_group_size: int = 50000, # 每个行组的行数
+                   compression: str = 'zstd', # 压缩算法
+                   ):
+        """Archives the search results into a Parquet file.
+
+        The `fields` are mapped to a typed schema (e.g. `port` as int,
+        `latitude` as float, `lastupdatetime` as timestamp, everything else
+        as string) wherever
+        the values convert losslessly, so that `from_parquet` restores the
+        same strings, and the rows are split into row groups so that
+        `from_parquet` can skip whole groups when filtering.
+
+        Args:
+            path: A file path or a writable binary file object.
+            row_group_size: The maximum number of rows per row group.
+            compression: The compression codec, e.g. 'zstd', 'snappy',
+                'gzip' or 'none'. Defaults to 'zstd'.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+            NotImplementedError: If the results are not tabular.
+        """
+        if self._format_mode not in _tabular_modes:
+            raise NotImplementedError(_('Only tabular results \
+                can be exported to parquet'))
+        _write_parquet(
+            path,
+            columns=[self._values(field) for field in self.fields],
+            fields=self.fields,
+            query_string=self.query_what,
+            row_group_size=row_group_size,
+            compression=compression
+        )
+
+    @classmethod
+    def from_parquet(cls,
+                     path, # 文件路径或可读的二进制文件对象
+                     columns: list = None, # 列投影
+                     filters = None, # 谓词下推条件
+                     ) -> 'FofaAssets':
+        """Loads search results from a Parquet archive written by `to_parquet`.
+
+        Args:
+            path: A file path or a readable binary file object.
+            columns: An optional list of fields to read. Other columns are
+                never loaded from disk.
+            filters: Optional row filters in pyarrow's DNF form, pushed down
+                to the reader, e.g. `[('port', 'in', [80, 443])]`. Values use
+                the typed schema (`int` for port, `datetime` for timestamps).
+
+        Returns:
+            A `FofaAssets` object in 'search' mode. Values are converted back
+            to the strings returned by the FOFA API.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        fields, data, query_string = _read_parquet(
+            path, columns=columns, filters=filters
+        )
+        return cls._from_columns(fields, data, query_string=query_string)
+
+
+def _join_queries(query_strings: list) -> str:
+    """Joins the queries of combined results into one query string."""
+    if len(query_strings) == 1:
+        return query_strings[0]
+    return '||'.join('({})'.format(query) for query in query_strings)
+
+
+class _AssetsMerger:
+    """Incrementally merges search results on a hash index of their keys.
+
+    Rows are buffered in memory column by column. Once the buffer exceeds
+    the row or byte threshold, it is appended to a `SpillWriter` and only
+    the hash index, the provenance tuples and a bitmap of filled cells stay
+    in memory. Cells filled in later for rows on disk are recorded as
+    overrides of the mapped columns.
+    """
+    def __init__(self,
+                 key=('ip', 'port'),
+                 spill_rows: int = None,
+                 spill_bytes: int = None,
+                 spill_dir: str = None,
+                 ) -> None:
+        self.key = (key, ) if isinstance(key, str) else tuple(key)
+        self.fields = []
+        self.index = {} # 主键 -> 合并结果中的行号
+        self.size = 0 # 合并结果的总行数
+        self.flushed = 0 # 已经写入磁盘的行数
+        self.buffer = {} # 列名 -> 尚未写入磁盘的列数据
+        self.provenance = [] # 每行的查询来源元组, 始终保存在内存中
+        self.filled = {} # 列名 -> 已写入磁盘的行是否非空
+        self.overrides = {} # 列名 -> {行号: 补全的值}
+        self.query_strings = []
+        self._queries = {} # 查询来源元组的驻留表, 让相同的元组共用一个对象
+        self._buffered_bytes = 0
+        self._spill_rows = spill_rows
+        self._spill_bytes = spill_bytes
+        self._spill_dir = spill_dir
+        self._writer = None
+    
+    def _intern(self, queries: tuple) -> tuple:
+        return self._queries.setdefault(queries, queries)
+    
+    def _add_field(self, field: str) -> None:
+        self.fields.append(field)
+        self.buffer[field] = [''] * (self.size - self.flushed)
+        self.filled[field] = bytearray(self.flushed)
+        self.overrides[field] = {}
+        if self._writer is not None:
+            self._writer.add_field(field)
+    
+    def _should_flush(self) -> bool:
+        pending = self.size - self.flushed
+        if self._spill_rows is not None and pending >= self._spill_rows:
+            return True
+        return self._spill_bytes is not None and self._buffered_bytes >= self._spill_bytes
+    
+    def _flush(self) -> None:
+        pending = self.size - self.flushed
+        if self._writer is None:
+            self._writer = SpillWriter(self._spill_dir)
+            for field in self.fields:
+                self._writer.add_field(field)
+        self._writer.append(self.buffer, pending)
+        for field, column in self.buffer.items():
+            self.filled[field].extend(bytes(value != '' for value in column))
+            del column[:] # 原地清空, 保证外部持有的引用仍然有效
+        self.flushed = self.size
+        self._buffered_bytes = 0
+    
+    def add(self, source: 'FofaAssets') -> None:
+        """Merges the visible rows of `source` into the result."""
+        for field in source.fields:
+            if field != _provenance_field and field not in self.buffer:
+                self._add_field(field)
+        if source.query_what not in self.query_strings:
+            self.query_strings.append(source.query_what)
+        keys = source._key_values(self.key)
+        # (列名, 合并结果的缓冲列, 来源列), 来源缺少的字段为None
+        targets = [
+            (field, self.buffer[field],
+             source._values(field) if field in source._columns else None)
+            for field in self.fields
+        ]
+        if _provenance_field in source._columns:
+            queries = [self._intern(tuple(value)) for value in source._values(_provenance_field)]
+        else:
+            queries = None
+        own = self._intern((source.query_what, ))
+        track_bytes = self._spill_bytes is not None
+        
+        for row, value in enumerate(keys):
+            query = own if queries is None else queries[row]
+            position = self.index.get(value)
+            if position is None:
+                self.index[value] = self.size
+                cells = ['' if column is None else column[row] for __, __, column in targets]
+                for (__, buffer, __), cell in zip(targets, cells):
+                    buffer.append(cell)
+                self.provenance.append(query)
+                self.size += 1
+                if track_bytes:
+                    self._buffered_bytes += _estimate_bytes(cells)
+                if self._should_flush():
+                    self._flush()
+                continue
+            # 重复行, 补全空白字段并记录查询来源
+            if position >= self.flushed:
+                offset = position - self.flushed
+                for __, buffer, column in targets:
+                    if column is not None and buffer[offset] == '':
+                        buffer[offset] = column[row]
+            else:
+                for field, __, column in targets:
+                    if column is not None and not self.filled[field][position] \
+                            and column[row] != '':
+                        self.overrides[field][position] = column[row]
+                        self.filled[field][position] = 1
+            recorded = self.provenance[position]
+            extra = tuple(item for item in query if item not in recorded)
+            if extra:
+                self.provenance[position] = self._intern(recorded + extra)
+    
+    def result(self) -> 'FofaAssets':
+        """Returns the merged rows as a new 'search' mode FofaAssets."""
+        if self._writer is None:
+            columns = [self.buffer[field] for field in self.fields]
+        else:
+            if self.size > self.flushed:
+                self._flush()
+            mapped = self._writer.finish()
+            for field, column in mapped.items():
+                column.overrides = self.overrides[field]
+            columns = [mapped[field] for field in self.fields]
+        query_string = _join_queries(self.query_strings)
+        return FofaAssets._from_columns(
+            self.fields + [_provenance_field],
+            columns + [self.provenance],
+            query_string=query_string
+        )
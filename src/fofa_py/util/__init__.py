@@ -1,5 +1,16 @@
 from .query import search, stats, host
 from .query import search_v2, stats_v2, host_v2
+from .parquet import _write_parquet, _read_parquet
+from .columns import _take, _iter_values, _column_mask, _normalize_operand, TypedColumn, DictColumn
+from .spill import SpillWriter, MappedColumn, _estimate_bytes
+from .shard import Shard, _plan_shards, _shard_facets
+from .checkpoint import HarvestJob
+from .log import LazyLogger, QueuedSink
+from .parallel import _default_chunk_rows, _picklable, _chunks, _pack, _map
+from .parallel import _mask_chunk, _decode_chunk, _export_chunk
+from .pipeline import Pipeline, StageStats
+from .cache import DiskCache
+from .schedule import BudgetScheduler, RecurringJob, _response_cost
 
 __all__ = [
     'search', 'search_v2',
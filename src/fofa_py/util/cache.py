@@ -1 +1,57 @@
-from cachetools import TTLCache, LRUCache, LFUCache
\ No newline at end of file
+# 导入标准库
+import json
+import os
+import threading
+import time
+
+# 导入自定义模块
+from ..basic import sha256
+from .checkpoint import _write_json
+
+
+class DiskCache:
+    """A persistent cache of API responses, one JSON file per entry.
+
+    Entries survive the process, so repeated batch runs only pay for the
+    queries that changed. Files are written atomically and an entry older
+    than `ttl` seconds counts as a miss.
+
+    Args:
+        directory: The cache directory. It is created if needed.
+        ttl: The lifetime of an entry in seconds. `None` (default) keeps
+            entries forever.
+    """
+    def __init__(self, directory: str, ttl: float = None) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock() # 相同的请求可能并发写入同一个文件
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: tuple) -> str:
+        return os.path.join(self.directory, sha256(key) + '.json')
+
+    def get(self, key: tuple) -> dict:
+        """Returns the cached response of `key`, raising `KeyError` on a miss."""
+        path = self._path(key)
+        value = None
+        try:
+            if self.ttl is None or time.time() - os.path.getmtime(path) <= self.ttl:
+                with open(path, encoding='utf-8') as file:
+                    value = json.load(file)
+        except (OSError, ValueError): # 不存在或损坏的文件都算未命中
+            pass
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def put(self, key: tuple, value: dict) -> None:
+        """Stores the response `value` under `key`."""
+        with self._lock:
+            _write_json(self._path(key), value)
@@ -0,0 +1,112 @@
+# 导入标准库
+import json
+import os
+import threading
+
+# 导入自定义模块
+from ..basic import _, now, ParamsMisconfiguredError
+
+_manifest_name = 'manifest.json'
+# 清单中用来判断是否为同一个任务的键
+_job_keys = ('query', 'fields', 'size', 'page_size')
+
+
+def _write_json(path: str, data) -> None:
+    """Writes JSON atomically, so an interrupted write never leaves a broken file."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class HarvestJob:
+    """A multi-page search harvest checkpointed in a directory.
+
+    Every completed page is written to `page_<n>.json` as soon as it
+    arrives, and then recorded in `manifest.json` together with the query,
+    the fields, the page size and the total number of assets. Both files are
+    replaced atomically, so a page listed in the manifest is always complete
+    on disk. Opening the job again on the same directory resumes it: only
+    the pages missing from the manifest are pending.
+
+    Args:
+        directory: The checkpoint directory. It is created if needed.
+        query: The compiled query string.
+        fields: The result fields.
+        size: The total number of rows to harvest.
+        page_size: The number of rows per page request.
+
+    Raises:
+        ParamsMisconfiguredError: If the directory holds the manifest of a
+            different job.
+    """
+    def __init__(self,
+                 directory: str,
+                 query: str,
+                 fields: list,
+                 size: int,
+                 page_size: int,
+                 ) -> None:
+        self.directory = directory
+        self._lock = threading.Lock() # 各页并发完成, 清单的读写需要加锁
+        os.makedirs(directory, exist_ok=True)
+        job = {'query': query, 'fields': list(fields), 'size': size, 'page_size': page_size}
+        path = os.path.join(directory, _manifest_name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.manifest = json.load(file)
+            if any(self.manifest.get(key) != job[key] for key in _job_keys):
+                raise ParamsMisconfiguredError(_('The checkpoint directory \
+                    belongs to another harvest job: ') + directory)
+        else:
+            self.manifest = dict(job, total=None, pages=[], created_at=now(), updated_at=now())
+            _write_json(path, self.manifest)
+
+    @property
+    def done(self) -> list:
+        """The numbers of the completed pages, sorted."""
+        return sorted(self.manifest['pages'])
+
+    @property
+    def total(self) -> int:
+        """The number of assets of the query, `None` before the first page."""
+        return self.manifest['total']
+
+    def planned(self) -> range:
+        """The page numbers needed to harvest the job, as far as known."""
+        if self.total is None:
+            return range(1, 2) # 还不知道总数, 先取第一页
+        rows = min(self.manifest['size'], self.total)
+        return range(1, max(-(-rows // self.manifest['page_size']), 1) + 1)
+
+    def pending(self) -> list:
+        """The planned pages that are not completed yet."""
+        done = set(self.manifest['pages'])
+        return [number for number in self.planned() if number not in done]
+
+    def complete(self) -> bool:
+        return self.total is not None and not self.pending()
+
+    def _page_path(self, number: int) -> str:
+        return os.path.join(self.directory, 'page_{:05d}.json'.format(number))
+
+    def save_page(self, number: int, results: list, total: int) -> None:
+        """Persists the rows of a page, then records it in the manifest."""
+        _write_json(self._page_path(number), results)
+        with self._lock:
+            if self.manifest['total'] is None:
+                self.manifest['total'] = total
+            if number not in self.manifest['pages']:
+                self.manifest['pages'].append(number)
+            self.manifest['updated_at'] = now()
+            _write_json(os.path.join(self.directory, _manifest_name), self.manifest)
+
+    def rows(self) -> list:
+        """Reads the rows of all completed pages in page order."""
+        rows = []
+        for number in self.done:
+            with open(self._page_path(number), encoding='utf-8') as file:
+                rows.extend(json.load(file))
+        return rows[:self.manifest['size']]
@@ -0,0 +1,327 @@
+# 导入标准库
+import re
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+from ipaddress import ip_address, IPv4Address, IPv6Address
+from operator import eq
+
+# 导入自定义模块
+from ..basic import _timestamp_format
+
+# 编译后的正则表达式类型 # re.Pattern在较早的Python版本中不可用
+_pattern_type = type(re.compile(''))
+
+
+def _normalize_operand(value) -> str:
+    """Converts a user supplied operand into the string form FOFA returns."""
+    if isinstance(value, bool):
+        return str(value).lower() # 与_format_query_fields_dict保持一致
+    return str(value)
+
+
+def _take(column, positions) -> list:
+    """Returns the values of `column` at `positions` (all rows if `None`)."""
+    if positions is None:
+        return list(column)
+    return [column[index] for index in positions]
+
+
+def _iter_values(column, positions):
+    """Iterates the values of `column` at `positions` without copying them."""
+    if positions is None:
+        return iter(column)
+    return map(column.__getitem__, positions)
+
+
+def _column_mask(column, positions, spec) -> list:
+    """Evaluates one predicate over a whole column and returns a boolean mask.
+
+    The predicate is evaluated once per column rather than once per row, so
+    the loop runs inside comprehensions and `map` instead of Python-level
+    row objects.
+
+    Args:
+        column: The stored column (a sequence of cell values).
+        positions: The physical row positions to evaluate, or `None` for
+            every row of the column.
+        spec: The predicate. Its type selects the test that is applied:
+            - a set, frozenset, list, tuple or range: membership test;
+            - a compiled regular expression: `pattern.search(value)`;
+            - a callable: `spec(value)` is truthy;
+            - anything else: equality with `str(spec)`.
+
+    Returns:
+        A list of booleans aligned with `positions`.
+    """
+    if hasattr(column, 'mask'):
+        # 编码后的列可以直接在编码值上计算
+        mask = column.mask(positions, spec)
+        if mask is not None:
+            return mask
+    values = _iter_values(column, positions)
+    if isinstance(spec, (set, frozenset, list, tuple, range)):
+        members = set(_normalize_operand(item) for item in spec)
+        return list(map(members.__contains__, values))
+    if isinstance(spec, _pattern_type):
+        search = spec.search
+        return [search(value) is not None for value in values]
+    if callable(spec):
+        return [bool(spec(value)) for value in values]
+    return list(map(partial(eq, _normalize_operand(spec)), values))
+
+
+# 按类型解析和还原字符串的函数
+def _parse_ip(value: str) -> int:
+    address = ip_address(value)
+    if address.version == 4:
+        # IPv4统一映射到::ffff:0:0/96, 这样与IPv6共用同一种定长编码且顺序不变
+        return _ipv4_mapped_prefix | int(address)
+    return int(address)
+
+
+def _format_ip(value: int) -> str:
+    if value >> 32 == _ipv4_mapped_prefix >> 32:
+        return str(IPv4Address(value & 0xFFFFFFFF))
+    return str(IPv6Address(value))
+
+
+def _parse_timestamp(value: str) -> int:
+    # 先按固定格式直接切片, 比strptime快一个数量级
+    if len(value) == 19:
+        moment = datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19])
+        )
+    else:
+        moment = datetime.strptime(value, _timestamp_format)
+    return (moment - _epoch) // _one_second
+
+
+def _format_timestamp(value: int) -> str:
+    return (_epoch + timedelta(seconds=value)).strftime(_timestamp_format)
+
+
+_ipv4_mapped_prefix = 0xFFFF << 32
+_epoch = datetime(1970, 1, 1) # 时间字段没有时区信息, 按UTC换算
+_one_second = timedelta(seconds=1)
+_codecs = {
+    # 类型 -> (解析函数, 还原函数)
+    'ip': (_parse_ip, _format_ip),
+    'int': (int, str),
+    'float': (float, repr),
+    'timestamp': (_parse_timestamp, _format_timestamp),
+}
+
+
+def _int_typecode(values) -> str:
+    """Returns the smallest array typecode able to hold all `values`."""
+    low, high = min(values, default=0), max(values, default=0)
+    for typecode in ('B', 'H', 'L', 'q'):
+        bits = array(typecode).itemsize * 8
+        signed = typecode == 'q'
+        lower = -(1 << (bits - 1)) if signed else 0
+        upper = (1 << (bits - 1)) - 1 if signed else (1 << bits) - 1
+        if lower <= low and high <= upper:
+            return typecode
+    raise OverflowError(high)
+
+
+class TypedColumn:
+    """A column of FOFA strings decoded into a compact typed array.
+
+    IP addresses are packed into 16-byte integers (IPv4 is mapped into the
+    IPv6 space), integers are stored in the smallest fitting array type,
+    timestamps as epoch seconds and coordinates as doubles.
+
+    The original strings remain recoverable: indexing and iterating the
+    column yields strings, formatted back from the typed value. Any value
+    that cannot be parsed, or whose formatted form differs from the
+    original, is kept verbatim in `raw`.
+
+    Attributes:
+        kind: The value type, one of 'ip', 'int', 'float' or 'timestamp'.
+        data: The typed storage, an `array.array` or, for IPs, a
+            `bytearray` of 16 bytes per row.
+        raw: A dictionary of row -> original string for the rows whose
+            string could not be reproduced from `data`.
+    """
+    def __init__(self, kind: str, values) -> None:
+        self.kind = kind
+        self.raw = {}
+        parse, format_ = _codecs[kind]
+        parsed = []
+        for row, value in enumerate(values):
+            try:
+                typed = parse(value)
+                if format_(typed) == value:
+                    parsed.append(typed)
+                    continue
+            except (ValueError, TypeError, OverflowError):
+                pass
+            # 无法解析或者无法原样还原, 保存原始字符串, 数组中填0占位
+            self.raw[row] = value
+            parsed.append(0)
+        
+        if kind == 'ip':
+            self.data = bytearray(b''.join(value.to_bytes(16, 'big') for value in parsed))
+        elif kind == 'float':
+            self.data = array('d', parsed)
+        else:
+            self.data = array(_int_typecode(parsed), parsed)
+        self._size = len(parsed)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @classmethod
+    def concat(cls, parts: list) -> 'TypedColumn':
+        """Joins columns decoded from consecutive chunks of rows, e.g. in worker processes."""
+        column = cls.__new__(cls)
+        column.kind = parts[0].kind
+        column.raw = {}
+        offset = 0
+        for part in parts:
+            column.raw.update((row + offset, value) for row, value in part.raw.items())
+            offset += part._size
+        column._size = offset
+        if column.kind == 'ip':
+            column.data = bytearray(b''.join(part.data for part in parts))
+            return column
+        if column.kind == 'float':
+            typecode = 'd'
+        else:
+            # 各块选择的数组类型可能不同, 取能容纳所有值的类型
+            bounds = [bound for part in parts if len(part.data) for bound in (min(part.data), max(part.data))]
+            typecode = _int_typecode(bounds)
+        column.data = array(typecode)
+        for part in parts:
+            column.data.extend(part.data if part.data.typecode == typecode else iter(part.data))
+        return column
+    
+    def typed(self, row: int):
+        """Returns the typed value of `row`, or `None` for raw strings."""
+        row = range(self._size)[row] # 处理负数索引和越界
+        if row in self.raw:
+            return None
+        if self.kind == 'ip':
+            return int.from_bytes(self.data[row * 16:row * 16 + 16], 'big')
+        return self.data[row]
+    
+    def __getitem__(self, row: int) -> str:
+        row = range(self._size)[row]
+        if row in self.raw:
+            return self.raw[row]
+        return _codecs[self.kind][1](self.typed(row))
+    
+    def __iter__(self):
+        for row in range(self._size):
+            yield self[row]
+    
+    def mask(self, positions, spec):
+        """Evaluates equality and membership predicates on the typed values.
+
+        Returns `None` if `spec` needs the strings, so that the caller falls
+        back to the generic evaluation.
+        """
+        if isinstance(spec, (set, frozenset, list, tuple, range)):
+            operands = set(_normalize_operand(item) for item in spec)
+        elif isinstance(spec, _pattern_type) or callable(spec):
+            return None
+        else:
+            operands = set((_normalize_operand(spec), ))
+        parse, format_ = _codecs[self.kind]
+        members = set()
+        for operand in operands:
+            try:
+                typed = parse(operand)
+            except (ValueError, TypeError, OverflowError):
+                continue
+            if format_(typed) == operand:
+                members.add(typed)
+        
+        rows = range(self._size) if positions is None else positions
+        if self.kind == 'ip':
+            # 直接比较定长的字节串, 不必还原为整数
+            members = set(value.to_bytes(16, 'big') for value in members)
+            data = self.data
+            mask = [bytes(data[row * 16:row * 16 + 16]) in members for row in rows]
+        elif positions is None:
+            mask = list(map(members.__contains__, self.data))
+        else:
+            data = self.data
+            mask = [data[row] in members for row in rows]
+        if self.raw:
+            # 原样保存的字符串仍然按字符串比较
+            raw = self.raw
+            mask = [
+                (raw[row] in operands) if row in raw else matched
+                for row, matched in zip(rows, mask)
+            ]
+        return mask
+
+
+class DictColumn:
+    """A dictionary-encoded (categorical) column of FOFA strings.
+
+    Every distinct string is stored once in `values`, and every row stores
+    only the integer code of its value in `codes`, using the smallest array
+    type that fits the number of distinct values.
+
+    Predicates, counts and groupings are evaluated once per distinct value
+    and then mapped over the codes. Strings are only looked up when a row is
+    read, e.g. for export.
+
+    Attributes:
+        values: The list of distinct strings, in order of first appearance.
+        codes: An `array.array` holding the code of every row.
+    """
+    def __init__(self, values) -> None:
+        self.values = []
+        lookup = {}
+        codes = []
+        for value in values:
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        self.codes = array(_int_typecode([max(len(self.values) - 1, 0)]), codes)
+    
+    @classmethod
+    def from_codes(cls, values: list, codes) -> 'DictColumn':
+        """Rebuilds a column from its distinct values and codes without re-encoding."""
+        column = cls.__new__(cls)
+        column.values = values
+        column.codes = codes
+        return column
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+    
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+    
+    def take_codes(self, positions) -> list:
+        """Returns the codes at `positions` (all rows if `None`)."""
+        if positions is None:
+            return self.codes
+        codes = self.codes
+        return [codes[row] for row in positions]
+    
+    def mask(self, positions, spec) -> list:
+        """Evaluates any predicate once per distinct value and maps it over the codes."""
+        table = _column_mask(self.values, None, spec)
+        return list(map(table.__getitem__, self.take_codes(positions)))
+    
+    def count(self, positions=None) -> dict:
+        """Counts the rows of every value, in order of first appearance."""
+        values = self.values
+        return {
+            values[code]: total
+            for code, total in Counter(self.take_codes(positions)).items()
+        }
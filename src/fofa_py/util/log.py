@@ -0,0 +1,123 @@
+# 导入标准库
+import atexit
+import queue
+import threading
+from itertools import count
+
+# 日志级别名称 -> 数值, 与logging模块一致
+_levels = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+_stop = object() # 通知后台线程退出的哨兵
+
+
+class LazyLogger:
+    """Wraps a logging engine so that messages are only built when they are emitted.
+
+    A message may be a string, an exception, or a callable returning the
+    message, e.g. `log.info(lambda: _('{size} results').format(size=size))`.
+    The callable is only invoked, and so the translation and formatting only
+    happen, if the level is enabled: it must be at least `level`, and, for
+    engines of the standard `logging` module, enabled on the engine as well.
+    Debug lines can additionally be sampled, keeping one in every `sample`.
+
+    Args:
+        engine: The logger to forward to, e.g. the loguru logger or a
+            `logging.Logger`. `None` disables every level.
+        level: The lowest level emitted, one of 'DEBUG' (default), 'INFO',
+            'WARNING' and 'ERROR'. The engine's own level still applies.
+        sample: Emit one in every `sample` debug lines. Defaults to 1 (all).
+    """
+    def __init__(self, engine, level: str = 'DEBUG', sample: int = 1) -> None:
+        self.engine = engine
+        self.level = _levels[level.upper()] if engine is not None else max(_levels.values()) + 1
+        self.sample = max(int(sample), 1)
+        self._counter = count() # next()在CPython中是原子操作, 多线程下无需加锁
+        # loguru按调用栈记录日志位置, 跳过包装器自己的两层
+        self._opt = engine.opt(depth=2) if hasattr(engine, 'opt') else engine
+        self._check = getattr(engine, 'isEnabledFor', None)
+
+    def enabled(self, level: str) -> bool:
+        """Returns whether messages of `level` would be emitted."""
+        number = _levels[level]
+        if number < self.level:
+            return False
+        return self._check is None or self._check(number)
+
+    def _emit(self, level: str, message) -> None:
+        if callable(message) and not isinstance(message, BaseException):
+            message = message()
+        getattr(self._opt, level.lower())(message)
+
+    def debug(self, message) -> None:
+        if not self.enabled('DEBUG'):
+            return
+        if self.sample > 1 and next(self._counter) % self.sample:
+            return
+        self._emit('DEBUG', message)
+
+    def info(self, message) -> None:
+        if self.enabled('INFO'):
+            self._emit('INFO', message)
+
+    def warning(self, message) -> None:
+        if self.enabled('WARNING'):
+            self._emit('WARNING', message)
+
+    def error(self, message) -> None:
+        if self.enabled('ERROR'):
+            self._emit('ERROR', message)
+
+
+class QueuedSink:
+    """A non-blocking log sink that writes from a background thread.
+
+    Emitting a message only puts it on a bounded queue, so logging never
+    waits for a slow terminal, file or network sink. When the queue is full
+    the message is dropped and counted in `dropped` instead of blocking.
+    Pending messages are written when the process exits, or on `drain`.
+
+    Example:
+        >>> from loguru import logger
+        >>> logger.remove()
+        >>> logger.add(QueuedSink(sys.stderr))
+
+    Args:
+        sink: A writable file object, or a callable taking one message.
+        maxsize: The capacity of the queue.
+    """
+    def __init__(self, sink, maxsize: int = 10000) -> None:
+        self._write = sink.write if hasattr(sink, 'write') else sink
+        self._queue = queue.Queue(maxsize)
+        self.dropped = 0 # 队列满时丢弃的消息数
+        self._thread = threading.Thread(target=self._run, name='fofa_py-log-sink', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __call__(self, message) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    write = __call__
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            try:
+                if message is _stop:
+                    return
+                self._write(message)
+            except Exception:
+                pass # 日志输出失败不能影响主流程
+            finally:
+                self._queue.task_done()
+
+    def drain(self) -> None:
+        """Blocks until every queued message has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the pending messages and stops the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(_stop)
+            self._thread.join()
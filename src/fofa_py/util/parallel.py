@@ -0,0 +1,120 @@
+# 导入标准库
+import atexit
+import csv
+import io
+import json
+import pickle
+import threading
+from array import array
+from itertools import compress
+
+# 导入自定义模块
+from .columns import _take, _column_mask, TypedColumn, DictColumn
+
+_default_chunk_rows = 20000 # 每个子进程任务处理的行数
+_executors = {} # 进程数 -> 进程池, 同一个进程池在多次变换之间复用
+_executors_lock = threading.Lock()
+
+
+def _executor(processes: int = None):
+    """Returns the shared process pool with `processes` workers, starting it on first use."""
+    # multiprocessing在第一次用到进程池时才导入, 不拖慢import fofa_py
+    from concurrent.futures import ProcessPoolExecutor
+    with _executors_lock:
+        executor = _executors.get(processes)
+        if executor is None:
+            executor = _executors[processes] = ProcessPoolExecutor(max_workers=processes)
+        return executor
+
+
+@atexit.register
+def _shutdown() -> None:
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False)
+        _executors.clear()
+
+
+def _picklable(value) -> bool:
+    """Returns whether `value` can be sent to a worker process, e.g. not a lambda."""
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def _chunks(positions, size: int, chunk_rows: int) -> list:
+    """Splits the physical rows `positions` (all `size` rows if `None`) into chunks."""
+    rows = range(size) if positions is None else positions
+    return [rows[start:start + chunk_rows] for start in range(0, len(rows), chunk_rows)]
+
+
+def _pack(column, positions):
+    """Serializes the values of `column` at `positions` compactly for a worker.
+
+    Dictionary-encoded columns only send their distinct values and a typed
+    array of codes. Any other column, including typed and memory-mapped
+    ones, sends the plain strings of the chunk, so the column object itself
+    never has to be pickled.
+    """
+    if isinstance(column, DictColumn):
+        codes = column.take_codes(positions)
+        return ('dict', column.values, array(column.codes.typecode, codes))
+    if isinstance(column, list) and isinstance(positions, range) and positions.step == 1:
+        return ('list', column[positions.start:positions.stop]) # 连续的行直接切片
+    return ('list', _take(column, positions))
+
+
+def _unpack(packed):
+    kind, *data = packed
+    if kind == 'dict':
+        return DictColumn.from_codes(*data)
+    return data[0]
+
+
+def _map(function, payloads: list, processes: int = None) -> list:
+    """Runs `function` over the payloads in worker processes, keeping their order."""
+    if len(payloads) <= 1:
+        return [function(payload) for payload in payloads] # 只有一块时不值得启动子进程
+    return list(_executor(processes).map(function, payloads))
+
+
+# 以下是在子进程中执行的函数, 必须定义在模块顶层才能被pickle
+def _mask_chunk(payload) -> bytes:
+    """Evaluates column predicates and query nodes over one chunk of rows."""
+    columns, specs, nodes = payload
+    columns = dict((field, _unpack(packed)) for field, packed in columns.items())
+    size = len(next(iter(columns.values()))) if columns else 0
+    selected = list(range(size))
+    for field, spec in specs.items():
+        mask = _column_mask(columns[field], selected if len(selected) < size else None, spec)
+        selected = list(compress(selected, mask))
+    for node in nodes:
+        names = sorted(node.fields())
+        selected = [
+            row for row in selected
+            if node.evaluate(dict((name, columns[name][row]) for name in names))
+        ]
+    mask = bytearray(size)
+    for row in selected:
+        mask[row] = 1
+    return bytes(mask)
+
+
+def _decode_chunk(payload) -> TypedColumn:
+    kind, packed = payload
+    return TypedColumn(kind, _unpack(packed))
+
+
+def _export_chunk(payload) -> str:
+    """Formats one chunk of rows as CSV lines (without header) or NDJSON lines."""
+    format_, fields, columns = payload
+    rows = zip(*[_unpack(packed) for packed in columns])
+    if format_ == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n' for row in rows
+    )
@@ -0,0 +1,155 @@
+# 导入标准库
+from datetime import datetime
+
+# 导入自定义模块
+from ..basic import _, _typed_fields, _timestamp_format
+
+# 写入Parquet文件元数据时使用的键
+_meta_query_key = b'fofa_py.query_string'
+
+
+def _import_pyarrow():
+    """Imports pyarrow lazily, since it is an optional dependency."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(_('Please install pyarrow (python-fofa-sy[parquet]) \
+            to obtain support for the parquet format'))
+    return pyarrow
+
+
+def _parse_typed_value(kind: str, value):
+    """Parses one cell into the python type used by the parquet schema."""
+    if value is None or value == '':
+        return None # 空字符串统一存为null
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    if kind == 'timestamp':
+        return datetime.strptime(value, _timestamp_format)
+    raise KeyError(kind)
+
+
+def _format_typed_value(value) -> str:
+    """Formats one cell read back from parquet into the FOFA string form."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime(_timestamp_format)
+    if isinstance(value, list):
+        return tuple(value) # 合并结果中记录查询来源的列
+    return str(value)
+
+
+def _build_column(pa, field: str, values: list):
+    """Builds an arrow array for `field`, typed according to `_typed_fields`.
+
+    A typed column falls back to strings as soon as a single value cannot be
+    parsed, or would not be read back as the same string, so that
+    `_read_parquet` restores exactly what was written.
+    """
+    # IP地址仍然以字符串形式归档
+    arrow_types = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'timestamp': pa.timestamp('s'),
+    }
+    kind = _typed_fields.get(field)
+    if kind in arrow_types:
+        try:
+            parsed = [_parse_typed_value(kind, value) for value in values]
+            if any(
+                value is not None and _format_typed_value(item) != value
+                for value, item in zip(values, parsed)
+            ):
+                raise ValueError(field) # 例如'080'存为整数后会读回'80', '39.90'会读回'39.9'
+            return pa.array(parsed, type=arrow_types[kind])
+        except (ValueError, TypeError, OverflowError):
+            pass # 存在无法无损转换的值, 回退为字符串列
+    if values and all(isinstance(value, tuple) for value in values):
+        # 合并结果中记录查询来源的列, 每个单元格是查询字符串组成的元组
+        return pa.array([list(value) for value in values], type=pa.list_(pa.string()))
+    return pa.array(
+        [None if value is None else str(value) for value in values],
+        type=pa.string()
+    )
+
+
+def _write_parquet(
+    path, # 文件路径或可写的二进制文件对象
+    columns: list, # 与fields一一对应的列数据
+    fields: list, # 列名
+    query_string: str = '', # 查询字符串, 写入文件元数据
+    row_group_size: int = 50000, # 每个行组的行数
+    compression: str = 'zstd', # 压缩算法
+):
+    """Writes FOFA search columns into a Parquet file with a typed schema.
+
+    Args:
+        path: A file path or a writable binary file object.
+        columns: A list of columns (lists of cell values), in the same order
+            as `fields`.
+        fields: The column names, i.e. the FOFA result fields.
+        query_string: The query the data came from. It is stored in the file
+            metadata and restored by `_read_parquet`.
+        row_group_size: The maximum number of rows per row group. Smaller
+            row groups make predicate pushdown more selective.
+        compression: The compression codec, e.g. 'zstd', 'snappy', 'gzip'
+            or 'none'.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    pa = _import_pyarrow()
+    arrays = [
+        _build_column(pa, field, values) for field, values in zip(fields, columns)
+    ]
+    table = pa.Table.from_arrays(arrays, names=list(fields))
+    table = table.replace_schema_metadata({
+        _meta_query_key: query_string.encode('utf8'),
+    })
+    pa.parquet.write_table(
+        table, path,
+        row_group_size=row_group_size,
+        compression=compression
+    )
+
+
+def _read_parquet(
+    path, # 文件路径或可读的二进制文件对象
+    columns: list = None, # 列投影, 只读取需要的列
+    filters = None, # 谓词下推条件, 格式同pyarrow.parquet.read_table
+):
+    """Reads a Parquet archive written by `_write_parquet`.
+
+    Only the requested `columns` are read from disk, and `filters` are pushed
+    down to the reader so that row groups whose statistics cannot match are
+    skipped entirely.
+
+    Args:
+        path: A file path or a readable binary file object.
+        columns: An optional list of field names to read. Defaults to all.
+        filters: Optional row filters in pyarrow's DNF form, e.g.
+            `[('port', 'in', [80, 443]), ('country', '=', 'CN')]`. Values
+            must use the typed schema (`int` for port, `datetime` for
+            lastupdatetime and so on).
+
+    Returns:
+        A tuple `(fields, columns, query_string)`, where `columns` holds the
+        values converted back to the strings FOFA originally returned.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    pa = _import_pyarrow()
+    table = pa.parquet.read_table(path, columns=columns, filters=filters)
+    metadata = table.schema.metadata or {}
+    query_string = metadata.get(_meta_query_key, b'').decode('utf8')
+    fields = list(table.column_names)
+    data = [
+        [_format_typed_value(value) for value in table.column(index).to_pylist()]
+        for index in range(len(fields))
+    ]
+    return fields, data, query_string
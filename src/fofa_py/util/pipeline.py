@@ -0,0 +1,210 @@
+# 导入标准库
+import queue
+import threading
+import time
+
+# 导入自定义模块
+from ..basic import _
+
+_end = object() # 通知下游当前阶段已经结束的哨兵
+_poll_interval = 0.1 # 出错停止时, 阻塞在队列上的线程检查停止标记的间隔
+_scalars = (tuple, str, bytes, dict) # 有长度但不是一批行的条目
+
+
+class StageStats:
+    """Throughput counters of one pipeline stage.
+
+    Attributes:
+        name: The stage name.
+        workers: The number of worker threads of the stage.
+        items: The number of items the stage produced (or consumed, for
+            the sink).
+        rows: The number of rows in those items, for batches of rows such
+            as `FofaAssets` objects or lists. Tuples, strings and dicts are
+            single items and count no rows.
+        busy: The total seconds the workers spent inside the stage function,
+            excluding the time waiting on the queues.
+        elapsed: The wall-clock seconds from the start of the pipeline to
+            the moment the last worker of the stage finished.
+    """
+    __slots__ = ('name', 'workers', 'items', 'rows', 'busy', 'elapsed', '_lock')
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def _record(self, item, seconds: float) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy += seconds
+            if hasattr(item, '__len__') and not isinstance(item, _scalars):
+                self.rows += len(item)
+
+    @property
+    def rate(self) -> float:
+        """Rows per second of wall-clock time (items per second if no rows)."""
+        return (self.rows or self.items) / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self) -> str:
+        return '<StageStats {} workers={} items={} rows={} busy={:.2f}s rate={:.1f}/s>'.format(
+            self.name, self.workers, self.items, self.rows, self.busy, self.rate
+        )
+
+
+class Pipeline:
+    """A chain of stages connected by bounded queues.
+
+    Every stage runs its function in `workers` threads, taking items from
+    the queue of the previous stage and putting the results on its own
+    queue. Queues hold at most `maxsize` items, so a slow stage blocks the
+    stages before it and a slow sink throttles fetching, and memory stays
+    bounded whatever the size of the harvest. A stage function may return
+    `None` to drop an item. With more than one worker, a stage may reorder
+    its items.
+
+    If any stage raises, the pipeline stops all stages and `run` raises the
+    first error.
+
+    Example:
+        >>> pipe = Pipeline(range(10)).then(lambda x: x * x, workers=2)
+        >>> pipe.sink(print).run()
+
+    Args:
+        source: An iterable of the first items, consumed in its own thread.
+        maxsize: The capacity of every queue between two stages.
+        name: The name of the source stage in the statistics.
+    """
+    def __init__(self, source, maxsize: int = 8, name: str = 'source') -> None:
+        self._source = source
+        self._maxsize = maxsize
+        self._stages = [(StageStats(name, 1), None)]
+        self._closed = False
+
+    def then(self, function, name: str = None, workers: int = 1) -> 'Pipeline':
+        """Appends a stage transforming every item with `function`."""
+        if self._closed:
+            raise ValueError(_('Cannot add a stage after the sink'))
+        name = name or getattr(function, '__name__', 'stage{}'.format(len(self._stages)))
+        self._stages.append((StageStats(name, max(int(workers), 1)), function))
+        return self
+
+    def sink(self, function, name: str = 'sink', workers: int = 1) -> 'Pipeline':
+        """Appends the final stage, which consumes every item with `function`."""
+        self.then(function, name=name, workers=workers)
+        self._closed = True
+        return self
+
+    @property
+    def stats(self) -> list:
+        """The `StageStats` of every stage, in order."""
+        return [stats for stats, __ in self._stages]
+
+    def run(self) -> list:
+        """Runs the pipeline to completion.
+
+        Returns:
+            The `StageStats` of every stage, in order.
+
+        Raises:
+            Exception: The first error raised by a stage.
+        """
+        stop = threading.Event()
+        errors = []
+        queues = [queue.Queue(self._maxsize) for __ in self._stages[1:]]
+        start = time.perf_counter()
+
+        def _put(target: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=_poll_interval)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _get(source: queue.Queue):
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=_poll_interval)
+                except queue.Empty:
+                    continue
+            return _end
+
+        def _fail(error: BaseException) -> None:
+            errors.append(error)
+            stop.set()
+
+        def _finish(index: int) -> None:
+            """Called by the last worker of stage `index`: signals every downstream worker."""
+            self._stages[index][0].elapsed = time.perf_counter() - start
+            if index < len(queues):
+                for __ in range(self._stages[index + 1][0].workers):
+                    _put(queues[index], _end)
+
+        def _run_source() -> None:
+            stats = self._stages[0][0]
+            try:
+                iterator = iter(self._source)
+                while not stop.is_set():
+                    began = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    stats._record(item, time.perf_counter() - began)
+                    if queues and not _put(queues[0], item):
+                        break
+            except Exception as e:
+                _fail(e)
+            _finish(0)
+
+        def _run_stage(index: int, remaining: list, lock: threading.Lock) -> None:
+            stats, function = self._stages[index]
+            source = queues[index - 1]
+            target = queues[index] if index < len(queues) else None
+            try:
+                while True:
+                    item = _get(source)
+                    if item is _end:
+                        break
+                    began = time.perf_counter()
+                    result = function(item)
+                    if target is None: # 最后一个阶段统计消费的条目
+                        stats._record(item, time.perf_counter() - began)
+                        continue
+                    if result is None:
+                        continue
+                    stats._record(result, time.perf_counter() - began)
+                    if not _put(target, result):
+                        break
+            except Exception as e:
+                _fail(e)
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                _finish(index)
+
+        threads = [threading.Thread(target=_run_source, name='fofa_py-pipeline-source', daemon=True)]
+        for index in range(1, len(self._stages)):
+            stats = self._stages[index][0]
+            remaining, lock = [stats.workers], threading.Lock()
+            threads.extend(
+                threading.Thread(
+                    target=_run_stage, args=(index, remaining, lock),
+                    name='fofa_py-pipeline-' + stats.name, daemon=True
+                )
+                for __ in range(stats.workers)
+            )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return self.stats
@@ -1,8 +1,5 @@
 # 导入第三方依赖
-import errno
-import requests
-from requests import ConnectionError, ConnectTimeout
-from loguru import logger
+# requests在第一次发送请求时才导入, 只构造查询或处理结果时不必为它付出导入时间
 
 # 导入标准库
 from base64 import b64encode
@@ -51,10 +48,11 @@ def _fofa_get(
         InsufficientPermissions: If it's not a professional or enterprise version API, 
         then advanced features cannot be used (errmsg contains '[-403]')
     """
+    import requests
     _ = translator # 换个名称
     try:
         result = requests.get(url, params=params, headers=headers, cookies=cookies)
-    except (ConnectionError, ConnectTimeout) as e:
+    except (requests.ConnectionError, requests.ConnectTimeout) as e:
         logger.error(_("Connection error or timeout: {error}").format(error=e))
         raise FofaConnectionError(_("Connection error or timeout: {error}").format(error=e))
     
@@ -276,6 +274,7 @@ def _fofa_get_v2(
         }, # 代理
     timeout: int = 30, # 超时时间
     # 数据量比较大的时候查询时间可能会很大
+    session = None, # 复用连接池的requests.Session
 ):
     """Sends a GET request to a FOFA API endpoint and handles the response.
 
@@ -301,6 +300,9 @@ def _fofa_get_v2(
             Defaults to `None`.
         timeout: The request timeout in seconds. A longer timeout is often
             necessary for queries that return a large amount of data.
+        session: An optional `requests.Session` whose connection pool is
+            reused across requests. Defaults to `None`, a new connection
+            per request.
 
     Returns:
         A dictionary containing the parsed JSON response from the FOFA API
@@ -309,6 +311,7 @@ def _fofa_get_v2(
     Raises:
         FofaConnectionError: If a network-level error occurs (e.g., DNS
             failure, connection timeout).
+        FofaRateLimited: If the API answers with HTTP status 429.
         FofaRequestFailed: If the API returns a non-200 HTTP status code or
             if the response JSON indicates a generic error (`'error': True`).
         FofaQuerySyntaxError: If the API error message contains '[820000]',
@@ -317,10 +320,11 @@ def _fofa_get_v2(
             indicating the API key lacks the necessary permissions for the
             request.
     """
+    import requests
     _ = translator # 变更引用名称
     result = {}
     try:
-        result = requests.get(
+        result = (session or requests).get(
             url=url,
             params=params,
             headers=headers,
@@ -335,6 +339,9 @@ def _fofa_get_v2(
         logger.error(_(msg))
         raise FofaConnectionError(_(msg))
     
+    if result.status_code == 429:
+        logger.error(_("FOFA query failed. Too many requests"))
+        raise FofaRateLimited()
     if result.status_code != 200:
         msg = "FOFA query failed. Status code: %s" % result.status_code
         logger.error(_(msg))
@@ -407,6 +414,7 @@ def search_v2(
 
     Raises:
         FofaConnectionError: If a network-level error occurs.
+        FofaRateLimited: If the API answers with HTTP status 429.
         FofaRequestFailed: If the API returns a non-200 status code or a
             generic error.
         FofaQuerySyntaxError: If the API indicates a syntax error in the query.
@@ -479,6 +487,7 @@ def stats_v2(
 
     Raises:
         FofaConnectionError: If a network-level error occurs.
+        FofaRateLimited: If the API answers with HTTP status 429.
         FofaRequestFailed: If the API returns a non-200 status code or a
             generic error.
         FofaQuerySyntaxError: If the API indicates a syntax error in the query.
@@ -535,6 +544,7 @@ def host_v2(
 
     Raises:
         FofaConnectionError: If a network-level error occurs.
+        FofaRateLimited: If the API answers with HTTP status 429.
         FofaRequestFailed: If the API returns a non-200 status code or a
             generic error.
         FofaQuerySyntaxError: If the API indicates a syntax error in the query.
@@ -0,0 +1,303 @@
+# 导入标准库
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+# 导入自定义模块
+from ..basic import _, ParamsMisconfiguredError
+
+_smoothing = 0.3 # 观测到的F点消耗的指数平滑系数, 越大越偏向最近一次
+
+
+def _response_cost(result) -> float:
+    """Returns the F-points a response reports, preferring `consumed_fpoint`.
+
+    `result` may be a raw response dict or any object exposing one as
+    `results`, such as `FofaAssets`. Unknown costs count as 0.
+    """
+    res = result if isinstance(result, dict) else getattr(result, 'results', None)
+    if not isinstance(res, dict):
+        return 0.0
+    for key in ('consumed_fpoint', 'required_fpoints'):
+        if res.get(key) is not None:
+            return float(res[key])
+    return 0.0
+
+
+class RecurringJob:
+    """A query run every `interval` seconds by a `BudgetScheduler`.
+
+    Attributes:
+        name: The unique name of the job.
+        function: The callable running the query. Its return value is
+            passed to `callback` and inspected for the F-points it cost.
+        interval: The seconds between two runs.
+        priority: The weight of the job, higher runs first.
+        requests: The number of API requests one run sends.
+        cost: The estimated F-points of one run: the initial estimate at
+            first, then a moving average of the observed costs. `None`
+            until known.
+        next_due: The clock time of the next run.
+        last_run: The clock time of the last run, `None` if never run.
+        runs: The number of completed runs, whose query and callback
+            both succeeded.
+        failures: The number of runs whose query or callback raised.
+        error: The exception of the last failed run.
+    """
+    def __init__(self, name: str, function, interval: float,
+                 priority: float = 1.0, cost: float = None, requests: int = 1,
+                 callback = None, due: float = 0.0) -> None:
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.priority = priority
+        self.cost = cost
+        self.requests = requests
+        self.callback = callback
+        self.next_due = due
+        self.last_run = None
+        self.runs = 0
+        self.failures = 0
+        self.error = None
+        self._removed = False
+
+    def score(self, now: float) -> float:
+        """The urgency of the job: its priority, raised by how overdue it is."""
+        overdue = max(now - self.next_due, 0.0)
+        return self.priority * (1.0 + overdue / self.interval)
+
+    def _observe(self, cost: float) -> None:
+        self.cost = cost if self.cost is None else (1 - _smoothing) * self.cost + _smoothing * cost
+
+    def __repr__(self) -> str:
+        return '<RecurringJob {} every {}s priority={} cost={} runs={}>'.format(
+            self.name, self.interval, self.priority, self.cost, self.runs
+        )
+
+
+class BudgetScheduler:
+    """Runs recurring queries as often as an F-point and request budget allows.
+
+    Jobs wait in a priority queue ordered by due time. Among the due jobs,
+    the ones with the highest `RecurringJob.score` (priority, weighted by
+    how stale they are) run first, as long as their estimated cost fits in
+    what is left of the budget of the sliding `window`. Every run reserves
+    its estimated cost and requests, and the reservation is corrected to
+    the F-points the response reports (`consumed_fpoint`, or
+    `required_fpoints`), which also updates the estimate of the job.
+
+    When the most urgent job does not fit, cheaper due jobs fill the rest of
+    the budget, until it has waited a whole interval: from then on the
+    budget is held back for it, so expensive jobs are not starved. A job
+    whose observed cost exceeds the budget of a whole window is skipped.
+
+    Example:
+        >>> scheduler = BudgetScheduler(fpoints=1000, requests=120, window=3600)
+        >>> client.schedule(scheduler, 'app="nginx"', interval=600, priority=5)
+        >>> scheduler.run(until=time.monotonic() + 86400)
+
+    Args:
+        fpoints: The F-points that may be spent per window. `None` for no
+            limit.
+        requests: The requests that may be sent per window. `None` for no
+            limit.
+        window: The length of the sliding budget window in seconds.
+        max_workers: The number of jobs running at the same time.
+        clock: The time source, `time.monotonic` by default.
+    """
+    def __init__(self,
+                 fpoints: float = None,
+                 requests: int = None,
+                 window: float = 3600.0,
+                 max_workers: int = 1,
+                 clock = time.monotonic,
+                 ) -> None:
+        self.fpoints = fpoints
+        self.requests = requests
+        self.window = window
+        self.max_workers = max(int(max_workers), 1)
+        self.clock = clock
+        self.jobs = {} # 任务名 -> RecurringJob
+        self._heap = [] # (到期时间, 序号, 任务)
+        self._order = count() # 到期时间相同时按加入顺序
+        self._spent = deque() # 窗口内的开销, 每项为[时间, F点, 请求数], 结果返回后修正
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+
+    def add(self, name: str, function, interval: float,
+            priority: float = 1.0, cost: float = None, requests: int = 1,
+            callback = None, delay: float = 0.0) -> RecurringJob:
+        """Adds a recurring job, replacing any job of the same name.
+
+        Args:
+            name: The unique name of the job.
+            function: A callable without arguments running the query.
+            interval: The seconds between two runs.
+            priority: The weight of the job, higher runs first.
+            cost: The initial F-point estimate of one run. `None` (default)
+                uses the average estimate of the other jobs.
+            requests: The number of API requests one run sends.
+            callback: An optional callable receiving the return value of
+                every successful run. Its exceptions fail the run, like
+                those of `function`, instead of stopping the scheduler.
+            delay: Seconds before the first run.
+
+        Returns:
+            The added `RecurringJob`.
+
+        Raises:
+            ParamsMisconfiguredError: If one run needs more requests than
+                the whole window allows.
+        """
+        if self.requests is not None and requests > self.requests:
+            raise ParamsMisconfiguredError(_('A run of job {name} sends {requests} requests, \
+                more than the budget of {budget} per window').format(
+                name=name, requests=requests, budget=self.requests))
+        job = RecurringJob(name, function, interval, priority, cost, requests,
+                           callback, due=self.clock() + delay)
+        with self._lock:
+            self.remove(name)
+            self.jobs[name] = job
+            heapq.heappush(self._heap, (job.next_due, next(self._order), job))
+        return job
+
+    def remove(self, name: str) -> None:
+        """Removes a job; a run in progress still completes."""
+        with self._lock:
+            job = self.jobs.pop(name, None)
+            if job is not None:
+                job._removed = True # 堆中的条目在弹出时丢弃
+
+    def _expire(self, now: float) -> None:
+        while self._spent and self._spent[0][0] <= now - self.window:
+            self._spent.popleft()
+
+    def spent(self) -> tuple:
+        """Returns the F-points and requests spent in the current window."""
+        with self._lock:
+            self._expire(self.clock())
+            return (
+                sum(entry[1] for entry in self._spent),
+                sum(entry[2] for entry in self._spent),
+            )
+
+    def _estimate(self, job: RecurringJob) -> float:
+        if job.cost is not None:
+            return job.cost
+        known = [other.cost for other in self.jobs.values() if other.cost is not None]
+        return sum(known) / len(known) if known else 0.0
+
+    def _fits(self, job: RecurringJob, fpoints: float, requests: int) -> bool:
+        if self.fpoints is not None and fpoints + self._estimate(job) > self.fpoints:
+            return False
+        return self.requests is None or requests + job.requests <= self.requests
+
+    def _possible(self, job: RecurringJob) -> bool:
+        """Returns whether the job fits in an empty window at all."""
+        return self._fits(job, 0.0, 0)
+
+    def _select(self, now: float, limit: int) -> list:
+        """Pops up to `limit` due jobs that fit the budget and reserves it for them."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            job = heapq.heappop(self._heap)[2]
+            if not job._removed:
+                due.append(job)
+        due.sort(key=lambda job: job.score(now), reverse=True)
+        fpoints, requests = self.spent()
+        selected, waiting, blocked = [], [], False
+        for job in due:
+            if len(selected) < limit and not blocked and self._fits(job, fpoints, requests):
+                entry = [now, self._estimate(job), job.requests]
+                self._spent.append(entry)
+                fpoints += entry[1]
+                requests += entry[2]
+                selected.append((job, entry))
+                continue
+            waiting.append(job)
+            if now - job.next_due >= job.interval and self._possible(job):
+                blocked = True # 为等待太久的任务保留预算, 不再让后面的任务插队
+        for job in waiting:
+            heapq.heappush(self._heap, (job.next_due, next(self._order), job))
+        return selected
+
+    def _execute(self, job: RecurringJob, entry: list):
+        result, cost, error = None, None, None
+        try:
+            result = job.function()
+            cost = _response_cost(result)
+        except Exception as e:
+            error = e
+        with self._lock:
+            if cost is not None:
+                entry[1] = cost # 用实际消耗修正预留的开销
+                job._observe(cost)
+            now = self.clock()
+            job.last_run = now
+            job.next_due = now + job.interval
+            if not job._removed:
+                heapq.heappush(self._heap, (job.next_due, next(self._order), job))
+        if error is None and job.callback is not None:
+            try:
+                job.callback(result)
+            except Exception as e: # 回调的异常不能中断调度循环
+                error = e
+        with self._lock:
+            if error is None:
+                job.runs += 1
+            else:
+                job.failures += 1
+                job.error = error
+        return result
+
+    def run_pending(self) -> list:
+        """Runs the due jobs that fit the budget, and returns them.
+
+        The jobs run concurrently, up to `max_workers` at a time.
+        """
+        with self._lock:
+            selected = self._select(self.clock(), self.max_workers)
+        if len(selected) <= 1:
+            for job, entry in selected:
+                self._execute(job, entry)
+        else:
+            with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+                list(executor.map(lambda pair: self._execute(*pair), selected))
+        return [job for job, __ in selected]
+
+    def next_wakeup(self) -> float:
+        """Returns the clock time at which a job may next become runnable."""
+        with self._lock:
+            now = self.clock()
+            while self._heap and self._heap[0][2]._removed:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return now + self.window
+            wakeup = self._heap[0][0]
+            if wakeup <= now: # 到期的任务放不进预算, 等最早的开销移出窗口或下一个任务到期
+                self._expire(now)
+                wakeup = min(
+                    [self._spent[0][0] + self.window if self._spent else now + self.window]
+                    + [due for due, __, job in self._heap if due > now and not job._removed]
+                )
+            return max(wakeup, now)
+
+    def run(self, until: float = None) -> None:
+        """Runs jobs until `stop` is called or the clock reaches `until`."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            if until is not None and self.clock() >= until:
+                return
+            if self.run_pending():
+                continue
+            wakeup = self.next_wakeup()
+            if until is not None:
+                wakeup = min(wakeup, until)
+            self._stop.wait(max(wakeup - self.clock(), 0.0))
+
+    def stop(self) -> None:
+        """Makes `run` return after the jobs in progress."""
+        self._stop.set()
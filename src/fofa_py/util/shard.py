@@ -0,0 +1,133 @@
+# 导入标准库
+from datetime import date, timedelta
+
+# 导入自定义模块
+from ..basic import Term, And, after, before
+
+# 默认依次用来拆分查询的字段, 都是stats接口支持且取值精确的字段
+_shard_facets = ('country', 'port', 'protocol', 'asn')
+_one_day = timedelta(days=1)
+
+
+class Shard:
+    """A planned sub-query of a sharded search.
+
+    Attributes:
+        query: The sub-query, a query node.
+        size: The number of assets FOFA reports for it.
+        complete: `False` if the sub-query still exceeds the row cap because
+            it could not be split any further; only the first `cap` rows of
+            it can then be harvested.
+    """
+    __slots__ = ('query', 'size', 'complete')
+
+    def __init__(self, query, size: int, complete: bool = True) -> None:
+        self.query = query
+        self.size = size
+        self.complete = complete
+
+    def __repr__(self) -> str:
+        return '<Shard {} size={}{}>'.format(
+            self.query, self.size, '' if self.complete else ' incomplete'
+        )
+
+
+def _window(base, window):
+    """Restricts `base` to the half-open day range `window`, `[low, high)`."""
+    if window is None:
+        return base
+    low, high = window
+    # after包含当天, before不包含当天, 相邻的窗口首尾相接且互不重叠
+    return And(base, after(low), before(high))
+
+
+def _plan_shards(
+    count, # 统计函数, count(query, facet) -> (总数, [(值, 数目), ...])
+    query, # 要拆分的查询, 语法树节点
+    cap: int, # 单个子查询最多能取回的行数
+    facets = _shard_facets, # 依次用来拆分的字段
+    since: date = None, # 字段用尽后按时间窗口二分的起始日期, None表示不按时间拆分
+    until: date = None, # 时间窗口的结束日期, 默认为今天
+    map_ = map, # 并发执行统计时传入executor.map
+) -> list:
+    """Recursively splits a query into disjoint sub-queries under a row cap.
+
+    The planner works level by level, and all the stats calls of a level are
+    issued through `map_` at once. A query above `cap` is split on the next
+    facet: every top bucket `v` that the stats call reports becomes the
+    sub-query `query && facet=="v"`, whose size is already known, and the
+    rest becomes `query && facet!="v1" && ...`, which is split on the same
+    facet again until its buckets run out. Once all facets are used, a query
+    is bisected into `after`/`before` day windows starting at `since`. The
+    windows are half-open, `after` the first day and `before` the day after
+    the last one, so that no asset falls into two of them.
+
+    Args:
+        count: A function `count(query, facet)` returning the total number
+            of assets of `query` and the `(value, count)` buckets of `facet`
+            (`facet` is `None` when only the total is needed).
+        query: The query node to split.
+        cap: The maximum number of rows a single sub-query can return.
+        facets: The fields to split on, in order. They should be exact
+            valued fields supported by the stats API.
+        since: The first day of the time windows. `None` disables splitting
+            by time.
+        until: The last day of the time windows. Defaults to today.
+        map_: The function used to issue the stats calls of one level, e.g.
+            the `map` method of a thread pool.
+
+    Returns:
+        A list of `Shard` objects covering the query.
+    """
+    facets = tuple(facets)
+    shards = []
+    # 待统计的查询: (不含时间窗口的查询, 拆分深度, 时间窗口)
+    pending = [(query, 0, None)]
+    while pending:
+        # 同一层的统计请求一起发出
+        counted = list(map_(
+            lambda item: count(
+                _window(item[0], item[2]),
+                facets[item[1]] if item[1] < len(facets) else None
+            ),
+            pending
+        ))
+        next_level = []
+        for (base, depth, window), (size, buckets) in zip(pending, counted):
+            node = _window(base, window)
+            if size == 0:
+                continue
+            if size <= cap:
+                shards.append(Shard(node, size))
+                continue
+            if depth < len(facets):
+                facet = facets[depth]
+                excluded = set(base.terms()) # 已经排除过的取值不再拆分, 避免死循环
+                buckets = [
+                    (value, total) for value, total in buckets
+                    if value not in ('', None) and Term(facet, value, '!=') not in excluded
+                ]
+                if not buckets: # 这个字段已经无法继续拆分
+                    next_level.append((base, depth + 1, window))
+                    continue
+                for value, total in buckets:
+                    child = And(base, Term(facet, value, '=='))
+                    if total <= cap:
+                        shards.append(Shard(_window(child, window), total))
+                    else:
+                        next_level.append((child, depth + 1, window))
+                if sum(total for __, total in buckets) < size:
+                    # 剩余部分仍按同一个字段拆分, 下一次统计会返回排在后面的取值
+                    rest = And(base, *(Term(facet, value, '!=') for value, __ in buckets))
+                    next_level.append((rest, depth, window))
+                continue
+            if since is not None:
+                low, high = window or (since, (until or date.today()) + _one_day)
+                if high - low > _one_day:
+                    middle = low + timedelta(days=(high - low).days // 2)
+                    next_level.append((base, depth, (low, middle)))
+                    next_level.append((base, depth, (middle, high)))
+                    continue
+            shards.append(Shard(node, size, complete=False))
+        pending = next_level
+    return shards
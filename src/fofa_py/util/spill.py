@@ -0,0 +1,157 @@
+# 导入标准库
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+from array import array
+
+
+def _release(handles: list, directory: str) -> None:
+    """Closes every mapping of a spill directory and removes it."""
+    for handle in reversed(handles):
+        try:
+            if isinstance(handle, memoryview):
+                handle.release() # 必须先释放memoryview才能关闭mmap
+            else:
+                handle.close()
+        except (BufferError, ValueError):
+            pass
+    handles.clear()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class SpillFile:
+    """A temporary directory holding memory-mapped, column-oriented rows.
+
+    Every column is stored in two files: `<n>.dat` with the UTF-8 encoded
+    values back to back, and `<n>.idx` with `n + 1` native 64-bit offsets.
+    The directory is removed when the last column mapped from it is
+    garbage collected, or when `close` is called.
+    """
+    def __init__(self, directory: str = None) -> None:
+        self.directory = tempfile.mkdtemp(prefix='fofa_py_spill_', dir=directory)
+        self._handles = [] # 打开的mmap和memoryview, 关闭时按逆序释放
+        self._finalizer = weakref.finalize(
+            self, _release, self._handles, self.directory
+        )
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def map(self, name: str):
+        """Maps the file `name` read-only, returning `b''` for empty files."""
+        with open(self.path(name), 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b'' # 空文件无法映射
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._handles.append(mapping)
+        return mapping
+
+    def close(self) -> None:
+        """Releases the mappings and removes the directory immediately."""
+        self._finalizer()
+
+
+class MappedColumn:
+    """A read-only column whose values live in a memory-mapped spill file.
+
+    Values are decoded from the mapping on access, so only the pages that
+    are actually read are loaded into memory. `overrides` holds the values
+    of rows that changed after they were written, e.g. cells filled in by
+    a later duplicate during a merge.
+    """
+    def __init__(self, spill: SpillFile, name: str, size: int, kind: str = 'str') -> None:
+        self._spill = spill # 持有引用, 保证列存在时文件不会被删除
+        self._data = spill.map(name + '.dat')
+        offsets = spill.map(name + '.idx')
+        if offsets:
+            offsets = memoryview(offsets).cast('Q')
+            spill._handles.append(offsets)
+        self._offsets = offsets
+        self._size = size
+        self.kind = kind # 'str'或者'json'(记录查询来源的元组列)
+        self.overrides = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _decode(self, row: int):
+        value = self._data[self._offsets[row]:self._offsets[row + 1]].decode('utf8')
+        if self.kind == 'json':
+            return tuple(json.loads(value))
+        return value
+
+    def __getitem__(self, row: int):
+        row = range(self._size)[row] # 处理负数索引和越界
+        if row in self.overrides:
+            return self.overrides[row]
+        return self._decode(row)
+
+    def __iter__(self):
+        overrides = self.overrides
+        for row in range(self._size):
+            yield overrides[row] if row in overrides else self._decode(row)
+
+
+class SpillWriter:
+    """Appends rows column by column to a new `SpillFile`.
+
+    Fields can be added at any time; the rows written before a field was
+    added read back as empty strings (or empty tuples for 'json' columns).
+    """
+    def __init__(self, directory: str = None) -> None:
+        self.spill = SpillFile(directory)
+        self.size = 0 # 已写入的行数
+        self._files = {} # 列名 -> (数据文件, 索引文件, 当前偏移, 类型, 文件名)
+
+    def add_field(self, field: str, kind: str = 'str') -> None:
+        if field in self._files:
+            return
+        name = str(len(self._files))
+        data = open(self.spill.path(name + '.dat'), 'wb')
+        index = open(self.spill.path(name + '.idx'), 'wb')
+        empty = b'[]' if kind == 'json' else b''
+        data.write(empty * self.size)
+        array('Q', [len(empty) * row for row in range(self.size + 1)]).tofile(index)
+        self._files[field] = [data, index, len(empty) * self.size, kind, name]
+
+    def append(self, columns: dict, size: int) -> None:
+        """Appends `size` rows given as a mapping of field -> column values."""
+        for field, entry in self._files.items():
+            data, index, offset, kind, __ = entry
+            values = columns.get(field)
+            offsets = array('Q')
+            chunks = []
+            for row in range(size):
+                if values is None:
+                    value = () if kind == 'json' else ''
+                else:
+                    value = values[row]
+                if kind == 'json':
+                    encoded = json.dumps(list(value), ensure_ascii=False).encode('utf8')
+                else:
+                    encoded = str(value).encode('utf8')
+                offset += len(encoded)
+                chunks.append(encoded)
+                offsets.append(offset)
+            data.write(b''.join(chunks))
+            offsets.tofile(index)
+            entry[2] = offset
+        self.size += size
+
+    def finish(self) -> dict:
+        """Closes the files and returns a mapping of field -> MappedColumn."""
+        columns = {}
+        for field, (data, index, __, kind, name) in self._files.items():
+            data.close()
+            index.close()
+            columns[field] = MappedColumn(self.spill, name, self.size, kind)
+        self._files = {}
+        return columns
+
+
+def _estimate_bytes(values) -> int:
+    """Roughly estimates the memory held by a row of string cells."""
+    return sum(len(value) if isinstance(value, str) else 64 for value in values)
@@ -0,0 +1,98 @@
+# 导入标准库
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# 导入第三方依赖
+import pytest
+
+_root = Path(__file__).resolve().parents[1]
+# 测试直接使用源码目录, 不需要先安装本包
+sys.path.insert(0, str(_root / 'src'))
+sys.path.insert(0, str(_root / 'benchmarks'))
+
+
+@pytest.fixture
+def fake_fofa():
+    """A local fake FOFA server with 1000 assets per query (see benchmarks/fake_fofa.py)."""
+    pytest.importorskip('requests')
+    from fake_fofa import FakeFofa
+    with FakeFofa(total=1000) as server:
+        yield server
+
+
+@pytest.fixture
+def client(fake_fofa):
+    """A `Fofa` client talking to `fake_fofa`, with logging disabled."""
+    from fofa_py import Fofa
+    return Fofa(key='test', api=fake_fofa.url, enable_log=False)
+
+
+@pytest.fixture
+def local_api(monkeypatch):
+    """Replaces the search API with a local one evaluating the queries on `data`.
+
+    Tests fill `local_api.data` with rows (dictionaries of field -> value),
+    and every query string sent is recorded in `local_api.sent`.
+    """
+    from fofa_py import factory
+    from fofa_py.basic import _parse_query
+    api = SimpleNamespace(data=[], sent=[])
+
+    def _search_v2(apikey, query_string, size, page, fields, **kwargs):
+        api.sent.append(query_string)
+        node = _parse_query(query_string)
+        matched = [row for row in api.data if node.evaluate(row)]
+        return {
+            'error': False, 'size': len(matched),
+            'results': [[row[field] for field in fields]
+                        for row in matched[(page - 1) * size:page * size]],
+        }
+    monkeypatch.setattr(factory, 'search_v2', _search_v2)
+    return api
+
+
+@pytest.fixture
+def make_assets():
+    """Builds a search mode `FofaAssets` from `fields` and rows of strings."""
+    from fofa_py import FofaAssets
+
+    def _make(fields: list, rows: list, query_string: str = '***') -> 'FofaAssets':
+        return FofaAssets(
+            query_results={'error': False, 'size': len(rows), 'results': rows},
+            mode='search', fields=fields, query_string=query_string
+        )
+    return _make
+
+
+@pytest.fixture
+def sample():
+    """A few hand-written `(fields, rows)`, including values that do not decode."""
+    fields = ['ip', 'port', 'country', 'title', 'server', 'latitude', 'lastupdatetime']
+    rows = [
+        ['1.1.1.1', '80', 'CN', 'Admin login', 'nginx', '39.90', '2024-01-01 12:00:00'],
+        ['2.2.2.2', '443', 'US', 'Welcome', 'apache', '-33.8688', '2023-06-30 00:00:00'],
+        ['1.1.1.1', '443', 'CN', 'admin panel', 'nginx', '', '2024-02-29 23:59:59'],
+        ['3.3.3.3', '8080', 'CN', '', '', '1e-05', '2024-03-01 08:00:00'],
+        ['::1', '22', 'DE', 'Admin login', 'nginx', '0', 'yesterday'],
+        ['not-an-ip', '080', 'JP', 'Welcome', '', '12.5', ''],
+    ]
+    return fields, rows
+
+
+@pytest.fixture
+def assets(make_assets, sample):
+    """The `sample` rows as `FofaAssets`."""
+    return make_assets(*sample)
+
+
+@pytest.fixture
+def generated():
+    """1000 generated `(fields, rows)` with unique IPs and low-cardinality ports and countries."""
+    fields = ['ip', 'port', 'country', 'title']
+    rows = [
+        ['10.0.{}.{}'.format(row // 256, row % 256), ('80', '443', '22', '8080')[row % 4],
+         ('CN', 'US', 'DE')[row % 3], 'title "{}",\n{}'.format(row, '后台' if row % 7 else 'admin')]
+        for row in range(1000)
+    ]
+    return fields, rows
@@ -0,0 +1,31 @@
+"""Local stats-style aggregation."""
+
+
+def test_aggregate_like_the_stats_api(make_assets, sample):
+    stats = make_assets(*sample, query_string='q').aggregate(
+        fields=['title', 'port'], distinct=['ip', 'server']
+    )
+    assert stats.aggs == {
+        'title': [{'name': 'Admin login', 'count': 2}, {'name': 'Welcome', 'count': 2},
+                  {'name': 'admin panel', 'count': 1}],
+        'port': [{'name': '443', 'count': 2}, {'name': '80', 'count': 1},
+                 {'name': '8080', 'count': 1}, {'name': '22', 'count': 1},
+                 {'name': '080', 'count': 1}],
+    }
+    assert stats.distinct == {'ip': 5, 'server': 2} # 空值不计入
+    assert stats.results['size'] == 6
+    assert stats.query_what == 'q'
+
+
+def test_top_and_views(assets):
+    assert assets.aggregate(fields=['port'], top=1).aggs == {'port': [{'name': '443', 'count': 2}]}
+    assert len(assets.aggregate(fields=['ip'], top=None).aggs['ip']) == 5
+    assert assets.where(port='443').aggregate(fields=['server']).aggs == {
+        'server': [{'name': 'apache', 'count': 1}, {'name': 'nginx', 'count': 1}],
+    }
+
+
+def test_encoded_columns(make_assets, sample):
+    plain = make_assets(*sample).aggregate(fields=['server', 'title'])
+    encoded = make_assets(*sample).encode(fields=['server'], max_ratio=1.0)
+    assert encoded.aggregate(fields=['server', 'title']).aggs == plain.aggs
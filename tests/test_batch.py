@@ -0,0 +1,76 @@
+"""OR-batched search with local demultiplexing."""
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa, Field
+from fofa_py.basic import Raw, _parse_query
+
+_data = [
+    {
+        'ip': '10.0.{}.{}'.format(row // 100, row % 100), 'port': ('80', '443', '22')[row % 3],
+        'host': 'host{}.example.com'.format(row), 'title': ('admin', 'Welcome', 'Admin panel')[row % 5 % 3],
+        'country': ('CN', 'US', 'DE', 'JP')[row % 4], 'app': ('nginx', 'IIS')[row % 2],
+    }
+    for row in range(300)
+]
+_queries = [
+    'port="80"', 'country="CN"', 'ip="10.0.1.5"', 'title="admin"',
+    'port="22" && country="US"', 'host="host7.example.com"', 'ip="10.0.2.0/25"',
+]
+
+
+@pytest.fixture
+def requests(local_api) -> list:
+    """The queries sent to a local search API over `_data`."""
+    local_api.data = _data
+    return local_api.sent
+
+
+def _expected(query, size: int) -> list:
+    node = _parse_query(query) if isinstance(query, str) else query
+    return [row['ip'] for row in _data if node.evaluate(row)][:size]
+
+
+def test_batches_match_single_queries(requests):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    results = client.search_batch(_queries, fields=['ip', 'port'], size=1000, batch_size=4)
+    assert len(requests) == 2
+    for query in _queries:
+        assert results[query].fields[:2] == ['ip', 'port']
+        assert results[query]['ip'] == _expected(query, 1000), query
+
+
+def test_truncated_batches_are_requested_again(requests):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    results = client.search_batch(_queries, fields=['ip'], size=5)
+    for query in _queries:
+        assert results[query]['ip'] == _expected(query, 5), query
+    assert len(requests) > 1
+
+
+def test_nodes_duplicates_and_unbatchable_queries(requests):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    node = Field('port') == 443
+    results = client.search_batch([node, 'port="443"', 'port="80"', 'port="80"'],
+                                  fields=['ip'], size=1000)
+    assert len(requests) == 1
+    assert results[node]['ip'] == results['port="443"']['ip'] == _expected(node, 1000)
+
+
+def test_unbatchable_nodes_are_sent_alone(requests):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    app = Field('app') == 'nginx' # app字段无法返回, 不能合并
+    raw = Raw('title="admin"') & (Field('port') == 80)
+    results = client.search_batch([app, raw, 'port="22"'], fields=['ip'], size=1000)
+    assert sorted(requests) == sorted(['app="nginx"', 'port="80"&&(title="admin")', 'port="22"'])
+    assert results[app]['ip'] == _expected(app, 1000)
+    assert results[raw]['ip'] == _expected('port="80"&&title="admin"', 1000)
+    assert results[app].query_what == 'app="nginx"'
+
+
+def test_invalid_queries_are_not_sent(requests):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False, enable_validate=True)
+    results = client.search_batch(['port="80"', 'port="80'], fields=['ip'], size=1000)
+    assert results['port="80'] is None
+    assert results['port="80"']['ip'] == _expected('port="80"', 1000)
+    assert requests == ['port="80"']
@@ -0,0 +1,38 @@
+"""Helpers of the hot-path benchmark suite."""
+# 导入标准库
+import json
+
+import bench_hot_paths as bench
+
+
+def test_measure():
+    calls = []
+    result = bench._measure(lambda: calls.append(1), repeat=3, min_time=0.001)
+    assert set(result) == {'best', 'median', 'number'}
+    assert 0 < result['best'] <= result['median']
+    assert len(calls) >= 3 * result['number']
+
+
+def test_previous_merges_the_runs_of_one_machine(tmp_path):
+    history = tmp_path / 'history.jsonl'
+    records = [
+        {'machine': 'm1', 'results': {'a': {'best': 1.0}, 'b': {'best': 2.0}}},
+        {'machine': 'm2', 'results': {'a': {'best': 9.0}}},
+        {'machine': 'm1', 'results': {'a': {'best': 0.5}}}, # 用--filter只测了一部分
+    ]
+    history.write_text(''.join(json.dumps(record) + '\n' for record in records), encoding='utf-8')
+    assert bench._previous(history, 'm1') == {'a': {'best': 0.5}, 'b': {'best': 2.0}}
+    assert bench._previous(tmp_path / 'missing.jsonl', 'm1') == {}
+
+
+def test_format_seconds():
+    assert bench._format_seconds(2.5) == '2.50 s'
+    assert bench._format_seconds(0.0025) == '2.50 ms'
+    assert bench._format_seconds(2.5e-6) == '2.50 us'
+    assert bench._format_seconds(2.5e-8) == '25 ns'
+
+
+def test_fake_response(fake_fofa):
+    response = json.loads(bench._response(fake_fofa, ['ip', 'title'], 3))
+    assert len(response['results']) == 3
+    assert response['results'][2][1] == bench._query + '#2'
@@ -0,0 +1,76 @@
+"""The query AST builder."""
+# 导入标准库
+import pickle
+import re
+from datetime import date
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Field, Term, And, Or, Not, after, before
+from fofa_py.basic import Raw, ParamsMisconfiguredError, _format_query_fields_dict
+
+title, port, ip = Field('title'), Field('port'), Field('ip')
+
+
+def test_canonical_compilation():
+    query = (title == 'admin') & port.isin([443, 80])
+    assert str(query) == '(port="443"||port="80")&&title="admin"'
+    assert query == port.isin([80, 443]) & (title == 'admin')
+    assert len({query, port.isin([80, 443]) & (title == 'admin')}) == 1
+    # 嵌套的同类分组展开, 重复的条件去掉
+    assert And(And(title == 'a', port == 1), title == 'a') == And(port == 1, title == 'a')
+    assert And(title == 'a') == (title == 'a')
+    with pytest.raises(ValueError):
+        And()
+
+
+def test_query_dicts():
+    query = {'title': 'admin', 'port': ['80', 443], 'is_honeypot': False}
+    assert _format_query_fields_dict(query) == \
+        'is_honeypot=false&&(port="443"||port="80")&&title="admin"'
+    # 只有列表按OR展开, 元组仍是一个带引号的值, 且不与同样内容的列表共用缓存
+    assert _format_query_fields_dict({'port': (80, 443)}) == 'port="(80, 443)"'
+    assert _format_query_fields_dict({'port': [80, 443]}) == 'port="443"||port="80"'
+    assert _format_query_fields_dict({'port': (80, 443)}) == 'port="(80, 443)"'
+    with pytest.raises(ParamsMisconfiguredError):
+        _format_query_fields_dict({'title': 'admin', 'port': []})
+
+
+def test_literals():
+    assert str(title == 'say "hi" \\o/') == 'title="say \\"hi\\" \\\\o/"'
+    assert str(Term('is_honeypot', False)) == 'is_honeypot=false'
+    assert str(after(date(2024, 1, 2))) == 'after="2024-01-02"'
+    assert str(title.regex(re.compile('^adm'))) == 'title=~"^adm"'
+    assert str(port.exact(80)) == 'port=="80"'
+    assert str(And(Raw('a=1 || b=2'), title == 'x')) == '(a=1 || b=2)&&title="x"'
+
+
+def test_negation():
+    assert Not((title == 'a') & (port != 80)) == Or(title != 'a', port == 80)
+    assert ~after('2024-01-01') == before('2024-01-01')
+    with pytest.raises(ValueError):
+        Not(title.regex('x'))
+    with pytest.raises(ValueError):
+        Not(Raw('a=1'))
+    with pytest.raises(ValueError):
+        Term('after', '2024-01-01', '!=')
+
+
+def test_local_evaluation():
+    row = {'title': 'Admin Login', 'port': '80', 'ip': '10.1.2.3',
+           'lastupdatetime': '2024-01-01 08:00:00'}
+    assert (title == 'admin').evaluate(row) # 模糊匹配不区分大小写
+    assert not title.exact('admin').evaluate(row)
+    assert (ip == '10.1.0.0/16').evaluate(row)
+    assert not (port == 8).evaluate(row) # port按完全相等比较
+    assert title.regex('^Adm').evaluate(row)
+    # after包含当天, before不包含当天, 两者互为补集
+    for day in ('2023-12-31', '2024-01-01', '2024-01-02'):
+        assert after(day).evaluate(row) != before(day).evaluate(row)
+    assert after('2024-01-01').evaluate(row) and not before('2024-01-01').evaluate(row)
+
+
+def test_pickle_round_trip():
+    query = (title == 'a') & ~(port.isin([80, 443])) & Term('is_honeypot', True)
+    assert pickle.loads(pickle.dumps(query)) == query
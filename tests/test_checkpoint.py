@@ -0,0 +1,62 @@
+"""Resumable, checkpointed harvests."""
+# 导入标准库
+import json
+import os
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import factory
+from fofa_py.basic import FofaConnectionError, ParamsMisconfiguredError
+
+
+@pytest.fixture
+def pages(monkeypatch) -> dict:
+    """Records the requested pages, and fails those listed in `pages['fail']` once."""
+    record = {'sent': [], 'fail': set()}
+    search_v2 = factory.search_v2
+
+    def _search_v2(**kwargs):
+        record['sent'].append(kwargs['page'])
+        if kwargs['page'] in record['fail']:
+            record['fail'].discard(kwargs['page'])
+            raise FofaConnectionError()
+        return search_v2(**kwargs)
+    monkeypatch.setattr(factory, 'search_v2', _search_v2)
+    return record
+
+
+def _titles(assets) -> list:
+    return [int(title.rsplit('#', 1)[1]) for title in assets['title']]
+
+
+def test_harvest_resumes_missing_pages(client, pages, tmp_path):
+    directory = str(tmp_path / 'job')
+    pages['fail'] = {3, 5}
+    with pytest.raises(FofaConnectionError):
+        client.harvest('port="80"', directory, fields=['ip', 'title'], size=450, page_size=100)
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as file:
+        assert sorted(json.load(file)['pages']) == [1, 2, 4]
+
+    pages['sent'].clear()
+    assets = client.harvest('port="80"', directory, fields=['ip', 'title'], size=450, page_size=100)
+    assert sorted(pages['sent']) == [3, 5] # 已完成的页不再请求
+    assert _titles(assets) == list(range(450))
+
+    pages['sent'].clear()
+    again = client.harvest('port="80"', directory, fields=['ip', 'title'], size=450, page_size=100)
+    assert pages['sent'] == []
+    assert list(again) == list(assets)
+
+
+def test_harvest_stops_at_the_total(client, pages, tmp_path):
+    assets = client.harvest('port="80"', str(tmp_path), fields=['ip', 'title'],
+                            size=5000, page_size=300)
+    assert len(assets) == 1000 # 假服务器每个查询有1000条资产
+    assert sorted(pages['sent']) == [1, 2, 3, 4]
+
+
+def test_directory_of_another_job(client, tmp_path):
+    client.harvest('port="80"', str(tmp_path), fields=['ip'], size=10)
+    with pytest.raises(ParamsMisconfiguredError):
+        client.harvest('port="443"', str(tmp_path), fields=['ip'], size=10)
@@ -0,0 +1,149 @@
+"""The `fofa-py batch` command."""
+# 导入标准库
+import csv
+import io
+import json
+import os
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa, cli
+from fofa_py.basic import FofaRateLimited, FofaRequestFailed
+
+
+@pytest.fixture
+def queries(tmp_path):
+    path = tmp_path / 'queries.txt'
+    path.write_text('\n'.join([
+        '# 注释和空行会被跳过',
+        'port="80"',
+        '',
+        json.dumps({'query': 'port="443"', 'fields': ['ip', 'title'], 'size': 5}),
+    ]), encoding='utf-8')
+    return path
+
+
+def _run(fake_fofa, queries, *options) -> int:
+    return cli.main([
+        'batch', str(queries), '--key', 'test', '--api', fake_fofa.url,
+        '--size', '3', '--backoff', '0', *options,
+    ])
+
+
+def test_read_queries():
+    lines = ['port="80"', '  ', '# x', '{"query": "ip=\\"1.1.1.1\\"", "size": 7}']
+    assert cli._read_queries(lines, ['ip'], 10) == [
+        ('port="80"', ['ip'], 10), ('ip="1.1.1.1"', ['ip'], 7),
+    ]
+
+
+def test_percentile():
+    assert cli._percentile([], 50) == 0.0
+    assert cli._percentile([1, 2, 3, 4], 50) == 2
+    assert cli._percentile([1, 2, 3, 4], 99) == 4
+
+
+def test_output_files(fake_fofa, queries, tmp_path):
+    output = tmp_path / 'out'
+    assert _run(fake_fofa, queries, '--output', str(output)) == 0
+    first = [json.loads(line) for line in (output / '00001.ndjson').open(encoding='utf-8')]
+    second = [json.loads(line) for line in (output / '00002.ndjson').open(encoding='utf-8')]
+    assert len(first) == 3 and set(first[0]) == set(cli._default_fields)
+    assert [row['title'] for row in second] == ['port="443"#{}'.format(row) for row in range(5)]
+
+
+def test_stdout_csv(fake_fofa, queries, capsys):
+    assert _run(fake_fofa, queries, '--format', 'csv') == 0
+    out, err = capsys.readouterr()
+    rows = list(csv.reader(io.StringIO(out)))
+    assert rows[0] == ['query', 'host', 'ip', 'port', 'title'] # 只有一个表头, 列为字段的并集
+    assert len(rows) == 9 and all(len(row) == 5 for row in rows)
+    second = [row for row in rows[1:] if row[0] == 'port="443"']
+    assert len(second) == 5
+    assert all(row[1] == row[3] == '' and row[4].startswith('port="443"#') for row in second)
+    assert 'rows: 8' in err
+
+
+def test_pages_are_rate_limited_requests(tmp_path, monkeypatch, capsys):
+    pytest.importorskip('requests')
+    from fake_fofa import FakeFofa
+    waits = []
+    monkeypatch.setattr(cli._RateLimiter, 'wait', lambda self: waits.append(1))
+    path = tmp_path / 'queries.txt'
+    path.write_text('port="80"\n', encoding='utf-8')
+    with FakeFofa(total=25000) as server:
+        assert cli.main([
+            'batch', str(path), '--key', 'test', '--api', server.url, '--size', '25000',
+            '--fields', 'ip', '--rate', '1000', '--output', str(tmp_path / 'out'),
+        ]) == 0
+        assert server.requests == 3
+    assert len(waits) == 3 # 每一页都经过限速
+    err = capsys.readouterr().err
+    assert 'rows: 25000' in err and 'requests: 3' in err
+    with (tmp_path / 'out' / '00001.ndjson').open(encoding='utf-8') as file:
+        assert sum(1 for line in file) == 25000
+
+
+def test_disk_cache(fake_fofa, queries, tmp_path, capsys):
+    options = ('--cache-dir', str(tmp_path / 'cache'), '--output', str(tmp_path / 'out'))
+    assert _run(fake_fofa, queries, *options) == 0
+    requests = fake_fofa.requests
+    assert _run(fake_fofa, queries, *options) == 0
+    assert fake_fofa.requests == requests
+    assert 'cache hits: 2, misses: 0' in capsys.readouterr().err
+
+
+def _failing(monkeypatch, error, failures: int) -> list:
+    calls = []
+    fetch_search = Fofa.fetch_search
+
+    def _fetch(self, *args, **kwargs):
+        calls.append(args[0])
+        if len(calls) <= failures:
+            raise error()
+        return fetch_search(self, *args, **kwargs)
+    monkeypatch.setattr(Fofa, 'fetch_search', _fetch)
+    return calls
+
+
+def test_rate_limits_are_retried(fake_fofa, queries, monkeypatch, capsys, tmp_path):
+    calls = _failing(monkeypatch, FofaRateLimited, 1)
+    assert _run(fake_fofa, queries, '--concurrency', '1', '--output', str(tmp_path)) == 0
+    assert len(calls) == 3
+    assert 'retries: 1' in capsys.readouterr().err
+
+
+def test_failed_requests_are_not_retried(fake_fofa, queries, monkeypatch, capsys, tmp_path):
+    calls = _failing(monkeypatch, FofaRequestFailed, 1)
+    assert _run(fake_fofa, queries, '--concurrency', '1', '--output', str(tmp_path)) == 1
+    assert len(calls) == 2
+    err = capsys.readouterr().err
+    assert 'failed: 1' in err and 'retries: 0' in err
+
+
+def test_rate_limit_status(fake_fofa, monkeypatch):
+    requests = pytest.importorskip('requests')
+
+    class _Response:
+        status_code = 429
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: _Response())
+    client = Fofa(key='test', api=fake_fofa.url, enable_log=False)
+    monkeypatch.setattr(client, '_http_session', lambda: None)
+    with pytest.raises(FofaRateLimited):
+        client.fetch_search('port="80"', ['ip'], size=1)
+
+
+def test_disk_cache_expiry(tmp_path):
+    from fofa_py.util import DiskCache
+    cache = DiskCache(str(tmp_path), ttl=60)
+    key = ('search', 'port="80"', ('ip', ), 10, False)
+    with pytest.raises(KeyError):
+        cache.get(key)
+    cache.put(key, {'results': [['1.1.1.1']]})
+    assert cache.get(key) == {'results': [['1.1.1.1']]}
+    path = cache._path(key)
+    os.utime(path, (0, 0)) # 把修改时间拨回很久以前
+    with pytest.raises(KeyError):
+        cache.get(key)
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,89 @@
+"""A `Fofa` client shared by many threads."""
+# 导入标准库
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa
+
+
+def _worker(client: Fofa, number: int, barrier: threading.Barrier) -> list:
+    failures = []
+    fields = ['ip', 'port', 'title', 'country'][:2 + number % 3]
+    barrier.wait() # 所有线程同时开始, 尽量交错执行
+    for call in range(20):
+        query = 'title="t{}-{}"'.format(number, call % 5)
+        assets = client.search(query, fields=fields, size=10)
+        if assets is None:
+            failures.append('search failed')
+            continue
+        if assets.fields != fields or client.fields != fields:
+            failures.append('fields of another thread')
+        if client.assets is not assets:
+            failures.append('assets of another thread')
+        if client.results.get('query') != query:
+            failures.append('results of another thread')
+        if 'title' in fields and not all(
+            title.startswith(query + '#') for title in assets['title']
+        ):
+            failures.append('rows of another query')
+    return failures
+
+
+@pytest.mark.parametrize('enable_cache', [False, True])
+def test_threads_see_their_own_calls(fake_fofa, enable_cache):
+    if enable_cache:
+        pytest.importorskip('cachetools')
+        pytest.importorskip('tablib')
+    client = Fofa(key='test', api=fake_fofa.url, enable_log=False,
+                  enable_cache=enable_cache, cache_max_size=1000)
+    threads = 8
+    barrier = threading.Barrier(threads)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(
+            lambda number: _worker(client, number, barrier), range(threads)
+        ))
+    assert [failure for result in results for failure in result] == []
+    if enable_cache:
+        indexes = [entry[0] for entry in client.cache.values()]
+        assert len(indexes) == len(set(indexes)) == threads * 5
+
+
+def test_cache_miss_returns_an_independent_view(fake_fofa):
+    pytest.importorskip('cachetools')
+    pytest.importorskip('tablib')
+    client = Fofa(key='test', api=fake_fofa.url, enable_log=False, enable_cache=True)
+    first = client.search('port="80"', fields=['ip', 'port'], size=10)
+    first + 'note' # 调用方增加列不能影响缓存
+    first - 'port'
+    second = client.search('port="80"', fields=['ip', 'port'], size=10)
+    assert fake_fofa.requests == 1
+    assert second is not first
+    assert second.fields == ['ip', 'port']
+    assert len(second['port']) == 10
+
+
+class _DeferredLogger:
+    """Keeps the lazy log messages and formats them later, like a queued sink."""
+    def __init__(self):
+        self.messages = []
+
+    def __getattr__(self, level):
+        return self.messages.append
+
+    def flush(self) -> list:
+        return [message() if callable(message) else str(message) for message in self.messages]
+
+
+def test_cache_miss_messages_can_be_formatted_later(fake_fofa):
+    pytest.importorskip('cachetools')
+    pytest.importorskip('tablib')
+    client = Fofa(key='test', api=fake_fofa.url, enable_log=False, enable_cache=True)
+    client._log_engine = logger = _DeferredLogger()
+    client.search('port="80"', fields=['ip'], size=10)
+    client.stats('port="80"', fields=['title'])
+    client.host('1.1.1.1')
+    misses = [message for message in logger.flush() if message.startswith('cache miss')]
+    assert len(misses) == 3
@@ -0,0 +1,50 @@
+"""Typed column decoding."""
+# 导入第三方依赖
+import pytest
+
+from fofa_py.util import TypedColumn
+
+
+def test_decoding_is_transparent(assets, make_assets, sample):
+    before = list(assets)
+    assert assets.decode() is assets
+    for field in ('ip', 'port', 'latitude', 'lastupdatetime'):
+        assert isinstance(assets._columns[field], TypedColumn)
+    assert not isinstance(assets._columns['title'], TypedColumn)
+    assert list(assets) == before # 无法原样还原的值保存为原始字符串
+    assert assets.to_csv() == make_assets(*sample).to_csv()
+
+
+def test_typed_values(assets):
+    assets.decode()
+    assert assets.typed('port') == [80, 443, 443, 8080, 22, None]
+    assert assets.typed('ip')[0] == (0xFFFF << 32) | 0x01010101
+    assert assets.typed('ip')[4] == 1
+    assert assets.typed('lastupdatetime')[0] == 1704110400
+    with pytest.raises(KeyError):
+        assets.typed('title')
+
+
+def test_typed_without_decoding(make_assets):
+    assets = make_assets(['port'], [['22'], ['8080']])
+    assert assets.typed('port') == [22, 8080]
+
+
+def test_sort_and_filter_typed_columns(assets):
+    assets.decode()
+    assert assets.where(port={80, 443})['title'] == ['Admin login', 'Welcome', 'admin panel']
+    assert assets.where(ip='3.3.3.3')['port'] == ['8080']
+    ordered = assets.where(country={'CN', 'US'}).sort('port')
+    assert ordered['port'] == ['80', '443', '443', '8080'] # 按数值而不是字符串排序
+
+
+def test_mostly_undecodable_columns_stay_strings(make_assets):
+    assets = make_assets(['port'], [['x'], ['y'], ['80']]).decode()
+    assert not isinstance(assets._columns['port'], TypedColumn)
+
+
+def test_concat_of_chunks():
+    parts = [TypedColumn('int', ['1', '2']), TypedColumn('int', ['70000', '03'])]
+    column = TypedColumn.concat(parts)
+    assert list(column) == ['1', '2', '70000', '03']
+    assert column.typed(2) == 70000 and column.typed(3) is None
@@ -0,0 +1,37 @@
+"""Dictionary-encoded columns."""
+from fofa_py.util import DictColumn
+
+
+def test_encoding_is_transparent(make_assets, generated):
+    assets = make_assets(*generated)
+    before = list(assets)
+    assert assets.encode() is assets
+    assert isinstance(assets._columns['country'], DictColumn)
+    assert not isinstance(assets._columns['title'], DictColumn) # 不在低基数字段中
+    assert list(assets) == before
+    assert assets.to_json() == make_assets(*generated).to_json()
+
+
+def test_filter_and_group_on_codes(make_assets, generated):
+    assets = make_assets(*generated).encode()
+    assert assets.group_by('country') == {'CN': 334, 'US': 333, 'DE': 333}
+    assert len(assets.where(country={'US', 'DE'})) == 666
+    assert assets.lookup('country', 'DE')['ip'][:2] == ['10.0.0.2', '10.0.0.5']
+    view = assets.where(ip={'10.0.0.0', '10.0.0.1'})
+    assert view.group_by('country') == {'CN': 1, 'US': 1}
+
+
+def test_high_cardinality_columns_stay_strings(make_assets, generated):
+    assets = make_assets(*generated).encode(fields=['ip', 'title'])
+    assert not isinstance(assets._columns['ip'], DictColumn)
+    assets.encode(fields=['title'], max_ratio=1.0)
+    assert isinstance(assets._columns['title'], DictColumn)
+    assert assets['title'][5] == generated[1][5][3]
+
+
+def test_dict_column():
+    column = DictColumn(['a', 'b', 'a', 'c', 'a'])
+    assert column.values == ['a', 'b', 'c']
+    assert list(column) == ['a', 'b', 'a', 'c', 'a']
+    assert column[3] == 'c' and len(column) == 5
+    assert column.take_codes([0, 3]) == [0, 2]
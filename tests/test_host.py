@@ -0,0 +1,17 @@
+"""`Fofa.host` against the fake server."""
+
+
+def test_host_requests_the_host_url(client, fake_fofa):
+    from fake_fofa import _ports
+    assets = client.host('1.2.3.4')
+    assert assets is not None
+    assert fake_fofa.requests == 1
+    # 假服务器从URL路径读取主机, 返回的主机说明URL已正确填入
+    assert client.results['host'] == '1.2.3.4'
+    assert set(assets['ip']) == {'1.2.3.4'}
+    assert sorted(set(assets['port'])) == sorted(_ports)
+
+
+def test_host_detail(client, fake_fofa):
+    assert client.host('10.0.0.1', detail=True) is not None
+    assert client.results['ip'] == '10.0.0.1'
@@ -0,0 +1,35 @@
+"""Importing fofa_py is fast and free of side effects."""
+# 导入标准库
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+_src = str(Path(__file__).resolve().parents[1] / 'src')
+_check = '''
+import locale, sys
+before = locale.setlocale(locale.LC_ALL)
+import fofa_py
+from fofa_py.basic import _
+assert _('Request failed') # 找不到翻译时退回原文
+heavy = ('tablib', 'loguru', 'cachetools', 'requests', 'pyarrow', 'multiprocessing')
+print(','.join(name for name in heavy if name in sys.modules))
+print(locale.setlocale(locale.LC_ALL) == before)
+'''
+
+
+def _run(language: str) -> list:
+    environment = dict(os.environ, PYTHONPATH=_src, LANGUAGE=language)
+    return subprocess.run(
+        [sys.executable, '-c', _check], env=environment, check=True,
+        stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.splitlines()
+
+
+def test_no_heavy_modules_and_no_locale_change():
+    assert _run('en') == ['', 'True']
+
+
+def test_missing_catalog_falls_back():
+    assert _run('xx_YY') == ['', 'True']
+
@@ -0,0 +1,57 @@
+"""Incremental harvesting with after= windows."""
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa
+
+_fields = ['ip', 'port', 'title']
+
+
+@pytest.fixture
+def api(local_api):
+    """A local search API over ten assets updated on consecutive days."""
+    local_api.data = [
+        {'ip': '10.0.0.{}'.format(row), 'port': '80', 'title': 'v1',
+         'lastupdatetime': '2024-01-{:02d} 10:00:00'.format(row + 1)}
+        for row in range(10)
+    ]
+    return local_api
+
+
+def test_only_changes_are_fetched(api):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    store = {}
+    first = client.search_incremental('port="80"', store, fields=_fields)
+    assert len(first) == 10
+    assert api.sent == ['port="80"']
+    assert store['port="80"']['high_water'] == '2024-01-10 10:00:00'
+
+    api.data[3] = dict(api.data[3], title='v2', lastupdatetime='2024-01-12 09:00:00')
+    api.data.append({'ip': '10.0.1.1', 'port': '80', 'title': 'new',
+                     'lastupdatetime': '2024-01-12 11:00:00'})
+    second = client.search_incremental('port="80"', store, fields=_fields)
+    assert api.sent[-1] == 'after="2024-01-09"&&port="80"'
+    assert len(second) == 11
+    titles = dict(zip(second['ip'], second['title']))
+    assert titles['10.0.0.3'] == 'v2' and titles['10.0.1.1'] == 'new'
+    assert titles['10.0.0.0'] == 'v1' # 没有变化的资产来自快照
+    assert store['port="80"']['high_water'] == '2024-01-12 11:00:00'
+    assert 'query_what' not in second.fields
+
+
+def test_equivalent_queries_share_a_snapshot(api):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    store = {}
+    client.search_incremental('port="80" && title="v"', store, fields=_fields)
+    client.search_incremental('title="v"&&port="80"', store, fields=_fields)
+    assert list(store) == ['port="80"&&title="v"']
+    assert api.sent[-1].startswith('after=')
+
+
+def test_changed_fields_harvest_again(api):
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    store = {}
+    client.search_incremental('port="80"', store, fields=_fields)
+    client.search_incremental('port="80"', store, fields=['ip', 'port'])
+    assert api.sent == ['port="80"', 'port="80"']
+    assert store['port="80"']['fields'] == ['ip', 'port', 'lastupdatetime']
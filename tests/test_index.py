@@ -0,0 +1,34 @@
+"""Cached hash indexes, `lookup` and `group_by`."""
+# 导入第三方依赖
+import pytest
+
+
+def test_lookup(assets):
+    assert assets.build_index('ip') is assets
+    assert assets.lookup('ip', '1.1.1.1')['port'] == ['80', '443']
+    assert assets.lookup('port', 80)['ip'] == ['1.1.1.1'] # '080'不等于'80'
+    assert len(assets.lookup('ip', '9.9.9.9')) == 0
+
+
+def test_group_by(assets):
+    assert assets.group_by('server') == {'nginx': 3, 'apache': 1, '': 2}
+    groups = assets.group_by('port', counts=False)
+    assert list(groups) == ['80', '443', '8080', '22', '080']
+    assert groups['443']['ip'] == ['2.2.2.2', '1.1.1.1']
+    assert assets.group_by('port') == {'80': 1, '443': 2, '8080': 1, '22': 1, '080': 1} # 复用已建的索引
+
+
+def test_indexes_of_views(assets):
+    view = assets.where(port='443')
+    assert view.lookup('ip', '1.1.1.1')['server'] == ['nginx']
+    assert view.group_by('server') == {'apache': 1, 'nginx': 1}
+
+
+def test_index_is_dropped_with_its_column(assets):
+    assets.build_index('server')
+    assets - 'server'
+    with pytest.raises(KeyError):
+        assets.lookup('server', 'nginx')
+    assets + 'server'
+    assert assets.group_by('server', counts=False)[''].fields[-1] == 'server'
+    assert assets.group_by('server') == {'': 6}
@@ -0,0 +1,86 @@
+"""Lazy, sampled logging and the queued sink."""
+# 导入标准库
+import logging
+import threading
+
+from fofa_py.util import LazyLogger
+from fofa_py.util.log import QueuedSink
+
+
+class _Engine:
+    """A minimal loguru-like engine recording the emitted messages."""
+    def __init__(self) -> None:
+        self.lines = []
+
+    def opt(self, depth: int) -> '_Engine':
+        return self
+
+    def debug(self, message) -> None:
+        self.lines.append(('DEBUG', message))
+
+    def info(self, message) -> None:
+        self.lines.append(('INFO', message))
+
+    def warning(self, message) -> None:
+        self.lines.append(('WARNING', message))
+
+    def error(self, message) -> None:
+        self.lines.append(('ERROR', message))
+
+
+def test_debug_is_the_default_level():
+    engine = _Engine()
+    logger = LazyLogger(engine)
+    logger.debug('d')
+    logger.info(lambda: 'i')
+    assert engine.lines == [('DEBUG', 'd'), ('INFO', 'i')]
+
+
+def test_disabled_messages_are_not_built():
+    engine, built = _Engine(), []
+    logger = LazyLogger(engine, level='warning')
+    logger.info(lambda: built.append('info'))
+    logger.error(lambda: 'e')
+    error = ValueError('x')
+    logger.error(error) # 异常对象不当作可调用的消息
+    assert built == []
+    assert engine.lines == [('ERROR', 'e'), ('ERROR', error)]
+    silent = LazyLogger(None)
+    silent.error(lambda: built.append('error'))
+    assert built == [] and not silent.enabled('ERROR')
+
+
+def test_debug_sampling():
+    engine = _Engine()
+    logger = LazyLogger(engine, sample=10)
+    for number in range(100):
+        logger.debug(str(number))
+    assert [line for __, line in engine.lines] == [str(number) for number in range(0, 100, 10)]
+
+
+def test_standard_logging_levels():
+    standard = logging.getLogger('fofa_py.tests')
+    standard.setLevel(logging.INFO)
+    logger = LazyLogger(standard)
+    assert not logger.enabled('DEBUG') # 引擎自己的级别同样生效
+    assert logger.enabled('INFO')
+
+
+def test_queued_sink():
+    lines = []
+    sink = QueuedSink(lines.append)
+    for number in range(50):
+        sink(number)
+    sink.drain()
+    assert lines == list(range(50))
+    sink.close()
+
+
+def test_queued_sink_drops_instead_of_blocking():
+    release = threading.Event()
+    sink = QueuedSink(lambda message: release.wait(), maxsize=2)
+    for number in range(10):
+        sink(number) # 不会阻塞
+    assert sink.dropped >= 7
+    release.set()
+    sink.close()
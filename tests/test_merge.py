@@ -0,0 +1,47 @@
+"""Hash-based `FofaAssets.merge` and `dedup`."""
+# 导入第三方依赖
+import pytest
+
+
+def test_dedup_keeps_the_first_row(make_assets):
+    assets = make_assets(['ip', 'port', 'title'], [
+        ['1.1.1.1', '80', 'a'], ['1.1.1.1', '443', 'b'],
+        ['1.1.1.1', '80', 'c'], ['2.2.2.2', '80', 'd'],
+    ])
+    assert assets.dedup()['title'] == ['a', 'b', 'd']
+    assert assets.dedup(key='ip')['title'] == ['a', 'd']
+    assert assets.where(port='80').dedup()['title'] == ['a', 'd']
+    with pytest.raises(KeyError):
+        assets.dedup(key='country')
+
+
+def test_merge_unions_fields_and_fills_gaps(make_assets):
+    first = make_assets(['ip', 'port', 'title'], [
+        ['1.1.1.1', '80', ''], ['2.2.2.2', '80', 'b'],
+    ], query_string='q1')
+    second = make_assets(['ip', 'port', 'country'], [
+        ['1.1.1.1', '80', 'CN'], ['3.3.3.3', '22', 'US'],
+    ], query_string='q2')
+    third = make_assets(['ip', 'port', 'title'], [
+        ['1.1.1.1', '80', 'filled'], ['2.2.2.2', '80', 'ignored'],
+    ], query_string='q3')
+    merged = first.merge(second, third)
+    assert merged.fields[:4] == ['ip', 'port', 'title', 'country']
+    assert merged['ip'] == ['1.1.1.1', '2.2.2.2', '3.3.3.3']
+    assert merged['title'] == ['filled', 'b', ''] # 空单元格由后面的重复行补齐
+    assert merged['country'] == ['CN', '', 'US']
+    assert merged['query_what'] == [('q1', 'q2', 'q3'), ('q1', 'q3'), ('q2', )]
+
+
+def test_merge_of_merged_results_keeps_the_queries(make_assets):
+    first = make_assets(['ip', 'port'], [['1.1.1.1', '80']], query_string='q1')
+    second = make_assets(['ip', 'port'], [['1.1.1.1', '80']], query_string='q2')
+    third = make_assets(['ip', 'port'], [['1.1.1.1', '80']], query_string='q3')
+    assert first.merge(second).merge(third)['query_what'] == [('q1', 'q2', 'q3')]
+
+
+def test_merge_only_search_results(make_assets):
+    from fofa_py import FofaAssets
+    stats = FofaAssets(query_results={'error': False, 'size': 0, 'aggs': {}}, mode='stats')
+    with pytest.raises(NotImplementedError):
+        make_assets(['ip', 'port'], []).merge(stats)
@@ -0,0 +1,40 @@
+"""Splitting large searches into pages."""
+# 导入第三方依赖
+import pytest
+
+
+@pytest.fixture
+def server():
+    pytest.importorskip('requests')
+    from fake_fofa import FakeFofa
+    with FakeFofa(total=30000) as server:
+        yield server
+
+
+def _rows(assets) -> list:
+    """The row numbers of the fake titles `<query>#<row>`."""
+    return [int(title.rsplit('#', 1)[1]) for title in assets['title']]
+
+
+@pytest.mark.parametrize('fields, size, page, requests', [
+    (['title', 'body'], 1250, 1, 3), # 含body时每页最多500行
+    (['title', 'body'], 507, 2, 2), # 第507到1013行, 跨第2, 3页
+    (['title', 'body'], 750, 3, 2), # 第1500到2249行, 跨第4, 5页
+    (['title', 'body'], 500, 4, 1),
+    (['ip', 'title'], 10007, 2, 2), # 不能整除时不退化为每页1行
+])
+def test_page_rows_and_requests(server, fields, size, page, requests):
+    from fofa_py import Fofa
+    client = Fofa(key='test', api=server.url, enable_log=False)
+    assets = client.search('port="80"', fields=fields, size=size, page=page)
+    offset = (page - 1) * size
+    assert _rows(assets) == list(range(offset, offset + size))
+    assert server.requests == requests
+
+
+def test_last_page_is_truncated(server):
+    from fofa_py import Fofa
+    client = Fofa(key='test', api=server.url, enable_log=False)
+    assets = client.search('port="80"', fields=['ip', 'title'], size=20000, page=2)
+    assert _rows(assets) == list(range(20000, 30000))
+    assert server.requests == 1 # 第4页在总数之外, 不请求
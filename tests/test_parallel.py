@@ -0,0 +1,63 @@
+"""Process-pool transforms give the same results as sequential ones."""
+# 导入标准库
+import re
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Field
+from fofa_py.util import TypedColumn
+
+
+@pytest.fixture
+def pair(make_assets, generated):
+    """The same rows, sequential and split into chunks of 64 rows over 2 processes."""
+    return make_assets(*generated), make_assets(*generated).parallel(2, chunk_rows=64)
+
+
+@pytest.mark.parametrize('conditions, kwargs', [
+    ((), {'port': {'80', '443'}}),
+    ((), {'title': re.compile('admin')}),
+    (((Field('country') == 'CN') | (Field('port') == 22), ), {}),
+    (({'country': 'US'}, ), {'port': '8080'}),
+    ((), {'port': lambda port: port.startswith('8')}), # lambda无法发送给子进程, 在本进程执行
+])
+def test_where(pair, conditions, kwargs):
+    sequential, parallel = pair
+    assert list(parallel.where(*conditions, **kwargs)) == list(sequential.where(*conditions, **kwargs))
+
+
+def test_where_of_views_and_encoded_columns(pair):
+    sequential, parallel = pair
+    sequential.encode(fields=['country'])
+    parallel.encode(fields=['country'])
+    expected = sequential.where(port='80').where(country='CN')
+    assert list(parallel.where(port='80').where(country='CN')) == list(expected)
+
+
+def test_decode(pair):
+    sequential, parallel = pair
+    sequential.decode()
+    parallel.decode()
+    assert isinstance(parallel._columns['ip'], TypedColumn)
+    assert parallel.typed('ip') == sequential.typed('ip')
+    assert list(parallel) == list(sequential)
+
+
+def test_exports(pair):
+    sequential, parallel = pair
+    assert parallel.to_csv() == sequential.to_csv()
+    assert parallel.to_ndjson() == sequential.to_ndjson()
+    assert parallel.where(country='DE').to_csv() == sequential.where(country='DE').to_csv()
+
+
+def test_parallel_can_be_turned_off(make_assets, generated):
+    assets = make_assets(*generated).parallel(2).parallel(1)
+    assert assets._parallel is None
+
+
+def test_the_process_pool_is_used(pair):
+    from fofa_py.util import parallel
+    sequential, pool = pair
+    pool.where(port='80')
+    assert 2 in parallel._executors
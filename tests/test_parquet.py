@@ -0,0 +1,76 @@
+"""Parquet archives."""
+# 导入标准库
+import io
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import FofaAssets
+
+pytest.importorskip('pyarrow')
+
+_fields = ['ip', 'port', 'asn', 'latitude', 'longitude', 'lastupdatetime', 'title']
+_rows = [
+    ['1.1.1.1', '80', '13335', '39.9042', '116.4074', '2024-01-01 12:00:00', 'a'],
+    ['2.2.2.2', '443', '', '-33.8688', '151.2093', '2024-02-29 00:00:01', ''],
+    ['3.3.3.3', '8080', '4134', '0.0', '1e-05', '2023-12-31 23:59:59', '中文'],
+]
+
+
+def _assets(rows: list = _rows, fields: list = _fields) -> FofaAssets:
+    return FofaAssets(
+        query_results={'error': False, 'size': len(rows), 'results': rows},
+        mode='search', fields=fields, query_string='port="80"',
+    )
+
+
+def _round_trip(assets: FofaAssets, **kwargs) -> FofaAssets:
+    buffer = io.BytesIO()
+    assets.to_parquet(buffer)
+    buffer.seek(0)
+    return FofaAssets.from_parquet(buffer, **kwargs)
+
+
+def test_round_trip_is_lossless():
+    assets = _assets()
+    restored = _round_trip(assets)
+    assert restored.fields == assets.fields
+    assert list(restored) == list(assets)
+    assert restored.query_what == 'port="80"'
+
+
+def _schema(assets: FofaAssets) -> dict:
+    import pyarrow.parquet
+    buffer = io.BytesIO()
+    assets.to_parquet(buffer)
+    buffer.seek(0)
+    schema = pyarrow.parquet.read_schema(buffer)
+    return {field: str(schema.field(field).type) for field in schema.names}
+
+
+def test_schema_types():
+    schema = _schema(_assets())
+    assert schema['port'] == schema['asn'] == 'int64'
+    assert schema['latitude'] == schema['longitude'] == 'double'
+    assert schema['lastupdatetime'].startswith('timestamp')
+    assert schema['ip'] == schema['title'] == 'string'
+
+
+def test_values_that_do_not_convert_losslessly_stay_strings():
+    rows = [['1.1.1.1', '080', 'AS13335', '39.90', '2', '2024-01-01', 'x']]
+    assets = _assets(rows)
+    assert list(_round_trip(assets)) == list(assets)
+    schema = _schema(assets)
+    assert schema['port'] == schema['asn'] == schema['latitude'] == 'string'
+    assert schema['longitude'] == 'string' # '2'会读回'2.0'
+
+
+def test_coordinate_filters():
+    restored = _round_trip(_assets(), filters=[('latitude', '>', 0.0)])
+    assert list(restored['ip']) == ['1.1.1.1']
+
+
+def test_projection_and_filters():
+    restored = _round_trip(_assets(), columns=['ip', 'port'], filters=[('port', '>', 100)])
+    assert restored.fields == ['ip', 'port']
+    assert list(restored) == [('2.2.2.2', '443'), ('3.3.3.3', '8080')]
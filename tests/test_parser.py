@@ -0,0 +1,62 @@
+"""The offline query parser and validator."""
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa, Field, Term, Not, after
+from fofa_py.basic import FofaQuerySyntaxError, Raw, _parse_query, _query_node
+
+title, port, country = Field('title'), Field('port'), Field('country')
+
+
+@pytest.mark.parametrize('node', [
+    title == 'admin',
+    (title == 'admin') & port.isin([80, 443]) & Not(country == 'CN') & after('2024-01-01'),
+    (title == 'a "quoted" \\ value') | ((port == 22) & (country.exact('US'))),
+    title.regex('^adm.*n$') & Term('is_honeypot', False),
+    ((title == 'a') | (title == 'b')) & ((port == 1) | (port == 2)),
+])
+def test_render_parse_round_trip(node):
+    parsed = _parse_query(node.compile())
+    assert parsed == node
+    assert parsed.compile() == node.compile()
+
+
+@pytest.mark.parametrize('text, canonical', [
+    ('port="80" && title="admin"', 'port="80"&&title="admin"'),
+    ('  title = "admin"||(port="80")  ', 'port="80"||title="admin"'),
+    ('((port="80"))', 'port="80"'),
+    ('is_honeypot=true && port!="22"', 'is_honeypot=true&&port!="22"'),
+    ('"百度" && port="443"', '("百度")&&port="443"'),
+])
+def test_parse_is_canonical(text, canonical):
+    parsed = _parse_query(text)
+    assert parsed.compile() == canonical
+    assert _parse_query(parsed.compile()) == parsed
+
+
+@pytest.mark.parametrize('text', [
+    '', '   ', 'port="80', 'port="80")', '(port="80"', '()', 'port 80',
+    'port="80" title="x"', 'port=80', 'port>"80"', 'port="80" &&', 'after!="2024-01-01"',
+])
+def test_syntax_errors(text):
+    with pytest.raises(FofaQuerySyntaxError):
+        _parse_query(text)
+
+
+def test_unknown_fields():
+    with pytest.raises(FofaQuerySyntaxError):
+        _parse_query('no_such_field="x"')
+    assert _parse_query('no_such_field="x"', check_fields=False) == Term('no_such_field', 'x')
+
+
+def test_query_node_keeps_unparsable_strings():
+    assert _query_node('port="80" title') == Raw('port="80" title')
+    node = port == 80
+    assert _query_node(node) is node
+
+
+def test_search_validates_before_sending(fake_fofa):
+    client = Fofa(key='test', api=fake_fofa.url, enable_log=False, enable_validate=True)
+    with pytest.raises(FofaQuerySyntaxError):
+        client.search('title="admin', fields=['ip'])
+    assert fake_fofa.requests == 0
@@ -0,0 +1,72 @@
+"""The backpressured streaming pipeline."""
+# 导入标准库
+import threading
+import time
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py.util import Pipeline
+
+
+def test_items_flow_through_all_stages():
+    out = []
+    stats = Pipeline(range(100)).then(lambda x: x * x, workers=3) \
+        .then(lambda x: x if x % 2 else None, name='odd').sink(out.append).run()
+    assert sorted(out) == [x * x for x in range(100) if x % 2]
+    assert [stage.name for stage in stats] == ['source', '<lambda>', 'odd', 'sink']
+    assert [stage.items for stage in stats] == [100, 100, 50, 50]
+
+
+def test_rows_are_counted_for_batches():
+    batches = [list(range(size)) for size in (3, 5, 7)]
+    stats = Pipeline(batches).then(lambda batch: (len(batch), batch)).sink(lambda item: None).run()
+    assert stats[0].rows == 15
+    assert stats[1].rows == 0 # 元组是单个条目, 不计行数
+
+
+def test_backpressure_bounds_the_queues():
+    produced, consumed = [], []
+    lock = threading.Lock()
+
+    def source():
+        for item in range(50):
+            with lock:
+                produced.append(item)
+                # 水位 = 已产生但还没消费的条目, 受各级队列容量和正在处理的条目限制
+                assert len(produced) - len(consumed) <= 2 * 2 + 3
+            yield item
+
+    def slow(item):
+        time.sleep(0.002)
+        with lock:
+            consumed.append(item)
+    Pipeline(source(), maxsize=2).then(lambda x: x).sink(slow).run()
+    assert consumed == list(range(50))
+
+
+def test_errors_stop_the_pipeline():
+    seen = []
+
+    def fail(item):
+        if item == 5:
+            raise RuntimeError('boom')
+        return item
+    with pytest.raises(RuntimeError):
+        Pipeline(range(10000), maxsize=1).then(fail).sink(seen.append).run()
+    assert len(seen) < 10000
+
+
+def test_no_stage_after_the_sink():
+    pipe = Pipeline([]).sink(print)
+    with pytest.raises(ValueError):
+        pipe.then(print)
+
+
+def test_client_pipeline(client, fake_fofa):
+    rows = []
+    pipe = client.pipeline('port="80"', fields=['ip', 'title'], size=450, page_size=100,
+                           fetch_workers=3)
+    stats = pipe.sink(lambda batch: rows.extend(batch['title'])).run()
+    assert sorted(int(title.rsplit('#', 1)[1]) for title in rows) == list(range(450))
+    assert stats[-1].rows == 450
@@ -0,0 +1,120 @@
+"""`BudgetScheduler` and `Fofa.schedule`."""
+# 导入标准库
+import time
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Fofa
+from fofa_py import factory
+from fofa_py.basic import ParamsMisconfiguredError
+from fofa_py.util import BudgetScheduler
+
+
+class _Clock:
+    """A manually advanced clock."""
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _job(cost: float, runs: list, name: str):
+    def _run():
+        runs.append(name)
+        return {'consumed_fpoint': cost}
+    return _run
+
+
+def test_higher_priority_runs_first():
+    clock, runs = _Clock(), []
+    scheduler = BudgetScheduler(clock=clock)
+    scheduler.add('low', _job(1, runs, 'low'), interval=10, priority=1)
+    scheduler.add('high', _job(1, runs, 'high'), interval=10, priority=5)
+    scheduler.run_pending()
+    scheduler.run_pending()
+    assert runs == ['high', 'low']
+
+
+def test_budget_is_never_exceeded():
+    clock, runs = _Clock(), []
+    scheduler = BudgetScheduler(fpoints=10, window=100, clock=clock)
+    scheduler.add('a', _job(4, runs, 'a'), interval=1, cost=4)
+    scheduler.add('b', _job(4, runs, 'b'), interval=1, cost=4)
+    times = []
+    while clock.now < 1000:
+        times.extend(clock.now for __ in scheduler.run_pending())
+        assert scheduler.spent()[0] <= 10
+        clock.now += 1
+    # 每100秒的窗口里最多花10点, 即最多执行2次
+    assert all(
+        sum(start <= time < start + 100 for time in times) <= 2
+        for start in range(0, 1000)
+    )
+    assert {'a', 'b'} == set(runs)
+
+
+def test_observed_cost_replaces_the_estimate():
+    clock, runs = _Clock(), []
+    scheduler = BudgetScheduler(fpoints=100, clock=clock)
+    job = scheduler.add('a', _job(7, runs, 'a'), interval=10, cost=1)
+    scheduler.run_pending()
+    assert scheduler.spent() == (7, 1)
+    assert 1 < job.cost < 7
+
+
+def test_too_many_requests_per_run():
+    scheduler = BudgetScheduler(requests=2)
+    with pytest.raises(ParamsMisconfiguredError):
+        scheduler.add('a', lambda: None, interval=10, requests=3)
+
+
+def test_every_page_of_a_run_is_charged(monkeypatch):
+    pages = []
+
+    def _search_v2(apikey, query_string, size, page, fields, **kwargs):
+        pages.append(page)
+        return {
+            'error': False, 'size': 30000, 'consumed_fpoint': 2, 'required_fpoints': 2,
+            'results': [[str(row)] * len(fields) for row in range((page - 1) * size, page * size)],
+        }
+    monkeypatch.setattr(factory, 'search_v2', _search_v2)
+    client = Fofa(key='test', api='http://127.0.0.1:9', enable_log=False)
+    clock, received = _Clock(), []
+    scheduler = BudgetScheduler(fpoints=100, clock=clock)
+    job = client.schedule(scheduler, 'port="80"', interval=60, fields=['ip', 'port'],
+                          size=25000, callback=received.append)
+    assert job.requests == 3
+    scheduler.run_pending()
+    assert sorted(pages) == [1, 2, 3]
+    assert scheduler.spent() == (6, 3)
+    assert len(received[0]) == 25000
+
+
+
+def test_failures_are_counted_apart_from_runs():
+    scheduler = BudgetScheduler(max_workers=3, clock=_Clock())
+
+    def _fail():
+        raise RuntimeError('search failed')
+
+    def _callback(result):
+        raise ValueError('callback failed')
+    failing = scheduler.add('failing', _fail, interval=10)
+    callback = scheduler.add('callback', _job(1, [], 'callback'), interval=10, callback=_callback)
+    fine = scheduler.add('fine', _job(1, [], 'fine'), interval=10)
+    assert len(scheduler.run_pending()) == 3 # 回调的异常不会从run_pending抛出
+    assert (failing.runs, failing.failures) == (0, 1)
+    assert isinstance(failing.error, RuntimeError)
+    assert (callback.runs, callback.failures) == (0, 1)
+    assert isinstance(callback.error, ValueError)
+    assert callback.cost == 1 # 查询已经成功, 开销照常计入
+    assert (fine.runs, fine.failures) == (1, 0)
+
+
+def test_run_survives_failing_callbacks():
+    scheduler = BudgetScheduler()
+    job = scheduler.add('a', _job(1, [], 'a'), interval=0.01, callback=lambda result: 1 / 0)
+    scheduler.run(until=time.monotonic() + 0.1)
+    assert job.runs == 0 and job.failures > 1
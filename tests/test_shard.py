@@ -0,0 +1,63 @@
+"""Planning disjoint sub-queries."""
+# 导入标准库
+from collections import Counter
+from datetime import date, timedelta
+
+from fofa_py import Field, after, before
+from fofa_py.util.shard import _plan_shards, _window
+
+_rows = [
+    {
+        'title': 'admin panel', 'country': ('CN', 'US', 'DE', 'JP')[row % 4],
+        'port': ('80', '443', '22')[row % 3], 'protocol': ('http', 'https', 'ssh')[row % 3],
+        'asn': str(row % 7),
+        'lastupdatetime': (date(2024, 1, 1) + timedelta(days=row % 60)).isoformat() + ' 12:00:00',
+    }
+    for row in range(2000)
+]
+
+
+def _count(node, facet) -> tuple:
+    """A local stats call: the matching rows and the top 5 buckets of `facet`."""
+    matched = [row for row in _rows if node.evaluate(row)]
+    buckets = Counter(row[facet] for row in matched).most_common(5) if facet else []
+    return len(matched), buckets
+
+
+def _assert_partition(shards, query) -> None:
+    for row in _rows:
+        matches = sum(shard.query.evaluate(row) for shard in shards)
+        assert matches == (1 if query.evaluate(row) else 0), row
+
+
+def test_facet_shards_are_disjoint_and_under_cap():
+    query = Field('title') == 'admin'
+    shards = _plan_shards(_count, query, cap=50)
+    assert all(shard.complete and shard.size <= 50 for shard in shards)
+    assert sum(shard.size for shard in shards) == len(_rows)
+    _assert_partition(shards, query)
+
+
+def test_time_windows_are_disjoint():
+    query = Field('title') == 'admin'
+    shards = _plan_shards(_count, query, cap=40, facets=('country', ),
+                          since=date(2024, 1, 1), until=date(2024, 2, 29))
+    assert all(shard.complete for shard in shards)
+    assert sum(shard.size for shard in shards) == len(_rows)
+    _assert_partition(shards, query)
+
+
+def test_window_is_half_open():
+    query = Field('port') == 80
+    node = _window(query, (date(2024, 1, 1), date(2024, 1, 3)))
+    assert node == query & after('2024-01-01') & before('2024-01-03')
+    row = {'port': '80', 'lastupdatetime': '2024-01-01 00:00:00'}
+    assert node.evaluate(row)
+    assert not node.evaluate(dict(row, lastupdatetime='2024-01-03 00:00:00'))
+    assert _window(query, None) is query
+
+
+def test_plan_shards_with_the_client(client):
+    shards = client.plan_shards('port="80"', cap=300, facets=('country', ))
+    assert sum(shard.size for shard in shards) == 1000
+    assert len(set(shard.query for shard in shards)) == len(shards)
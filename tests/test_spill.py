@@ -0,0 +1,41 @@
+"""Memory-mapped spill storage."""
+# 导入标准库
+import gc
+import os
+
+from fofa_py.util import MappedColumn
+
+
+def _spill_dirs(directory) -> list:
+    return [name for name in os.listdir(str(directory)) if name.startswith('fofa_py_spill_')]
+
+
+def test_spilled_rows_read_back(make_assets, generated, tmp_path):
+    _, rows = generated
+    assets = make_assets(*generated).where(port={'443', '22'})
+    expected = list(assets)
+    assert assets.spill(str(tmp_path), chunk_rows=64) is assets
+    assert all(isinstance(column, MappedColumn) for column in assets._columns.values())
+    assert list(assets) == expected
+    assert assets[-1] == expected[-1]
+    assert assets.where(port='22')['title'][:2] == [rows[2][3], rows[6][3]]
+    assert assets.group_by('port') == {'443': 250, '22': 250}
+
+
+def test_spill_directory_is_removed(make_assets, generated, tmp_path):
+    assets = make_assets(*generated).spill(str(tmp_path))
+    assert len(_spill_dirs(tmp_path)) == 1
+    del assets
+    gc.collect()
+    assert _spill_dirs(tmp_path) == []
+
+
+def test_merge_spills_past_the_threshold(make_assets, generated, tmp_path):
+    fields, rows = generated
+    first = make_assets(fields, rows[:600], query_string='q1')
+    second = make_assets(fields, rows[400:], query_string='q2')
+    merged = first.merge(second, spill_rows=100, spill_dir=str(tmp_path))
+    assert len(_spill_dirs(tmp_path)) == 1
+    assert merged['ip'] == [row[0] for row in rows]
+    assert merged['query_what'][500] == ('q1', 'q2')
+    assert merged['query_what'][0] == ('q1', )
@@ -0,0 +1,53 @@
+"""Flattened stats results and `merge_stats`."""
+# 导入第三方依赖
+import pytest
+
+from fofa_py import FofaAssets
+
+
+def _stats(aggs: dict, size: int, distinct: dict, query_string: str) -> FofaAssets:
+    return FofaAssets(
+        query_results={'error': False, 'size': size, 'distinct': distinct, 'aggs': aggs},
+        mode='stats', query_string=query_string
+    )
+
+
+def test_stats_table():
+    aggs = {
+        'port': [{'name': '80', 'count': 6}, {'name': '443', 'count': 4}],
+        'country': [{'name': 'CN', 'count': 9}],
+    }
+    assets = _stats(aggs, 10, {'ip': 7}, 'q1')
+    assert assets.fields == ['field', 'name', 'count']
+    assert list(assets) == [('port', '80', '6'), ('port', '443', '4'), ('country', 'CN', '9')]
+    assert assets.aggs == aggs
+    assert assets.where(field='port')['name'] == ['80', '443']
+
+
+def test_merge_stats_sums_buckets():
+    first = _stats({'port': [{'name': '80', 'count': 6}, {'name': '443', 'count': 4}]},
+                   10, {'ip': 7}, 'country="CN"')
+    second = _stats({'port': [{'name': '443', 'count': 9}, {'name': '22', 'count': 1}],
+                     'title': [{'name': 'x', 'count': 2}]},
+                    12, {'ip': 5}, 'country="US"')
+    merged = first.merge_stats(second)
+    assert merged.aggs == {
+        'port': [{'name': '443', 'count': 13}, {'name': '80', 'count': 6},
+                 {'name': '22', 'count': 1}],
+        'title': [{'name': 'x', 'count': 2}],
+    }
+    assert merged.distinct == {'ip': 12}
+    assert merged.results['size'] == 22
+    assert 'country="CN"' in merged.query_what and 'country="US"' in merged.query_what
+
+
+def test_merge_stats_only_stats(make_assets):
+    with pytest.raises(NotImplementedError):
+        _stats({}, 0, {}, 'q').merge_stats(make_assets(['ip'], []))
+
+
+def test_client_stats(client, fake_fofa):
+    assets = client.stats('port="80"', fields=['country', 'port'])
+    assert fake_fofa.requests == 1
+    assert set(assets['field']) == {'country', 'port'}
+    assert sum(int(n) for n in assets.where(field='country')['count']) <= 1000
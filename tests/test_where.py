@@ -0,0 +1,37 @@
+"""Column-wise `FofaAssets.where` filtering."""
+# 导入标准库
+import re
+
+# 导入第三方依赖
+import pytest
+
+from fofa_py import Field
+
+
+def test_predicate_kinds(assets):
+    assert assets.where(country='CN')['ip'] == ['1.1.1.1', '1.1.1.1', '3.3.3.3']
+    assert assets.where(port={80, 443})['ip'] == ['1.1.1.1', '2.2.2.2', '1.1.1.1']
+    assert assets.where(title=re.compile('admin', re.I))['ip'] == ['1.1.1.1', '1.1.1.1', '::1']
+    assert assets.where(port=lambda port: int(port) < 100)['ip'] == ['1.1.1.1', '::1', 'not-an-ip']
+    assert assets.where({'country': 'CN'}, port=8080)['ip'] == ['3.3.3.3']
+
+
+def test_views_share_storage_and_chain(assets, sample):
+    _, rows = sample
+    china = assets.where(country='CN')
+    assert len(china) == 3 and len(assets) == 6
+    assert china.where(port='443')['ip'] == ['1.1.1.1']
+    assert list(china) == [tuple(rows[0]), tuple(rows[2]), tuple(rows[3])]
+    assert china._columns['ip'] is assets._columns['ip']
+    assert assets.where(country='FR')['ip'] == []
+
+
+def test_query_nodes(assets):
+    query = (Field('title') == 'admin') & (Field('country') != 'DE')
+    assert assets.where(query)['port'] == ['80', '443']
+    assert assets.where(query, port=80)['port'] == ['80']
+
+
+def test_unknown_field(assets):
+    with pytest.raises(KeyError):
+        assets.where(missing='x')